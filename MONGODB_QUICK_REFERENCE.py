@@ -151,6 +151,10 @@ movie_repo = MovieRepository()
 movies = movie_repo.get_all_movies()
 movie = movie_repo.get_movie("M001")
 
+# Large reads: raw BSON, fields converted only when accessed
+lazy_movie_repo = MovieRepository(lazy=True)
+titles = [movie.title for movie in lazy_movie_repo.get_all_movies(fields=["movie_id", "title"])]
+
 # Theater operations
 theater_repo = TheaterRepository()
 theaters = theater_repo.get_all_theaters()
@@ -0,0 +1,435 @@
+"""
+JSON API for BookMyShow
+A dependency-free ASGI application exposing the catalog, shows, seat maps,
+bookings and payments over the same service layer as the Streamlit UI.
+
+Run with any ASGI server, e.g.:
+    uvicorn backend.api:app --workers 4 --http httptools --loop uvloop
+
+Each worker process builds its own services on startup. Set BMS_SEAT_FILE
+or BMS_SHARED_SEATS so workers share live seat state; show ids are
+deterministic, so every worker resolves the same ids. Users, bookings and
+payments stay in the worker that created them, so clients need sticky
+sessions when more than one worker runs.
+
+Booking routes only answer the booking's owner: pass its user_id as a
+query parameter (GET) or in the JSON body (POST).
+"""
+import asyncio
+import gzip
+import json
+import re
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from queue import Full
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+from models.database import Booking, MovieDatabase, Movie, Payment, Show, Theater, User
+from backend.payments import PaymentPipeline, PaymentStateError
+from backend.services import (
+    BookingService, MovieService, PaymentService, ShowService, TheaterService, UserService
+)
+from backend.shared_seats import seat_store_from_env
+
+# Responses smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+PAYMENT_WAIT_SECONDS = 10.0
+
+
+class ApiError(Exception):
+    """Error returned to the client as {"error": message} with a status code"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def build_services() -> Dict[str, Any]:
+    """The same services the Streamlit app uses, for one worker process"""
+    db = MovieDatabase()
+    show_service = ShowService(db, seat_store=seat_store_from_env(), lazy_schedule=True)
+    payment_service = PaymentService(db, show_service=show_service)
+    return {
+        'db': db,
+        'movie_service': MovieService(db),
+        'theater_service': TheaterService(db),
+        'show_service': show_service,
+        'user_service': UserService(db),
+        'booking_service': BookingService(db, show_service),
+        'payment_service': payment_service,
+        'payment_pipeline': PaymentPipeline(payment_service),
+        'events': show_service.events,
+    }
+
+
+def movie_json(movie: Movie) -> dict:
+    return {
+        "movie_id": movie.movie_id,
+        "title": movie.title,
+        "genre": movie.genre,
+        "duration": movie.duration,
+        "rating": movie.rating,
+        "language": movie.language,
+        "release_date": movie.release_date.isoformat(),
+        "poster_url": movie.poster_url,
+        "description": movie.description,
+        "director": movie.director,
+        "cast": movie.cast,
+    }
+
+
+def theater_json(theater: Theater) -> dict:
+    return {
+        "theater_id": theater.theater_id,
+        "name": theater.name,
+        "city": theater.city,
+        "location": theater.location,
+        "total_screens": theater.total_screens,
+    }
+
+
+def show_json(show: Show) -> dict:
+    return {
+        "show_id": show.show_id,
+        "movie_id": show.movie_id,
+        "theater_id": show.theater_id,
+        "screen_id": show.screen_id,
+        "start_time": show.start_time.isoformat(),
+        "end_time": show.end_time.isoformat(),
+        "language": show.language,
+        "format": show.format,
+        "available_seats": show.available_seats(),
+        "total_seats": show.total_seats(),
+    }
+
+
+def booking_json(booking: Booking) -> dict:
+    return {
+        "booking_id": booking.booking_id,
+        "user_id": booking.user_id,
+        "show_id": booking.show_id,
+        "booking_date": booking.booking_date.isoformat(),
+        "seat_ids": [detail.seat_id for detail in booking.booking_details],
+        "total_price": booking.total_price,
+        "status": booking.status.value,
+    }
+
+
+def payment_json(payment: Payment) -> dict:
+    return {
+        "payment_id": payment.payment_id,
+        "booking_id": payment.booking_id,
+        "amount": payment.amount,
+        "payment_method": payment.payment_method,
+        "status": payment.status,
+        "transaction_id": payment.transaction_id,
+        "created_at": payment.created_at.isoformat(),
+    }
+
+
+def user_json(user: User) -> dict:
+    return {"user_id": user.user_id, "name": user.name, "email": user.email, "phone": user.phone}
+
+
+def _int_param(query: Dict[str, str], name: str, default: int, maximum: int = 100) -> int:
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+    return max(0, min(value, maximum))
+
+
+def _datetime_param(query: Dict[str, str], name: str) -> Optional[datetime]:
+    if name not in query:
+        return None
+    try:
+        return datetime.fromisoformat(query[name])
+    except ValueError:
+        raise ApiError(400, f"{name} must be an ISO 8601 datetime")
+
+
+def _require(body: dict, *names: str) -> List[Any]:
+    missing = [name for name in names if body.get(name) in (None, "", [])]
+    if missing:
+        raise ApiError(400, f"missing fields: {', '.join(missing)}")
+    return [body[name] for name in names]
+
+
+Handler = Callable[..., Union[Tuple[int, Any], Awaitable[Tuple[int, Any]]]]
+
+
+class BookMyShowApi:
+    """ASGI application routing JSON requests to the service layer.
+
+    Plain handlers call the services, which take locks and may read the
+    shared seat store, so they run on a thread and never stall the event
+    loop. Payments are coroutines that await the payment pipeline's future
+    instead of holding a thread. Responses are gzip-compressed when the
+    client accepts it and the body is large enough to benefit.
+    """
+
+    def __init__(self, services: Optional[Dict[str, Any]] = None):
+        self.services = services
+        self.routes: List[Tuple[str, re.Pattern, Handler]] = []
+        self._route("GET", r"/api/health", self.health)
+        self._route("GET", r"/api/movies", self.list_movies)
+        self._route("GET", r"/api/movies/(?P<movie_id>[^/]+)", self.get_movie)
+        self._route("GET", r"/api/theaters", self.list_theaters)
+        self._route("GET", r"/api/shows", self.list_shows)
+        self._route("GET", r"/api/shows/(?P<show_id>[^/]+)", self.get_show)
+        self._route("GET", r"/api/shows/(?P<show_id>[^/]+)/seats", self.get_seat_map)
+        self._route("POST", r"/api/users", self.create_user)
+        self._route("POST", r"/api/bookings", self.create_booking)
+        self._route("GET", r"/api/bookings/(?P<booking_id>[^/]+)", self.get_booking)
+        self._route("POST", r"/api/bookings/(?P<booking_id>[^/]+)/payment", self.pay)
+        self._route("POST", r"/api/bookings/(?P<booking_id>[^/]+)/cancel", self.cancel)
+
+    def _route(self, method: str, pattern: str, handler: Handler):
+        self.routes.append((method, re.compile(pattern + "$"), handler))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def startup(self):
+        """Build the services (once per worker) and start the payment workers and hold sweeper"""
+        if self.services is None:
+            self.services = build_services()
+        self.services['payment_pipeline'].start()
+        self.services['show_service'].start_sweeper()
+
+    def shutdown(self):
+        if self.services is not None:
+            self.services['payment_pipeline'].shutdown(wait=False)
+            self.services['show_service'].stop_sweeper()
+
+    async def _http(self, scope, receive, send):
+        if self.services is None:
+            self.startup()
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1")
+                   for name, value in scope.get("headers", [])}
+        try:
+            handler, params = self._match(scope["method"], scope["path"])
+            body = await self._read_json(receive) if scope["method"] == "POST" else {}
+            query = self._query(scope.get("query_string", b""))
+            if asyncio.iscoroutinefunction(handler):
+                status, payload = await handler(query=query, body=body, **params)
+            else:
+                status, payload = await asyncio.to_thread(handler, query=query, body=body, **params)
+        except ApiError as e:
+            status, payload = e.status, {"error": e.message}
+        except Exception as e:
+            print(f"Error handling {scope['method']} {scope['path']}: {e}")
+            status, payload = 500, {"error": "internal error"}
+        await self._respond(send, status, payload, "gzip" in headers.get("accept-encoding", ""))
+
+    def _match(self, method: str, path: str) -> Tuple[Handler, Dict[str, str]]:
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return handler, match.groupdict()
+                allowed = True
+        if allowed:
+            raise ApiError(405, "method not allowed")
+        raise ApiError(404, "not found")
+
+    @staticmethod
+    def _query(query_string: bytes) -> Dict[str, str]:
+        return dict(parse_qsl(query_string.decode("latin-1")))
+
+    @staticmethod
+    async def _read_json(receive) -> dict:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        raw = b"".join(chunks)
+        if not raw:
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise ApiError(400, "body must be JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "body must be a JSON object")
+        return body
+
+    @staticmethod
+    async def _respond(send, status: int, payload: Any, accepts_gzip: bool):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        headers = [(b"content-type", b"application/json")]
+        if accepts_gzip and len(body) >= GZIP_MIN_SIZE:
+            body = gzip.compress(body, compresslevel=5)
+            headers.append((b"content-encoding", b"gzip"))
+            headers.append((b"vary", b"accept-encoding"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def _show(self, show_id: str) -> Show:
+        show = self.services['show_service'].get_show_details(show_id)
+        if not show:
+            raise ApiError(404, f"show {show_id} not found")
+        return show
+
+    def _booking(self, booking_id: str, user_id: Optional[str]) -> Booking:
+        """The booking if it belongs to `user_id`; other users' bookings are reported as not found"""
+        booking = self.services['booking_service'].get_booking(booking_id)
+        if not booking or not user_id or booking.user_id != user_id:
+            raise ApiError(404, f"booking {booking_id} not found")
+        return booking
+
+    def health(self, query, body):
+        return 200, {"status": "ok"}
+
+    def list_movies(self, query, body):
+        sort_by = query.get("sort_by", "title")
+        if sort_by not in ("title", "rating", "duration"):
+            raise ApiError(400, "sort_by must be title, rating or duration")
+        movie_service = self.services['movie_service']
+        limit = _int_param(query, "limit", 12)
+        if "q" in query:
+            # Searches page by offset, the catalog by keyset cursor
+            offset = _int_param(query, "offset", 0, maximum=10 ** 9)
+            movies = movie_service.search_movies_page(query["q"], sort_by, offset, limit)
+            next_page = {"offset": offset + limit}
+        else:
+            movies = movie_service.get_movies_after(sort_by, query.get("after"), limit)
+            next_page = {"after": movies[-1].movie_id} if movies else {}
+        return 200, {
+            "movies": [movie_json(movie) for movie in movies],
+            "next": next_page if len(movies) == limit else None,
+        }
+
+    def get_movie(self, query, body, movie_id):
+        movie = self.services['movie_service'].get_movie_details(movie_id)
+        if not movie:
+            raise ApiError(404, f"movie {movie_id} not found")
+        return 200, movie_json(movie)
+
+    def list_theaters(self, query, body):
+        theater_service = self.services['theater_service']
+        if "city" in query:
+            theaters = theater_service.get_theaters_by_city(query["city"])
+        else:
+            theaters = theater_service.get_all_theaters()
+        return 200, {"theaters": [theater_json(theater) for theater in theaters]}
+
+    def list_shows(self, query, body):
+        show_service = self.services['show_service']
+        limit = _int_param(query, "limit", 50, 500)
+        if "movie_id" in query and "theater_id" in query:
+            shows = show_service.get_shows_by_movie_and_theater(query["movie_id"], query["theater_id"])
+            after = _datetime_param(query, "after") or datetime.now()
+            shows = sorted((show for show in shows if show.start_time >= after),
+                           key=lambda show: show.start_time)[:limit]
+        else:
+            shows = show_service.get_next_shows(
+                limit, _datetime_param(query, "after"), query.get("theater_id"), query.get("city")
+            )
+            if "movie_id" in query:
+                shows = [show for show in shows if show.movie_id == query["movie_id"]]
+        return 200, {"shows": [show_json(show) for show in shows]}
+
+    def get_show(self, query, body, show_id):
+        return 200, show_json(self._show(show_id))
+
+    def get_seat_map(self, query, body, show_id):
+        since, epoch = None, None
+        if "since" in query:
+            # Version tokens are "<epoch>.<version>" as returned by an earlier call
+            epoch, _, version = query["since"].partition(".")
+            try:
+                since = int(version)
+            except ValueError:
+                raise ApiError(400, "since must be a version from an earlier seat map")
+        delta = self.services['show_service'].get_seat_changes(show_id, since, epoch)
+        if not delta:
+            raise ApiError(404, f"show {show_id} not found")
+        show = self._show(show_id)
+        return 200, {
+            "show_id": show.show_id,
+            "version": f"{delta.epoch}.{delta.version}",
+            "full": delta.full,
+            "available_seats": show.available_seats(),
+            "availability": {str(price): count for price, count in show.available_by_price.items()},
+            "seats": [[seat.seat_id, seat.row, seat.price, seat.status.value] for seat in delta.seats],
+        }
+
+    def create_user(self, query, body):
+        name, email, phone, password = _require(body, "name", "email", "phone", "password")
+        user = self.services['user_service'].create_user(name, email, phone, password)
+        return 201, user_json(user)
+
+    def create_booking(self, query, body):
+        user_id, show_id, seat_ids = _require(body, "user_id", "show_id", "seat_ids")
+        if not isinstance(seat_ids, list) or not all(isinstance(seat_id, str) for seat_id in seat_ids):
+            raise ApiError(400, "seat_ids must be a list of seat ids")
+        if len(set(seat_ids)) != len(seat_ids):
+            raise ApiError(400, "seat_ids must not repeat a seat")
+        self._show(show_id)
+        if not self.services['user_service'].get_user(user_id):
+            raise ApiError(404, f"user {user_id} not found")
+        booking = self.services['booking_service'].create_booking(user_id, show_id, seat_ids)
+        if not booking:
+            raise ApiError(409, "one or more seats are not available")
+        return 201, booking_json(booking)
+
+    def get_booking(self, query, body, booking_id):
+        return 200, booking_json(self._booking(booking_id, query.get("user_id")))
+
+    async def pay(self, query, body, booking_id):
+        booking = await asyncio.to_thread(self._booking, booking_id, body.get("user_id"))
+        payment_method = body.get("payment_method", booking.payment_method)
+        try:
+            # Checks the booking is pending; a repeated call joins the payment in flight
+            future = await asyncio.to_thread(
+                self.services['payment_pipeline'].submit,
+                booking.booking_id, booking.total_price, payment_method
+            )
+        except PaymentStateError:
+            raise ApiError(409, f"booking is {booking.status.value}")
+        except Full:
+            raise ApiError(503, "payments are busy, retry shortly")
+        try:
+            # shield: giving up waiting must not cancel the queued payment
+            payment = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                             PAYMENT_WAIT_SECONDS)
+        except (asyncio.TimeoutError, FutureTimeoutError):
+            return 202, {"booking_id": booking.booking_id, "status": "pending"}
+        if payment is None:
+            # Settled or cancelled while the payment was queued
+            raise ApiError(409, f"booking is {booking.status.value}")
+        if payment.status == "pending":
+            # The gateway timed out and cannot tell yet; paying again settles it
+            return 202, payment_json(payment)
+        status = 201 if payment.status == "success" else 402
+        return status, payment_json(payment)
+
+    def cancel(self, query, body, booking_id):
+        booking = self._booking(booking_id, body.get("user_id"))
+        if not self.services['booking_service'].cancel_booking(booking_id):
+            raise ApiError(409, "booking cannot be cancelled")
+        return 200, booking_json(booking)
+
+
+app = BookMyShowApi()
@@ -0,0 +1,182 @@
+"""
+Document Codecs for BookMyShow
+Encode and decode functions generated once from the model dataclasses, so
+every repository maps documents to models through the same fast path.
+"""
+import dataclasses
+import typing
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Type
+
+from models.database import (
+    Booking, BookingDetail, BookingSummary, Movie, Payment, SeatLayout, Show, Theater, User
+)
+
+
+class _LazyField:
+    """Converts one field from the document on first read and caches it on the instance"""
+
+    def __init__(self, name: str, getter: Callable[[Mapping[str, Any]], Any]):
+        self.name = name
+        self.getter = getter
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        # Non-data descriptor: once cached, the instance dict wins
+        value = obj.__dict__[self.name] = self.getter(obj._document)
+        return value
+
+
+def _rebuild(model: type, state: Dict[str, Any]):
+    """Unpickle a lazily decoded model as a plain one"""
+    obj = object.__new__(model)
+    obj.__dict__.update(state)
+    return obj
+
+
+def _enum_type(annotation) -> Optional[Type[Enum]]:
+    """The Enum class of a field annotated with it or Optional of it"""
+    if typing.get_origin(annotation) is typing.Union:
+        members = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        annotation = members[0] if len(members) == 1 else None
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return annotation
+    return None
+
+
+class ModelCodec:
+    """Document <-> dataclass mapping for one model.
+
+    The field loop runs once, here: it generates straight-line encode and
+    decode functions (as dataclasses does for __init__), so a decode costs
+    one dict lookup per field. Enum fields are stored as their values.
+    A field missing from a document gets the value from `defaults` (a
+    zero-argument callable) or else the dataclass default; fields without
+    either are required. `exclude` fields are neither stored nor read and
+    always get their default.
+    """
+
+    def __init__(self, model: type, exclude: Iterable[str] = (),
+                 defaults: Optional[Dict[str, Callable[[], Any]]] = None):
+        self.model = model
+        defaults = defaults or {}
+        hints = typing.get_type_hints(model)
+        excluded = set(exclude)
+        self.fields = [
+            f.name for f in dataclasses.fields(model)
+            if f.init and f.name not in excluded
+        ]
+        # Stored field -> annotation, e.g. for parsing text records
+        self.types = {name: hints[name] for name in self.fields}
+        namespace: Dict[str, Any] = {'Model': model, '_new': object.__new__}
+        encoded, decoded = [], []
+        for f in dataclasses.fields(model):
+            if not f.init:
+                continue
+            stored = f.name not in excluded
+            enum = _enum_type(hints.get(f.name))
+            if f.name in defaults:
+                namespace[f"_default_{f.name}"] = defaults[f.name]
+                value = f"(d['{f.name}'] if '{f.name}' in d else _default_{f.name}())"
+            elif f.default is not dataclasses.MISSING:
+                namespace[f"_default_{f.name}"] = f.default
+                value = f"d.get('{f.name}', _default_{f.name})"
+            elif f.default_factory is not dataclasses.MISSING:
+                namespace[f"_default_{f.name}"] = f.default_factory
+                value = f"(d['{f.name}'] if '{f.name}' in d else _default_{f.name}())"
+            else:
+                value = f"d['{f.name}']"
+            if not stored:
+                if f"_default_{f.name}" not in namespace:
+                    raise ValueError(f"{model.__name__}.{f.name} is excluded but has no default")
+                call = "" if f.name not in defaults and f.default is not dataclasses.MISSING else "()"
+                value = f"_default_{f.name}{call}"
+            elif enum is not None:
+                namespace[f"_enum_{f.name}"] = enum
+                value = f"_enum_{f.name}({value})"
+                encoded.append(f"'{f.name}': None if o.{f.name} is None else o.{f.name}.value")
+            else:
+                encoded.append(f"'{f.name}': o.{f.name}")
+            decoded.append((f.name, value))
+        self.plain = (
+            not hasattr(model, '__post_init__') and not hasattr(model, '__slots__')
+            and not model.__dataclass_params__.frozen
+            and all(f.init for f in dataclasses.fields(model))
+        )
+        # Plain models are built by filling __dict__ directly, skipping the generated __init__
+        if self.plain:
+            items = ", ".join(f"'{name}': {value}" for name, value in decoded)
+            build = f"    o = _new(Model)\n    o.__dict__ = {{{items}}}\n    return o\n"
+        else:
+            arguments = ", ".join(f"{name}={value}" for name, value in decoded)
+            build = f"    return Model({arguments})\n"
+        getters = ", ".join(f"'{name}': lambda d: {value}" for name, value in decoded)
+        source = (
+            "def encode(o):\n"
+            f"    return {{{', '.join(encoded)}}}\n"
+            "def decode(d):\n"
+            + build
+            + f"getters = {{{getters}}}\n"
+        )
+        exec(source, namespace)
+        self.encode: Callable[[Any], Dict[str, Any]] = namespace['encode']
+        self.decode: Callable[[Dict[str, Any]], Any] = namespace['decode']
+        self._lazy_model = self._lazy_class(namespace['getters']) if self.plain else None
+
+    def _lazy_class(self, getters: Dict[str, Callable]) -> type:
+        model = self.model
+
+        def __eq__(self, other):
+            if not isinstance(other, model):
+                return NotImplemented
+            return all(getattr(self, name) == getattr(other, name) for name in getters)
+
+        def __reduce__(self):
+            return _rebuild, (model, {name: getattr(self, name) for name in getters})
+
+        namespace = {name: _LazyField(name, getter) for name, getter in getters.items()}
+        namespace.update({
+            '__slots__': ('_document',),
+            '__qualname__': model.__qualname__,
+            '__eq__': __eq__,
+            '__hash__': model.__hash__,
+            '__reduce__': __reduce__,
+        })
+        return type(model.__name__, (model,), namespace)
+
+    def decode_lazy(self, document: Mapping[str, Any]):
+        """A model whose fields are converted from `document` on first access.
+
+        Meant for RawBSONDocuments, which are only parsed when first read, so
+        models a caller never looks at cost almost nothing. A required field
+        missing from the document raises KeyError when it is read. Models
+        with __post_init__ are decoded right away.
+        """
+        if self._lazy_model is None:
+            return self.decode(document)
+        obj = object.__new__(self._lazy_model)
+        obj._document = document
+        return obj
+
+    def decode_many(self, documents: Iterable[Mapping[str, Any]], lazy: bool = False) -> List[Any]:
+        """Decode a cursor or list of documents"""
+        return list(map(self.decode_lazy if lazy else self.decode, documents))
+
+    def projection(self, fields: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Projection fetching only the stored fields, or only `fields` of them"""
+        projection = {name: 1 for name in (fields or self.fields)}
+        projection['_id'] = 0
+        return projection
+
+
+USER_CODEC = ModelCodec(User, exclude=('bookings',))
+MOVIE_CODEC = ModelCodec(Movie, defaults={'release_date': datetime.now})
+THEATER_CODEC = ModelCodec(Theater, exclude=('screens',))
+# Shows are stored without seats; the repository adds city and counters
+SHOW_CODEC = ModelCodec(Show, exclude=('seats', 'layout'), defaults={'layout': SeatLayout})
+BOOKING_CODEC = ModelCodec(Booking, exclude=('booking_details',), defaults={'booking_date': datetime.now})
+BOOKING_DETAIL_CODEC = ModelCodec(BookingDetail)
+PAYMENT_CODEC = ModelCodec(Payment)
+BOOKING_SUMMARY_CODEC = ModelCodec(BookingSummary, defaults={'booking_date': datetime.now})
@@ -0,0 +1,146 @@
+"""
+Event Bus for BookMyShow
+In-process publish/subscribe for seat and booking changes, so caches,
+counters and UI sessions can react to updates instead of polling.
+"""
+import queue
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Union
+
+from models.database import BookingStatus, SeatStatus
+
+
+@dataclass
+class SeatChangeEvent:
+    """Seats of a show moved to `status`"""
+    show_id: str
+    seat_ids: List[str]
+    status: SeatStatus
+    reason: str  # held, released, expired, booked, cancelled, payment_failed, sync, change_stream
+    booking_id: Optional[str] = None
+    user_id: Optional[str] = None
+    at: datetime = field(default_factory=datetime.now)
+
+
+@dataclass
+class BookingEvent:
+    """A booking was created or changed status"""
+    booking_id: str
+    user_id: str
+    show_id: str
+    status: BookingStatus
+    at: datetime = field(default_factory=datetime.now)
+
+
+Event = Union[SeatChangeEvent, BookingEvent]
+
+
+class Subscription:
+    """A handler registered on the bus, optionally limited to one show or event type"""
+
+    def __init__(self, bus: "EventBus", handler: Callable[[Event], None],
+                 show_id: Optional[str] = None, event_types: Optional[Iterable[type]] = None):
+        self.bus = bus
+        self.handler = handler
+        self.show_id = show_id
+        self.event_types = tuple(event_types) if event_types else None
+
+    def matches(self, event: Event) -> bool:
+        if self.show_id is not None and event.show_id != self.show_id:
+            return False
+        return self.event_types is None or isinstance(event, self.event_types)
+
+    def unsubscribe(self):
+        self.bus.unsubscribe(self)
+
+
+class QueueSubscription(Subscription):
+    """Subscription that buffers events for a consumer that polls, e.g. a UI session.
+
+    When the buffer is full the oldest event is dropped, so a session that
+    stops polling cannot hold memory indefinitely.
+    """
+
+    def __init__(self, bus: "EventBus", show_id: Optional[str] = None,
+                 event_types: Optional[Iterable[type]] = None, maxsize: int = 1000):
+        super().__init__(bus, self._put, show_id, event_types)
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+
+    def _put(self, event: Event):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """The next event, or None if none arrives within `timeout`"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[Event]:
+        """All buffered events, without waiting"""
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class EventBus:
+    """Synchronous publish/subscribe bus.
+
+    Handlers run on the publishing thread, after the change is applied, and
+    must be quick; slow consumers should use a QueueSubscription. A failing
+    handler is reported and does not affect the publisher or other handlers.
+    """
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: Callable[[Event], None], show_id: Optional[str] = None,
+                  event_types: Optional[Iterable[type]] = None) -> Subscription:
+        """Call `handler` for every matching event"""
+        return self._add(Subscription(self, handler, show_id, event_types))
+
+    def listen(self, show_id: Optional[str] = None, event_types: Optional[Iterable[type]] = None,
+               maxsize: int = 1000) -> QueueSubscription:
+        """Buffer matching events in a queue for the caller to poll"""
+        return self._add(QueueSubscription(self, show_id, event_types, maxsize))
+
+    def _add(self, subscription: Subscription):
+        with self._lock:
+            # Copy on write, so publish can iterate without the lock
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def publish(self, event: Event):
+        for subscription in self._subscriptions:
+            if subscription.matches(event):
+                try:
+                    subscription.handler(event)
+                except Exception as e:
+                    print(f"Error handling {type(event).__name__}: {e}")
+
+    def seats_changed(self, show_id: str, seat_ids: List[str], status: SeatStatus, reason: str,
+                      booking_id: Optional[str] = None, user_id: Optional[str] = None):
+        if seat_ids and self._subscriptions:
+            self.publish(SeatChangeEvent(show_id, list(seat_ids), status, reason, booking_id, user_id))
+
+    def booking_changed(self, booking_id: str, user_id: str, show_id: str, status: BookingStatus):
+        if self._subscriptions:
+            self.publish(BookingEvent(booking_id, user_id, show_id, status))
@@ -0,0 +1,93 @@
+"""
+Streaming Exporters for BookMyShow
+Write movies, theaters, shows, bookings and payments to JSONL or CSV one
+record at a time, so exports run in constant memory whatever their size.
+"""
+import csv
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, TextIO
+
+from backend.codecs import BOOKING_CODEC, MOVIE_CODEC, PAYMENT_CODEC, SHOW_CODEC, THEATER_CODEC
+from models.database import Booking, Show
+
+FORMATS = ("jsonl", "csv")
+# Separator for list values (cast, seat ids) in CSV cells
+CSV_LIST_SEPARATOR = ";"
+
+
+def _show_row(show: Show) -> Dict[str, Any]:
+    row = SHOW_CODEC.encode(show)
+    row['total_seats'] = show.total_seats()
+    row['available_seats'] = show.available_seats()
+    return row
+
+
+def _booking_row(booking: Booking) -> Dict[str, Any]:
+    row = BOOKING_CODEC.encode(booking)
+    row['seat_ids'] = [detail.seat_id for detail in booking.booking_details]
+    return row
+
+
+# Export kind -> function turning a model into a flat row
+ROW_BUILDERS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    'movies': MOVIE_CODEC.encode,
+    'theaters': THEATER_CODEC.encode,
+    'shows': _show_row,
+    'bookings': _booking_row,
+    'payments': PAYMENT_CODEC.encode,
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_cell(value) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return CSV_LIST_SEPARATOR.join(str(item) for item in value)
+    return value
+
+
+def write_jsonl(rows: Iterable[Dict[str, Any]], out: TextIO) -> int:
+    """Write one JSON object per line; returns the number of rows"""
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, default=_json_default, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterable[Dict[str, Any]], out: TextIO) -> int:
+    """Write rows as CSV with a header taken from the first row; returns the number of rows"""
+    writer = None
+    count = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(row), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow({key: _csv_cell(value) for key, value in row.items()})
+        count += 1
+    return count
+
+
+def export(kind: str, records: Iterable[Any], out: TextIO, fmt: str = "jsonl") -> int:
+    """Stream models of one kind (see ROW_BUILDERS) to `out` as JSONL or CSV"""
+    if kind not in ROW_BUILDERS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    rows = map(ROW_BUILDERS[kind], records)
+    return write_jsonl(rows, out) if fmt == "jsonl" else write_csv(rows, out)
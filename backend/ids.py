@@ -0,0 +1,159 @@
+"""
+ID Generation for BookMyShow
+Snowflake-style ids: milliseconds since an epoch, a node number and a
+per-millisecond sequence packed into 63 bits. They cost no OS randomness,
+sort by creation time and never collide between processes.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 2024-01-01T00:00:00Z; 41 bits of milliseconds last until 2093
+EPOCH_MS = 1704067200000
+NODE_BITS = 10
+# With BMS_NODE_ID set, a node id is the host number followed by a local slot
+HOST_BITS = 5
+LOCAL_BITS = NODE_BITS - HOST_BITS
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_HOST = (1 << HOST_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# Fixed width, so id strings sort like the numbers behind them
+ID_DIGITS = 16
+
+# Node slot lock files stay open for the life of the process
+_node_locks: List = []
+
+
+def claim_node_id() -> int:
+    """A node slot no other live process on this host holds.
+
+    Slots are claimed with an exclusive lock on a file per slot, released by
+    the OS when the process exits. Deployments spanning several hosts give
+    each host its own BMS_NODE_ID (0-31), which becomes the high bits of the
+    node id; the workers of a host then claim one of its 32 local slots, so
+    they can share the variable without colliding.
+    """
+    configured = os.getenv("BMS_NODE_ID")
+    if configured:
+        host = int(configured)
+        if not 0 <= host <= MAX_HOST:
+            raise ValueError(f"BMS_NODE_ID must be a host number between 0 and {MAX_HOST}")
+        candidates = [(host << LOCAL_BITS) | slot for slot in range(1 << LOCAL_BITS)]
+    else:
+        candidates = list(range(MAX_NODE + 1))
+
+    import tempfile
+
+    directory = os.path.join(tempfile.gettempdir(), "bms_node_ids")
+    os.makedirs(directory, exist_ok=True)
+    first = os.getpid() % len(candidates)
+    for i in range(len(candidates)):
+        node_id = candidates[(first + i) % len(candidates)]
+        handle = open(os.path.join(directory, f"{node_id}.lock"), "a+b")
+        try:
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            continue
+        _node_locks.append(handle)
+        return node_id
+    raise RuntimeError(f"All {len(candidates)} node ids are in use on this host")
+
+
+class IdGenerator(ABC):
+    """Makes unique string ids; subclass it to plug in another scheme"""
+
+    @abstractmethod
+    def next_id(self, prefix: str = "") -> str:
+        """A new unique id starting with `prefix`"""
+
+
+class SnowflakeIdGenerator(IdGenerator):
+    """Time + node + sequence ids, thread-safe.
+
+    Up to 4096 ids per millisecond per node; beyond that, or when the clock
+    steps back, ids continue from the last timestamp used, so they stay
+    unique and increasing. The node id is claimed on first use.
+    """
+
+    def __init__(self, node_id: Optional[int] = None, epoch_ms: int = EPOCH_MS):
+        if node_id is not None and not 0 <= node_id <= MAX_NODE:
+            raise ValueError(f"node_id must be between 0 and {MAX_NODE}")
+        self.epoch_ms = epoch_ms
+        self._node_id = node_id
+        self._claim_node = node_id is None
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # A forked child must not share its parent's node id
+        self._lock = threading.Lock()
+        if self._claim_node:
+            self._node_id = None
+
+    @property
+    def node_id(self) -> int:
+        if self._node_id is None:
+            self._node_id = claim_node_id()
+        return self._node_id
+
+    def next_int(self) -> int:
+        with self._lock:
+            now = time.time_ns() // 1_000_000 - self.epoch_ms
+            if now <= self._last_ms:
+                now = self._last_ms
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # Sequence exhausted: borrow the next millisecond rather than wait for it
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self, prefix: str = "") -> str:
+        return f"{prefix}{self.next_int():0{ID_DIGITS}x}"
+
+    def lower_bound(self, moment: datetime, prefix: str = "") -> str:
+        """Smallest id generated at or after `moment`, for id range queries"""
+        elapsed = max(0, int(moment.timestamp() * 1000) - self.epoch_ms)
+        return f"{prefix}{elapsed << (NODE_BITS + SEQUENCE_BITS):0{ID_DIGITS}x}"
+
+    def created_at(self, id_value: str, prefix: str = "") -> datetime:
+        """When an id was generated (to the millisecond)"""
+        elapsed = int(id_value[len(prefix):], 16) >> (NODE_BITS + SEQUENCE_BITS)
+        return datetime.fromtimestamp((elapsed + self.epoch_ms) / 1000)
+
+
+_default_generator: Optional[IdGenerator] = None
+
+
+def default_id_generator() -> IdGenerator:
+    """The process-wide generator services use unless given their own"""
+    global _default_generator
+    if _default_generator is None:
+        _default_generator = SnowflakeIdGenerator()
+    return _default_generator
+
+
+def set_default_id_generator(generator: IdGenerator):
+    """Plug in another id scheme for every service created afterwards"""
+    global _default_generator
+    _default_generator = generator
@@ -0,0 +1,415 @@
+"""
+Bulk Catalog Import for BookMyShow
+Streams movie, theater and show records from JSONL or CSV files, validates
+them and upserts them with chunked, unordered bulk writes on a pool of
+worker threads. A checkpoint file makes an interrupted import resumable.
+"""
+import csv
+import json
+import os
+import time
+import typing
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from backend.codecs import MOVIE_CODEC, SHOW_CODEC, THEATER_CODEC, ModelCodec
+from backend.exporters import CSV_LIST_SEPARATOR
+from backend.mongodb_connection import get_database, Collections
+from backend.mongodb_repository import ShowRepository
+from backend.scheduling import ScheduleEngine, show_id_for
+from models.database import Movie, SeatLayout, Show, Theater
+
+
+class RecordError(ValueError):
+    """A record that cannot be imported"""
+
+
+def read_records(path: str) -> Iterator[Union[str, Dict[str, str]]]:
+    """Records of a .csv (rows) or .jsonl file (lines), one at a time.
+
+    JSONL lines are parsed with the rest of the record, so a malformed line
+    is rejected like any other invalid record instead of ending the import.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def _coerce(value: Any, annotation) -> Any:
+    """Convert a JSON or CSV value to a model field type"""
+    if annotation is datetime:
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if annotation is int:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"not an integer: {value!r}")
+        return int(value)
+    if annotation is float:
+        return float(value)
+    if annotation is str:
+        return str(value)
+    if typing.get_origin(annotation) is list and isinstance(value, str):
+        return [item for item in value.split(CSV_LIST_SEPARATOR) if item]
+    return value
+
+
+def parse_record(record: Union[str, Dict[str, Any]], codec: ModelCodec) -> Tuple[Any, Dict[str, Any]]:
+    """The model for a record, plus the record as a dict; raises RecordError"""
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except ValueError as e:
+            raise RecordError(f"invalid JSON: {e}")
+        if not isinstance(record, dict):
+            raise RecordError("not a JSON object")
+    values = {}
+    for name, annotation in codec.types.items():
+        value = record.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            values[name] = _coerce(value, annotation)
+        except (TypeError, ValueError) as e:
+            raise RecordError(f"{name}: {e}")
+    if codec is SHOW_CODEC and 'show_id' not in values:
+        if {'theater_id', 'screen_id', 'start_time'} <= values.keys():
+            values['show_id'] = show_id_for(values['theater_id'], values['screen_id'], values['start_time'])
+    try:
+        return codec.decode(values), record
+    except KeyError as e:
+        raise RecordError(f"missing field {e}")
+
+
+def _check_movie(movie: Movie, record: Dict, context: Dict) -> Optional[str]:
+    if not movie.title.strip():
+        return "empty title"
+    if movie.duration <= 0:
+        return "duration must be positive"
+    if not 0 <= movie.rating <= 10:
+        return "rating must be between 0 and 10"
+    return None
+
+
+def _check_theater(theater: Theater, record: Dict, context: Dict) -> Optional[str]:
+    if not theater.name.strip() or not theater.city.strip():
+        return "empty name or city"
+    if theater.total_screens < 1:
+        return "total_screens must be at least 1"
+    return None
+
+
+def _check_show(show: Show, record: Dict, context: Dict) -> Optional[str]:
+    if show.end_time <= show.start_time:
+        return "ends before it starts"
+    if not (context['theater_cities'].get(show.theater_id) or record.get('city')):
+        return f"unknown theater {show.theater_id}"
+    return None
+
+
+def _catalog_operation(key: str, codec: ModelCodec) -> Callable:
+    def operation(model, record: Dict, context: Dict) -> UpdateOne:
+        document = codec.encode(model)
+        return UpdateOne({key: document[key]}, {'$set': document}, upsert=True)
+    return operation
+
+
+def _show_operation(show: Show, record: Dict, context: Dict) -> UpdateOne:
+    document = SHOW_CODEC.encode(show)
+    document['city'] = (context['theater_cities'].get(show.theater_id) or record['city']).lower()
+    # Counters are only set for new shows, so re-importing a schedule keeps bookings' effect
+    layout = SeatLayout()
+    counters = {
+        'total_seats': layout.capacity(),
+        'available_seats': layout.capacity(),
+        'available_by_tier': {
+            ShowRepository._tier_key(price): count for price, count in layout.tier_counts().items()
+        },
+    }
+    return UpdateOne({'show_id': show.show_id}, {'$set': document, '$setOnInsert': counters}, upsert=True)
+
+
+# Stored shows starting this long before a chunk's first show are assumed to be over by then
+MAX_SHOW_LENGTH = timedelta(hours=12)
+
+
+def _show_context(db) -> Dict[str, Any]:
+    theaters = {
+        theater.theater_id: theater
+        for theater in map(THEATER_CODEC.decode_lazy, db[Collections.THEATERS].find({}, THEATER_CODEC.projection()))
+    }
+    movies = {
+        movie.movie_id: movie
+        for movie in map(MOVIE_CODEC.decode_lazy,
+                         db[Collections.MOVIES].find({}, MOVIE_CODEC.projection(['movie_id', 'duration'])))
+    }
+    return {
+        'theater_cities': {theater_id: theater.city for theater_id, theater in theaters.items()},
+        'theaters': theaters,
+        'movies': movies,
+        'engine': ScheduleEngine(),
+        # theater_id -> show_id -> show accepted earlier in this import
+        'accepted': {},
+    }
+
+
+def _check_schedule(db, shows: List[Show], context: Dict) -> Dict[int, str]:
+    """Screen conflicts of a chunk's shows, by position, with stored shows, earlier chunks and each other"""
+    problems: Dict[int, str] = {}
+    positions: Dict[str, int] = {}
+    accepted = context['accepted']
+    for position, show in enumerate(shows):
+        if show.show_id in positions or show.show_id in accepted.get(show.theater_id, {}):
+            problems[position] = f"duplicate show {show.show_id}"
+        else:
+            positions[show.show_id] = position
+    candidates = [shows[position] for position in positions.values()]
+    if not candidates:
+        return problems
+
+    engine = context['engine']
+    theater_ids = sorted({show.theater_id for show in candidates})
+    start = min(show.start_time for show in candidates) - MAX_SHOW_LENGTH - engine.cleaning_gap
+    end = max(show.end_time for show in candidates) + engine.cleaning_gap
+    cursor = db[Collections.SHOWS].find(
+        {'theater_id': {'$in': theater_ids}, 'start_time': {'$gte': start, '$lt': end}},
+        SHOW_CODEC.projection()
+    )
+    existing = {show.show_id: show for show in map(SHOW_CODEC.decode, cursor)}
+    for theater_id in theater_ids:
+        for show in accepted.get(theater_id, {}).values():
+            if start <= show.start_time < end:
+                existing[show.show_id] = show
+    # Re-imported shows replace their stored version rather than clash with it
+    for show_id in positions:
+        existing.pop(show_id, None)
+
+    for conflict in engine.validate(candidates, existing.values(), context['movies'], context['theaters']):
+        reason = conflict.reason
+        if conflict.other_show_id:
+            reason += f" with {conflict.other_show_id}"
+        problems.setdefault(positions[conflict.show_id], reason)
+    for show_id, position in positions.items():
+        if position not in problems:
+            accepted.setdefault(shows[position].theater_id, {})[show_id] = shows[position]
+    return problems
+
+
+@dataclass
+class ImportKind:
+    """How to validate and write one kind of catalog record"""
+    collection: str
+    codec: ModelCodec
+    check: Callable[[Any, Dict, Dict], Optional[str]]
+    operation: Callable[[Any, Dict, Dict], UpdateOne]
+    # Reference data loaded once per file, e.g. theater cities for shows
+    load_context: Callable[[Any], Dict[str, Any]] = lambda db: {}
+    # Checks across the valid records of a chunk: (db, models, context) -> {position: problem}
+    check_chunk: Optional[Callable[[Any, List[Any], Dict], Dict[int, str]]] = None
+
+
+IMPORT_KINDS: Dict[str, ImportKind] = {
+    'movies': ImportKind(Collections.MOVIES, MOVIE_CODEC, _check_movie,
+                         _catalog_operation('movie_id', MOVIE_CODEC)),
+    'theaters': ImportKind(Collections.THEATERS, THEATER_CODEC, _check_theater,
+                           _catalog_operation('theater_id', THEATER_CODEC)),
+    'shows': ImportKind(Collections.SHOWS, SHOW_CODEC, _check_show, _show_operation, _show_context,
+                        _check_schedule),
+}
+
+
+def kind_for_path(path: str) -> str:
+    """Import kind from a file name such as movies.jsonl or shows_2024-06.csv"""
+    name = Path(path).name.lower()
+    for kind in IMPORT_KINDS:
+        if name.startswith(kind):
+            return kind
+    raise ValueError(f"Cannot tell what {path} contains; name it movies/theaters/shows or pass a kind")
+
+
+@dataclass
+class ImportReport:
+    """Outcome of importing one file"""
+    path: str
+    kind: str
+    read: int = 0
+    skipped: int = 0  # in chunks finished before a resume
+    inserted: int = 0
+    modified: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Records processed per second"""
+        return (self.read - self.skipped) / self.elapsed if self.elapsed else 0.0
+
+
+class CatalogImporter:
+    """Imports catalog files with upserts, `workers` bulk writes in flight at a time.
+
+    Records are cut into chunks of `chunk_size` in file order. The index of
+    the last chunk before which every chunk was written is kept in
+    <file>.checkpoint, so a rerun after a failure resumes from there;
+    replayed upserts are harmless. The checkpoint is removed once the file
+    is done. Invalid records, shows that clash with the schedule on their
+    screen and rejected writes go to <file>.rejects.jsonl (after a resume,
+    rejects of replayed chunks may repeat).
+    """
+
+    def __init__(self, db=None, workers: int = 4, chunk_size: int = 1000,
+                 retries: int = 3, retry_delay: float = 0.5):
+        self.db = db if db is not None else get_database()
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def import_file(self, path: str, kind: Optional[str] = None, restart: bool = False) -> ImportReport:
+        """Import one file; raises after saving the checkpoint if a chunk cannot be written"""
+        kind = kind or kind_for_path(path)
+        spec = IMPORT_KINDS[kind]
+        report = ImportReport(path, kind)
+        checkpoint_path = f"{path}.checkpoint"
+        done = 0 if restart else self._load_checkpoint(checkpoint_path, path)
+        context = spec.load_context(self.db)
+        started = time.perf_counter()
+
+        records = enumerate(read_records(path), start=1)
+        chunks = iter(lambda: list(islice(records, self.chunk_size)), [])
+        pending: Dict[Future, Tuple[int, List[int]]] = {}
+        finished = set()
+        watermark = done
+
+        with open(f"{path}.rejects.jsonl", "a" if done else "w", encoding="utf-8") as rejects, \
+                ThreadPoolExecutor(self.workers, thread_name_prefix=f"import-{kind}") as pool:
+
+            def reject(line: int, reason: str):
+                report.rejected += 1
+                rejects.write(json.dumps({'line': line, 'reason': reason}) + "\n")
+
+            def collect(futures):
+                # Record every finished write before raising the first failure
+                nonlocal watermark
+                failure = None
+                for future in futures:
+                    index, lines = pending.pop(future)
+                    try:
+                        inserted, modified, unchanged, errors = future.result()
+                    except PyMongoError as e:
+                        failure = failure or e
+                        continue
+                    report.inserted += inserted
+                    report.modified += modified
+                    report.unchanged += unchanged
+                    for position, message in errors:
+                        reject(lines[position], message)
+                    finished.add(index)
+                advanced = watermark
+                while watermark in finished:
+                    finished.remove(watermark)
+                    watermark += 1
+                if watermark != advanced:
+                    self._save_checkpoint(checkpoint_path, path, watermark)
+                if failure:
+                    raise failure
+
+            try:
+                for index, chunk in enumerate(chunks):
+                    report.read += len(chunk)
+                    if index < done:
+                        report.skipped += len(chunk)
+                        continue
+                    valid = []
+                    for line, record in chunk:
+                        try:
+                            model, fields = parse_record(record, spec.codec)
+                            problem = spec.check(model, fields, context)
+                            if problem:
+                                raise RecordError(problem)
+                            valid.append((line, model, fields))
+                        except RecordError as e:
+                            reject(line, str(e))
+                    # Chunks are checked in file order, so later chunks see the earlier ones
+                    problems = spec.check_chunk(self.db, [model for _, model, _ in valid], context) \
+                        if spec.check_chunk and valid else {}
+                    operations, lines = [], []
+                    for position, (line, model, fields) in enumerate(valid):
+                        if position in problems:
+                            reject(line, problems[position])
+                            continue
+                        operations.append(spec.operation(model, fields, context))
+                        lines.append(line)
+                    # Bound the chunks held in memory to the ones being written
+                    while len(pending) >= self.workers * 2:
+                        collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                    pending[pool.submit(self._write, spec.collection, operations)] = (index, lines)
+                while pending:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                # Keep the progress of writes that were already running
+                try:
+                    collect([future for future in wait(pending).done if not future.cancelled()])
+                except PyMongoError:
+                    pass
+                raise
+            finally:
+                report.elapsed = time.perf_counter() - started
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return report
+
+    def _write(self, collection: str, operations: List[UpdateOne]) -> Tuple[int, int, int, List[Tuple[int, str]]]:
+        """One unordered bulk write: (inserted, modified, unchanged, [(position, error)])"""
+        if not operations:
+            return 0, 0, 0, []
+        for attempt in range(self.retries + 1):
+            try:
+                result = self.db[collection].bulk_write(operations, ordered=False)
+                return (result.upserted_count, result.modified_count,
+                        result.matched_count - result.modified_count, [])
+            except BulkWriteError as e:
+                # The other operations were applied; failed ones are data errors, not retried
+                details = e.details
+                errors = [(error['index'], error['errmsg']) for error in details.get('writeErrors', [])]
+                return (details.get('nUpserted', 0), details.get('nModified', 0),
+                        details.get('nMatched', 0) - details.get('nModified', 0), errors)
+            except PyMongoError:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+    def _load_checkpoint(self, checkpoint_path: str, path: str) -> int:
+        """Chunks already written, if the checkpoint matches this file and chunk size"""
+        try:
+            with open(checkpoint_path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        stat = os.stat(path)
+        if (checkpoint.get('size'), checkpoint.get('mtime'), checkpoint.get('chunk_size')) != (
+                stat.st_size, stat.st_mtime, self.chunk_size):
+            print(f"⚠️ Ignoring checkpoint for {path}: the file or chunk size changed")
+            return 0
+        return checkpoint.get('chunks_done', 0)
+
+    def _save_checkpoint(self, checkpoint_path: str, path: str, chunks_done: int):
+        stat = os.stat(path)
+        temp_path = f"{checkpoint_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({'size': stat.st_size, 'mtime': stat.st_mtime,
+                       'chunk_size': self.chunk_size, 'chunks_done': chunks_done}, f)
+        os.replace(temp_path, checkpoint_path)
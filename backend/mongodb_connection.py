@@ -2,23 +2,29 @@
 MongoDB Connection Module for BookMyShow
 """
 import os
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
-from dotenv import load_dotenv
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-# Load environment variables
-load_dotenv()
+# pymongo and python-dotenv are only imported on the first connection, so
+# importing this module (e.g. for Collections) is free when MongoDB is unused
+if TYPE_CHECKING:
+    from pymongo import MongoClient
 
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "bookshow")
+
+def mongodb_settings() -> tuple:
+    """MongoDB URI and database name from the environment or .env"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return (
+        os.getenv("MONGODB_URI", "mongodb://localhost:27017/"),
+        os.getenv("MONGODB_DATABASE", "bookshow")
+    )
 
 
 class MongoDBConnection:
     """Singleton class for MongoDB connection"""
     
     _instance: Optional['MongoDBConnection'] = None
-    _client: Optional[MongoClient] = None
+    _client: Optional['MongoClient'] = None
     _db = None
     
     def __new__(cls):
@@ -33,9 +39,13 @@ class MongoDBConnection:
     
     def connect(self):
         """Connect to MongoDB"""
+        from pymongo import MongoClient
+        from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+        
+        uri, database = mongodb_settings()
         try:
             self._client = MongoClient(
-                MONGODB_URI,
+                uri,
                 serverSelectionTimeoutMS=5000,
                 connectTimeoutMS=10000,
                 retryWrites=True
@@ -43,16 +53,23 @@ class MongoDBConnection:
             
             # Verify connection
             self._client.admin.command('ping')
-            self._db = self._client[MONGODB_DATABASE]
+            self._db = self._client[database]
+            
+            print(f"✅ Connected to MongoDB at {uri}")
+            print(f"📊 Database: {database}")
             
-            print(f"✅ Connected to MongoDB at {MONGODB_URI}")
-            print(f"📊 Database: {MONGODB_DATABASE}")
+            # Deployments can opt in to applying the index spec on every start-up
+            if os.getenv("MONGODB_ENSURE_INDEXES", "").lower() in ("1", "true", "yes"):
+                from backend.mongodb_indexes import apply_indexes
+                created = apply_indexes(self._db)['created']
+                if created:
+                    print(f"📊 Created indexes: {', '.join(created)}")
             
             return True
         
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             print(f"❌ Failed to connect to MongoDB: {e}")
-            print(f"   Make sure MongoDB is running at {MONGODB_URI}")
+            print(f"   Make sure MongoDB is running at {uri}")
             raise e
         except Exception as e:
             print(f"❌ Error connecting to MongoDB: {e}")
@@ -111,3 +128,4 @@ class Collections:
     BOOKINGS = "bookings"
     BOOKING_DETAILS = "booking_details"
     PAYMENTS = "payments"
+    BOOKING_SUMMARIES = "booking_summaries"
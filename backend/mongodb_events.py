@@ -0,0 +1,113 @@
+"""
+MongoDB Change Stream Adapter for BookMyShow
+Publishes seat and booking changes written to MongoDB (by any process)
+onto an in-process EventBus.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.events import BookingEvent, EventBus, SeatChangeEvent
+from backend.mongodb_connection import get_database, Collections
+from models.database import BookingStatus, SeatStatus
+
+
+class MongoChangeStreamAdapter:
+    """Watches the seats and bookings collections and republishes changes.
+
+    Change streams require a replica set or sharded cluster. Each collection
+    is watched on its own daemon thread; after an error the watch resumes
+    from the last resume token, so no change is skipped. Use it in processes
+    that do not also publish the same changes from their own services.
+    """
+
+    def __init__(self, bus: EventBus, db=None, retry_delay: float = 1.0):
+        self.bus = bus
+        self.db = db if db is not None else get_database()
+        self.retry_delay = retry_delay
+        self._running = False
+        self._threads: List[threading.Thread] = []
+        # seats document _id -> show_id, since updates only carry the _id
+        self._show_ids: Dict[Any, str] = {}
+
+    def start(self):
+        """Start watching (idempotent)"""
+        if self._running:
+            return
+        self._running = True
+        watches = [
+            (Collections.SEATS, [{'$match': {'operationType': 'update'}}], {}, self._seat_change),
+            (Collections.BOOKINGS, [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}}],
+             {'full_document': 'updateLookup'}, self._booking_change),
+        ]
+        for collection, pipeline, options, handle in watches:
+            thread = threading.Thread(
+                target=self._watch, args=(collection, pipeline, options, handle),
+                name=f"change-stream-{collection}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, wait: bool = True):
+        """Stop watching; threads exit within about a second"""
+        self._running = False
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def _watch(self, collection: str, pipeline: list, options: dict,
+               handle: Callable[[Dict[str, Any]], None]):
+        from pymongo.errors import PyMongoError
+
+        resume_token = None
+        while self._running:
+            try:
+                with self.db[collection].watch(pipeline, resume_after=resume_token,
+                                               max_await_time_ms=1000, **options) as stream:
+                    while self._running and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        resume_token = stream.resume_token
+                        try:
+                            handle(change)
+                        except Exception as e:
+                            print(f"Error handling {collection} change: {e}")
+            except PyMongoError as e:
+                print(f"Error watching {collection}: {e}")
+                time.sleep(self.retry_delay)
+
+    def _show_id(self, document_id) -> Optional[str]:
+        show_id = self._show_ids.get(document_id)
+        if show_id is None:
+            inventory = self.db[Collections.SEATS].find_one({'_id': document_id}, {'show_id': 1})
+            if inventory:
+                show_id = self._show_ids[document_id] = inventory['show_id']
+        return show_id
+
+    def _seat_change(self, change: Dict[str, Any]):
+        updated = change.get('updateDescription', {}).get('updatedFields', {})
+        by_status: Dict[str, List[str]] = {}
+        for field_name, value in updated.items():
+            if field_name.startswith('status.'):
+                by_status.setdefault(value, []).append(field_name[len('status.'):])
+        if not by_status:
+            return
+        show_id = self._show_id(change['documentKey']['_id'])
+        if show_id is None:
+            return
+        for status, seat_ids in by_status.items():
+            self.bus.publish(SeatChangeEvent(show_id, seat_ids, SeatStatus(status), "change_stream"))
+
+    def _booking_change(self, change: Dict[str, Any]):
+        if change['operationType'] == 'update':
+            updated = change.get('updateDescription', {}).get('updatedFields', {})
+            if 'status' not in updated:
+                return
+        booking = change.get('fullDocument')
+        if not booking:
+            return
+        self.bus.publish(BookingEvent(
+            booking['booking_id'], booking['user_id'], booking['show_id'], BookingStatus(booking['status'])
+        ))
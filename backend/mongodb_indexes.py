@@ -0,0 +1,144 @@
+"""
+MongoDB Index Spec for BookMyShow
+Every index the repositories rely on, declared in one place and applied
+idempotently, so a fresh database, a migration and a running deployment
+all end up with the same indexes.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.mongodb_connection import get_database, Collections
+
+ASCENDING = 1
+DESCENDING = -1
+# Case-insensitive string order, like the in-memory catalog's title.lower() sort
+CASE_INSENSITIVE = {'locale': 'en', 'strength': 2}
+
+
+class IndexConflictError(Exception):
+    """An existing index has a spec'd name or keys but different options"""
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """One index: its keys in order, whether they are unique and its collation"""
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    # Queries only use a collated index when they ask for the same collation
+    collation: Optional[Tuple[Tuple[str, Any], ...]] = None
+
+    @property
+    def name(self) -> str:
+        # MongoDB's default name, so indexes created by hand before the spec match
+        name = "_".join(f"{field}_{direction}" for field, direction in self.keys)
+        if self.collation:
+            # Sets it apart from an uncollated index on the same keys
+            name += "_" + "_".join(str(value) for _, value in self.collation)
+        return name
+
+    def matches_collation(self, info: Dict[str, Any]) -> bool:
+        """Whether an index_information() entry has this spec's collation"""
+        collation = info.get('collation')
+        if not self.collation:
+            return not collation or collation.get('locale') == 'simple'
+        return bool(collation) and all(collation.get(key) == value for key, value in self.collation)
+
+    def model(self):
+        from pymongo import IndexModel
+        options = {'collation': dict(self.collation)} if self.collation else {}
+        return IndexModel(list(self.keys), name=self.name, unique=self.unique, **options)
+
+
+def index(collection: str, *keys, unique: bool = False, collation: Optional[Dict[str, Any]] = None) -> IndexSpec:
+    """IndexSpec from field names or (field, direction) pairs"""
+    return IndexSpec(
+        collection,
+        tuple((key, ASCENDING) if isinstance(key, str) else tuple(key) for key in keys),
+        unique,
+        tuple(collation.items()) if collation else None,
+    )
+
+
+# The repository query each index serves is noted next to it
+INDEXES: List[IndexSpec] = [
+    index(Collections.USERS, "user_id", unique=True),  # get_user
+    index(Collections.USERS, "email", unique=True),  # get_user_by_email, user_exists
+    index(Collections.MOVIES, "movie_id", unique=True),  # get_movie, get_movies_by_ids
+    # get_movies_page, one per sort in MovieRepository.SORT_SPECS, with its collation
+    index(Collections.MOVIES, "title", "movie_id", collation=CASE_INSENSITIVE),
+    index(Collections.MOVIES, ("rating", DESCENDING), "title", "movie_id", collation=CASE_INSENSITIVE),
+    index(Collections.MOVIES, "duration", "title", "movie_id", collation=CASE_INSENSITIVE),
+    index(Collections.THEATERS, "theater_id", unique=True),  # get_theater, get_theaters_by_ids
+    index(Collections.SHOWS, "show_id", unique=True),  # get_availability, adjust_availability
+    # get_shows_between, get_now_playing and iter_shows: everywhere, per theater, per city
+    index(Collections.SHOWS, "start_time"),
+    index(Collections.SHOWS, "theater_id", "start_time"),
+    index(Collections.SHOWS, "city", "start_time"),
+    index(Collections.SEATS, "show_id", unique=True),  # seat transitions and statuses
+    index(Collections.BOOKINGS, "booking_id", unique=True),  # get_booking, update_booking_status
+    # query_user_bookings with and without a status; the prefix serves get_user_bookings
+    index(Collections.BOOKINGS, "user_id", "status", ("booking_date", DESCENDING), ("booking_id", DESCENDING)),
+    index(Collections.BOOKINGS, "user_id", ("booking_date", DESCENDING), ("booking_id", DESCENDING)),
+    index(Collections.BOOKING_DETAILS, "booking_id"),  # get_booking, _attach_details
+    index(Collections.PAYMENTS, "payment_id", unique=True),  # get_payment
+    index(Collections.PAYMENTS, "booking_id"),  # booking summary rebuild
+    index(Collections.BOOKING_SUMMARIES, "booking_id", unique=True),  # get_summary, $merge on rebuild
+    # get_user_summaries with and without a status
+    index(Collections.BOOKING_SUMMARIES, "user_id", "status", ("booking_date", DESCENDING),
+          ("booking_id", DESCENDING)),
+    index(Collections.BOOKING_SUMMARIES, "user_id", ("booking_date", DESCENDING), ("booking_id", DESCENDING)),
+]
+
+
+def _key_pattern(key) -> List[Tuple[str, int]]:
+    # index_information() may report directions as floats
+    return [(field, int(direction) if isinstance(direction, float) else direction) for field, direction in key]
+
+
+def apply_indexes(db=None, specs: List[IndexSpec] = INDEXES, prune: bool = False,
+                  dry_run: bool = False) -> Dict[str, List[str]]:
+    """Create missing indexes; with `prune`, drop indexes not in the spec.
+
+    Safe to run on every start-up: indexes that already exist are left
+    alone. Raises IndexConflictError, before changing anything, if an
+    existing index has a spec'd name or keys but different options, since
+    replacing it needs a planned drop. Returns the 'created' and 'dropped'
+    indexes as "collection.name".
+    """
+    db = db if db is not None else get_database()
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    plan: Dict[str, Tuple[List[IndexSpec], List[str]]] = {}
+    for collection, wanted in by_collection.items():
+        existing = db[collection].index_information()
+        missing = []
+        for spec in wanted:
+            for name, info in existing.items():
+                # Indexes on the same keys with another collation are separate indexes
+                same_index = _key_pattern(info['key']) == list(spec.keys) and spec.matches_collation(info)
+                if (name == spec.name) != same_index or (
+                        same_index and bool(info.get('unique')) != spec.unique):
+                    raise IndexConflictError(
+                        f"{collection}.{name} {info['key']} conflicts with the spec for "
+                        f"{spec.name} (unique={spec.unique}, collation={spec.collation}); "
+                        f"drop it and apply again"
+                    )
+            if spec.name not in existing:
+                missing.append(spec)
+        names = {spec.name for spec in wanted}
+        unknown = [name for name in existing if name != "_id_" and name not in names]
+        plan[collection] = (missing, unknown if prune else [])
+
+    result: Dict[str, List[str]] = {'created': [], 'dropped': []}
+    for collection, (missing, unknown) in plan.items():
+        if missing and not dry_run:
+            db[collection].create_indexes([spec.model() for spec in missing])
+        for name in unknown:
+            if not dry_run:
+                db[collection].drop_index(name)
+        result['created'] += [f"{collection}.{spec.name}" for spec in missing]
+        result['dropped'] += [f"{collection}.{name}" for name in unknown]
+    return result
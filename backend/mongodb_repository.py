@@ -2,21 +2,60 @@
 MongoDB Repository Layer for BookMyShow
 Provides database operations using MongoDB
 """
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Iterable, Iterator
+from datetime import datetime, timedelta
+from itertools import islice
 from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from pymongo import ReturnDocument
 from backend.mongodb_connection import get_database, Collections
+from backend.mongodb_indexes import CASE_INSENSITIVE
+from backend.codecs import (
+    BOOKING_CODEC, BOOKING_DETAIL_CODEC, BOOKING_SUMMARY_CODEC, MOVIE_CODEC, PAYMENT_CODEC,
+    SHOW_CODEC, THEATER_CODEC, USER_CODEC
+)
 from models.database import (
-    User, Movie, Theater, Show, Seat, Booking, BookingDetail, Payment,
+    User, Movie, Theater, Show, Seat, Booking, BookingDetail, BookingSummary, Payment,
     SeatStatus, BookingStatus
 )
 
+# Documents fetched per server round trip by the iter_* methods
+DEFAULT_BATCH_SIZE = 1000
+
 
 class MongoRepository:
     """Base repository for MongoDB operations"""
     
-    def __init__(self):
+    def __init__(self, lazy: bool = False):
         self.db = get_database()
+        # Bulk reads return models converted from raw BSON field by field, on first access
+        self.lazy = lazy
+    
+    def _reader(self, name: str):
+        """Collection for bulk reads; in lazy mode it yields undecoded RawBSONDocuments"""
+        collection = self.db[name]
+        if self.lazy:
+            return collection.with_options(
+                codec_options=collection.codec_options.with_options(document_class=RawBSONDocument)
+            )
+        return collection
+    
+    def _iter_models(self, name: str, codec, query: Optional[Dict[str, Any]] = None,
+                     projection: Optional[Dict[str, int]] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                     decode=None) -> Iterator:
+        """Stream a query as models, holding one batch of documents at a time.
+        
+        Unlike the list methods, errors propagate, so a consumer such as an
+        export cannot mistake a partial result for a complete one.
+        """
+        cursor = (
+            self._reader(name)
+            .find(query or {}, projection or codec.projection())
+            .batch_size(batch_size)
+        )
+        decode = decode or (codec.decode_lazy if self.lazy else codec.decode)
+        for document in cursor:
+            yield decode(document)
     
     def dict_to_object(self, data: Dict) -> Dict:
         """Convert MongoDB _id to string"""
@@ -32,16 +71,7 @@ class UserRepository(MongoRepository):
     def create_user(self, user: User) -> bool:
         """Create a new user"""
         try:
-            user_data = {
-                'user_id': user.user_id,
-                'name': user.name,
-                'email': user.email,
-                'phone': user.phone,
-                'password': user.password,
-                'created_at': user.created_at,
-                'wallet_balance': user.wallet_balance
-            }
-            self.db[Collections.USERS].insert_one(user_data)
+            self.db[Collections.USERS].insert_one(USER_CODEC.encode(user))
             return True
         except Exception as e:
             print(f"Error creating user: {e}")
@@ -52,15 +82,7 @@ class UserRepository(MongoRepository):
         try:
             user_data = self.db[Collections.USERS].find_one({'user_id': user_id})
             if user_data:
-                return User(
-                    user_id=user_data['user_id'],
-                    name=user_data['name'],
-                    email=user_data['email'],
-                    phone=user_data['phone'],
-                    password=user_data['password'],
-                    created_at=user_data.get('created_at', datetime.now()),
-                    wallet_balance=user_data.get('wallet_balance', 0.0)
-                )
+                return USER_CODEC.decode(user_data)
         except Exception as e:
             print(f"Error getting user: {e}")
         return None
@@ -70,15 +92,7 @@ class UserRepository(MongoRepository):
         try:
             user_data = self.db[Collections.USERS].find_one({'email': email})
             if user_data:
-                return User(
-                    user_id=user_data['user_id'],
-                    name=user_data['name'],
-                    email=user_data['email'],
-                    phone=user_data['phone'],
-                    password=user_data['password'],
-                    created_at=user_data.get('created_at', datetime.now()),
-                    wallet_balance=user_data.get('wallet_balance', 0.0)
-                )
+                return USER_CODEC.decode(user_data)
         except Exception as e:
             print(f"Error getting user by email: {e}")
         return None
@@ -97,69 +111,74 @@ class MovieRepository(MongoRepository):
     def create_movie(self, movie: Movie) -> bool:
         """Create a new movie"""
         try:
-            movie_data = {
-                'movie_id': movie.movie_id,
-                'title': movie.title,
-                'genre': movie.genre,
-                'duration': movie.duration,
-                'rating': movie.rating,
-                'language': movie.language,
-                'release_date': movie.release_date,
-                'poster_url': movie.poster_url,
-                'description': movie.description,
-                'director': movie.director,
-                'cast': movie.cast
-            }
-            self.db[Collections.MOVIES].insert_one(movie_data)
+            self.db[Collections.MOVIES].insert_one(MOVIE_CODEC.encode(movie))
             return True
         except Exception as e:
             print(f"Error creating movie: {e}")
             return False
     
-    def get_all_movies(self) -> List[Movie]:
-        """Get all movies"""
-        try:
-            movies = []
-            for movie_data in self.db[Collections.MOVIES].find():
-                movies.append(Movie(
-                    movie_id=movie_data['movie_id'],
-                    title=movie_data['title'],
-                    genre=movie_data['genre'],
-                    duration=movie_data['duration'],
-                    rating=movie_data['rating'],
-                    language=movie_data['language'],
-                    release_date=movie_data.get('release_date', datetime.now()),
-                    poster_url=movie_data['poster_url'],
-                    description=movie_data['description'],
-                    director=movie_data['director'],
-                    cast=movie_data.get('cast', [])
-                ))
-            return movies
+    def get_all_movies(self, fields: Optional[Iterable[str]] = None) -> List[Movie]:
+        """Get all movies, optionally fetching only `fields` (read no others)"""
+        try:
+            return list(self.iter_movies(fields=fields))
         except Exception as e:
             print(f"Error getting all movies: {e}")
             return []
     
+    def iter_movies(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                    fields: Optional[Iterable[str]] = None) -> Iterator[Movie]:
+        """Stream all movies in batches of `batch_size`.
+        
+        With `fields`, movies are decoded lazily even in eager mode, since
+        the fields left out are missing from the documents.
+        """
+        return self._iter_models(Collections.MOVIES, MOVIE_CODEC, projection=MOVIE_CODEC.projection(fields),
+                                 batch_size=batch_size, decode=MOVIE_CODEC.decode_lazy if fields else None)
+    
+    # Mongo sort specs matching MovieDatabase's presorted views; titles compare
+    # case-insensitively, as there, through SORT_COLLATION
+    SORT_COLLATION = CASE_INSENSITIVE
+    SORT_SPECS = {
+        'title': [('title', 1), ('movie_id', 1)],
+        'rating': [('rating', -1), ('title', 1), ('movie_id', 1)],
+        'duration': [('duration', 1), ('title', 1), ('movie_id', 1)],
+    }
+    
+    def get_movies_page(self, sort_by: str = 'title', offset: int = 0, limit: int = 12) -> List[Movie]:
+        """Get one sorted page of movies, sorted and sliced by the server"""
+        try:
+            cursor = (
+                self._reader(Collections.MOVIES).find({}, MOVIE_CODEC.projection())
+                .sort(self.SORT_SPECS[sort_by])
+                .collation(self.SORT_COLLATION)
+                .skip(offset)
+                .limit(limit)
+            )
+            return MOVIE_CODEC.decode_many(cursor, self.lazy)
+        except Exception as e:
+            print(f"Error getting movies page: {e}")
+            return []
+    
     def get_movie(self, movie_id: str) -> Optional[Movie]:
         """Get movie by ID"""
         try:
             movie_data = self.db[Collections.MOVIES].find_one({'movie_id': movie_id})
             if movie_data:
-                return Movie(
-                    movie_id=movie_data['movie_id'],
-                    title=movie_data['title'],
-                    genre=movie_data['genre'],
-                    duration=movie_data['duration'],
-                    rating=movie_data['rating'],
-                    language=movie_data['language'],
-                    release_date=movie_data.get('release_date', datetime.now()),
-                    poster_url=movie_data['poster_url'],
-                    description=movie_data['description'],
-                    director=movie_data['director'],
-                    cast=movie_data.get('cast', [])
-                )
+                return MOVIE_CODEC.decode(movie_data)
         except Exception as e:
             print(f"Error getting movie: {e}")
         return None
+    
+    def get_movies_by_ids(self, movie_ids: List[str]) -> Dict[str, Movie]:
+        """Get several movies in one query, keyed by movie_id"""
+        try:
+            cursor = self._reader(Collections.MOVIES).find(
+                {'movie_id': {'$in': list(set(movie_ids))}}, MOVIE_CODEC.projection()
+            )
+            return {movie.movie_id: movie for movie in MOVIE_CODEC.decode_many(cursor, self.lazy)}
+        except Exception as e:
+            print(f"Error getting movies by ids: {e}")
+            return {}
 
 
 class TheaterRepository(MongoRepository):
@@ -168,51 +187,262 @@ class TheaterRepository(MongoRepository):
     def create_theater(self, theater: Theater) -> bool:
         """Create a new theater"""
         try:
-            theater_data = {
-                'theater_id': theater.theater_id,
-                'name': theater.name,
-                'city': theater.city,
-                'location': theater.location,
-                'total_screens': theater.total_screens
-            }
-            self.db[Collections.THEATERS].insert_one(theater_data)
+            self.db[Collections.THEATERS].insert_one(THEATER_CODEC.encode(theater))
             return True
         except Exception as e:
             print(f"Error creating theater: {e}")
             return False
     
-    def get_all_theaters(self) -> List[Theater]:
-        """Get all theaters"""
+    def get_all_theaters(self, fields: Optional[Iterable[str]] = None) -> List[Theater]:
+        """Get all theaters, optionally fetching only `fields` (read no others)"""
         try:
-            theaters = []
-            for theater_data in self.db[Collections.THEATERS].find():
-                theaters.append(Theater(
-                    theater_id=theater_data['theater_id'],
-                    name=theater_data['name'],
-                    city=theater_data['city'],
-                    location=theater_data['location'],
-                    total_screens=theater_data['total_screens']
-                ))
-            return theaters
+            return list(self.iter_theaters(fields=fields))
         except Exception as e:
             print(f"Error getting all theaters: {e}")
             return []
     
+    def iter_theaters(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                      fields: Optional[Iterable[str]] = None) -> Iterator[Theater]:
+        """Stream all theaters in batches of `batch_size`; like iter_movies, decoded lazily with `fields`"""
+        return self._iter_models(Collections.THEATERS, THEATER_CODEC,
+                                 projection=THEATER_CODEC.projection(fields), batch_size=batch_size,
+                                 decode=THEATER_CODEC.decode_lazy if fields else None)
+    
     def get_theater(self, theater_id: str) -> Optional[Theater]:
         """Get theater by ID"""
         try:
             theater_data = self.db[Collections.THEATERS].find_one({'theater_id': theater_id})
             if theater_data:
-                return Theater(
-                    theater_id=theater_data['theater_id'],
-                    name=theater_data['name'],
-                    city=theater_data['city'],
-                    location=theater_data['location'],
-                    total_screens=theater_data['total_screens']
-                )
+                return THEATER_CODEC.decode(theater_data)
         except Exception as e:
             print(f"Error getting theater: {e}")
         return None
+    
+    def get_theaters_by_ids(self, theater_ids: List[str]) -> Dict[str, Theater]:
+        """Get several theaters in one query, keyed by theater_id"""
+        try:
+            cursor = self._reader(Collections.THEATERS).find(
+                {'theater_id': {'$in': list(set(theater_ids))}}, THEATER_CODEC.projection()
+            )
+            return {theater.theater_id: theater for theater in THEATER_CODEC.decode_many(cursor, self.lazy)}
+        except Exception as e:
+            print(f"Error getting theaters by ids: {e}")
+            return {}
+
+
+class ShowRepository(MongoRepository):
+    """Show repository for MongoDB"""
+    
+    @staticmethod
+    def _tier_key(price: float) -> str:
+        return f"{price:g}"
+    
+    def create_show(self, show: Show, city: str = "") -> bool:
+        """Create a show with its availability counters"""
+        try:
+            show_data = SHOW_CODEC.encode(show)
+            show_data.update({
+                'city': city.lower(),
+                'total_seats': show.total_seats(),
+                'available_seats': show.available_seats(),
+                'available_by_tier': {
+                    self._tier_key(price): count for price, count in show.available_by_price.items()
+                }
+            })
+            self.db[Collections.SHOWS].insert_one(show_data)
+            return True
+        except Exception as e:
+            print(f"Error creating show: {e}")
+            return False
+    
+    def adjust_availability(self, show_id: str, deltas_by_price: Dict[float, int]) -> bool:
+        """Atomically apply availability changes per price tier with $inc"""
+        try:
+            self.db[Collections.SHOWS].update_one({'show_id': show_id},
+                                                  {'$inc': self.availability_inc(deltas_by_price)})
+            return True
+        except Exception as e:
+            print(f"Error adjusting show availability: {e}")
+            return False
+    
+    @classmethod
+    def availability_inc(cls, deltas_by_price: Dict[float, int]) -> Dict[str, int]:
+        """$inc document applying per-tier availability changes to a show"""
+        inc = {'available_seats': sum(deltas_by_price.values())}
+        for price, delta in deltas_by_price.items():
+            inc[f"available_by_tier.{cls._tier_key(price)}"] = delta
+        return inc
+    
+    def _time_query(self, theater_id: Optional[str], city: Optional[str]) -> Dict[str, Any]:
+        # Equality on the partition first so the (partition, start_time) index applies
+        if theater_id:
+            return {'theater_id': theater_id}
+        if city:
+            return {'city': city.lower()}
+        return {}
+    
+    def _to_show(self, show_data: Dict) -> Show:
+        show = SHOW_CODEC.decode(show_data)
+        # Stored counters, so availability is right without loading the seats
+        if 'available_by_tier' in show_data:
+            show.available_by_price = {float(tier): count for tier, count in show_data['available_by_tier'].items()}
+            show.available_count = show_data.get('available_seats', sum(show.available_by_price.values()))
+        return show
+    
+    def iter_shows(self, theater_id: Optional[str] = None, city: Optional[str] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Show]:
+        """Stream all shows, optionally of one theater or city, with their availability counters"""
+        return self._iter_models(Collections.SHOWS, SHOW_CODEC, self._time_query(theater_id, city),
+                                 projection={'_id': 0}, batch_size=batch_size, decode=self._to_show)
+    
+    def get_shows_between(self, start: datetime, end: datetime, theater_id: Optional[str] = None,
+                          city: Optional[str] = None, limit: int = 0) -> List[Show]:
+        """Get shows starting in [start, end) in start order"""
+        try:
+            query = self._time_query(theater_id, city)
+            query['start_time'] = {'$gte': start, '$lt': end}
+            cursor = self.db[Collections.SHOWS].find(query).sort('start_time', 1).limit(limit)
+            return [self._to_show(show_data) for show_data in cursor]
+        except Exception as e:
+            print(f"Error getting shows between times: {e}")
+            return []
+    
+    def get_now_playing(self, at: datetime, max_duration: timedelta = timedelta(hours=4),
+                        theater_id: Optional[str] = None, city: Optional[str] = None) -> List[Show]:
+        """Get shows running at `at`; `max_duration` bounds the index range scanned"""
+        try:
+            query = self._time_query(theater_id, city)
+            query['start_time'] = {'$gt': at - max_duration, '$lte': at}
+            query['end_time'] = {'$gt': at}
+            cursor = self.db[Collections.SHOWS].find(query).sort('start_time', 1)
+            return [self._to_show(show_data) for show_data in cursor]
+        except Exception as e:
+            print(f"Error getting now playing shows: {e}")
+            return []
+    
+    def get_availability(self, show_id: str) -> Optional[Dict[str, Any]]:
+        """Read a show's availability counters without touching seat data"""
+        try:
+            return self.db[Collections.SHOWS].find_one(
+                {'show_id': show_id},
+                {'_id': 0, 'total_seats': 1, 'available_seats': 1, 'available_by_tier': 1}
+            )
+        except Exception as e:
+            print(f"Error getting show availability: {e}")
+        return None
+
+
+class SeatInventoryRepository(MongoRepository):
+    """Per-show seat inventory: one compact document per show in the seats collection.
+    
+    Document shape::
+    
+        {'show_id': 'S1', 'version': 3, 'available': 98,
+         'status': {'A1': 'booked', 'A2': 'available', ...},
+         'prices': {'A1': 200, 'A2': 200, ...}}
+    """
+    
+    def create_inventory(self, show: Show) -> bool:
+        """Create the seat document for a show"""
+        try:
+            inventory_data = {
+                'show_id': show.show_id,
+                'version': 0,
+                'available': show.available_seats(),
+                'status': {seat.seat_id: seat.status.value for seat in show.ensure_seats()},
+                'prices': {seat.seat_id: seat.price for seat in show.seats}
+            }
+            self.db[Collections.SEATS].insert_one(inventory_data)
+            return True
+        except Exception as e:
+            print(f"Error creating seat inventory: {e}")
+            return False
+    
+    def transition_seats(self, show_id: str, seat_ids: List[str],
+                         from_status: SeatStatus, to_status: SeatStatus) -> Optional[Dict[str, Any]]:
+        """Move seats between statuses in one conditional update.
+        
+        The update matches only if every seat is currently in `from_status`, so
+        concurrent checkouts cannot both win a seat. The show's availability
+        counters are then adjusted by price tier, so listings and
+        get_availability stay in step with the seats. Returns the updated
+        document, or None if any seat was taken.
+        """
+        if not seat_ids:
+            return None
+        try:
+            query: Dict[str, Any] = {'show_id': show_id}
+            changes: Dict[str, Any] = {}
+            for seat_id in set(seat_ids):
+                query[f"status.{seat_id}"] = from_status.value
+                changes[f"status.{seat_id}"] = to_status.value
+            
+            inc = {'version': 1}
+            delta = 0
+            if from_status == SeatStatus.AVAILABLE and to_status != SeatStatus.AVAILABLE:
+                delta = -1
+            elif from_status != SeatStatus.AVAILABLE and to_status == SeatStatus.AVAILABLE:
+                delta = 1
+            if delta:
+                inc['available'] = delta * len(changes)
+            
+            projection = {'_id': 0, 'show_id': 1, 'version': 1, 'available': 1}
+            projection.update({f"prices.{seat_id}": 1 for seat_id in set(seat_ids)})
+            inventory_data = self.db[Collections.SEATS].find_one_and_update(
+                query,
+                {'$set': changes, '$inc': inc},
+                projection=projection,
+                return_document=ReturnDocument.AFTER
+            )
+            if inventory_data:
+                prices = inventory_data.pop('prices', {})
+                if delta:
+                    self._adjust_show(show_id, prices.values(), delta)
+            return inventory_data
+        except Exception as e:
+            print(f"Error updating seat inventory: {e}")
+        return None
+    
+    def _adjust_show(self, show_id: str, prices: Iterable[float], delta: int):
+        """Move the show's availability counters by `delta` per seat at `prices`"""
+        deltas_by_price: Dict[float, int] = {}
+        for price in prices:
+            deltas_by_price[price] = deltas_by_price.get(price, 0) + delta
+        try:
+            self.db[Collections.SHOWS].update_one(
+                {'show_id': show_id}, {'$inc': ShowRepository.availability_inc(deltas_by_price)}
+            )
+        except Exception as e:
+            # The seats changed regardless; the counters are off until the next correction
+            print(f"Error adjusting show availability: {e}")
+    
+    def book_seats(self, show_id: str, seat_ids: List[str]) -> bool:
+        """Book seats only if all of them are still available"""
+        return self.transition_seats(show_id, seat_ids, SeatStatus.AVAILABLE, SeatStatus.BOOKED) is not None
+    
+    def hold_seats(self, show_id: str, seat_ids: List[str]) -> bool:
+        """Reserve seats only if all of them are still available"""
+        return self.transition_seats(show_id, seat_ids, SeatStatus.AVAILABLE, SeatStatus.RESERVED) is not None
+    
+    def release_seats(self, show_id: str, seat_ids: List[str],
+                      from_status: SeatStatus = SeatStatus.BOOKED) -> bool:
+        """Return booked or held seats to available"""
+        return self.transition_seats(show_id, seat_ids, from_status, SeatStatus.AVAILABLE) is not None
+    
+    def get_seat_statuses(self, show_id: str) -> Dict[str, SeatStatus]:
+        """Get the status of every seat in a show"""
+        try:
+            inventory_data = self.db[Collections.SEATS].find_one(
+                {'show_id': show_id}, {'_id': 0, 'status': 1}
+            )
+            if inventory_data:
+                return {
+                    seat_id: SeatStatus(status)
+                    for seat_id, status in inventory_data['status'].items()
+                }
+        except Exception as e:
+            print(f"Error getting seat statuses: {e}")
+        return {}
 
 
 class BookingRepository(MongoRepository):
@@ -221,28 +451,13 @@ class BookingRepository(MongoRepository):
     def create_booking(self, booking: Booking) -> bool:
         """Create a new booking"""
         try:
-            booking_data = {
-                'booking_id': booking.booking_id,
-                'user_id': booking.user_id,
-                'show_id': booking.show_id,
-                'booking_date': booking.booking_date,
-                'total_price': booking.total_price,
-                'status': booking.status.value,
-                'payment_method': booking.payment_method,
-                'created_at': datetime.now()
-            }
+            booking_data = BOOKING_CODEC.encode(booking)
+            booking_data['created_at'] = datetime.now()
             self.db[Collections.BOOKINGS].insert_one(booking_data)
             
             # Save booking details
             for detail in booking.booking_details:
-                detail_data = {
-                    'booking_detail_id': detail.booking_detail_id,
-                    'booking_id': detail.booking_id,
-                    'show_id': detail.show_id,
-                    'seat_id': detail.seat_id,
-                    'price': detail.price
-                }
-                self.db[Collections.BOOKING_DETAILS].insert_one(detail_data)
+                self.db[Collections.BOOKING_DETAILS].insert_one(BOOKING_DETAIL_CODEC.encode(detail))
             
             return True
         except Exception as e:
@@ -254,29 +469,11 @@ class BookingRepository(MongoRepository):
         try:
             booking_data = self.db[Collections.BOOKINGS].find_one({'booking_id': booking_id})
             if booking_data:
-                # Get booking details
-                details_data = list(self.db[Collections.BOOKING_DETAILS].find({'booking_id': booking_id}))
-                booking_details = [
-                    BookingDetail(
-                        booking_detail_id=d['booking_detail_id'],
-                        booking_id=d['booking_id'],
-                        show_id=d['show_id'],
-                        seat_id=d['seat_id'],
-                        price=d['price']
-                    )
-                    for d in details_data
-                ]
-                
-                return Booking(
-                    booking_id=booking_data['booking_id'],
-                    user_id=booking_data['user_id'],
-                    show_id=booking_data['show_id'],
-                    booking_date=booking_data.get('booking_date', datetime.now()),
-                    booking_details=booking_details,
-                    total_price=booking_data['total_price'],
-                    status=BookingStatus(booking_data.get('status', 'pending')),
-                    payment_method=booking_data.get('payment_method', 'card')
+                booking = BOOKING_CODEC.decode(booking_data)
+                booking.booking_details = BOOKING_DETAIL_CODEC.decode_many(
+                    self.db[Collections.BOOKING_DETAILS].find({'booking_id': booking_id})
                 )
+                return booking
         except Exception as e:
             print(f"Error getting booking: {e}")
         return None
@@ -284,38 +481,73 @@ class BookingRepository(MongoRepository):
     def get_user_bookings(self, user_id: str) -> List[Booking]:
         """Get all bookings for a user"""
         try:
-            bookings = []
-            for booking_data in self.db[Collections.BOOKINGS].find({'user_id': user_id}):
-                # Get booking details
-                details_data = list(self.db[Collections.BOOKING_DETAILS].find({'booking_id': booking_data['booking_id']}))
-                booking_details = [
-                    BookingDetail(
-                        booking_detail_id=d['booking_detail_id'],
-                        booking_id=d['booking_id'],
-                        show_id=d['show_id'],
-                        seat_id=d['seat_id'],
-                        price=d['price']
-                    )
-                    for d in details_data
+            return list(self.iter_bookings(user_id))
+        except Exception as e:
+            print(f"Error getting user bookings: {e}")
+            return []
+    
+    def iter_bookings(self, user_id: Optional[str] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Booking]:
+        """Stream all bookings, or one user's, with details loaded one query per batch"""
+        bookings = self._iter_models(Collections.BOOKINGS, BOOKING_CODEC,
+                                     {'user_id': user_id} if user_id else {}, batch_size=batch_size)
+        while True:
+            batch = list(islice(bookings, batch_size))
+            if not batch:
+                return
+            self._attach_details(batch)
+            yield from batch
+    
+    def query_user_bookings(self, user_id: str, status: Optional[BookingStatus] = None,
+                            start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            after: Optional[Booking] = None, limit: int = 20) -> List[Booking]:
+        """Get one newest-first page of a user's bookings.
+        
+        Filters are pushed down to the (user_id, status, booking_date) index and
+        `after` is the last booking of the previous page (keyset pagination).
+        """
+        try:
+            query: Dict[str, Any] = {'user_id': user_id}
+            if status:
+                query['status'] = status.value
+            date_range: Dict[str, Any] = {}
+            if start:
+                date_range['$gte'] = start
+            if end:
+                date_range['$lt'] = end
+            if date_range:
+                query['booking_date'] = date_range
+            if after:
+                query['$or'] = [
+                    {'booking_date': {'$lt': after.booking_date}},
+                    {'booking_date': after.booking_date, 'booking_id': {'$lt': after.booking_id}}
                 ]
-                
-                booking = Booking(
-                    booking_id=booking_data['booking_id'],
-                    user_id=booking_data['user_id'],
-                    show_id=booking_data['show_id'],
-                    booking_date=booking_data.get('booking_date', datetime.now()),
-                    booking_details=booking_details,
-                    total_price=booking_data['total_price'],
-                    status=BookingStatus(booking_data.get('status', 'pending')),
-                    payment_method=booking_data.get('payment_method', 'card')
-                )
-                bookings.append(booking)
             
+            cursor = (
+                self._reader(Collections.BOOKINGS).find(query, BOOKING_CODEC.projection())
+                .sort([('booking_date', -1), ('booking_id', -1)])
+                .limit(limit)
+            )
+            bookings = BOOKING_CODEC.decode_many(cursor, self.lazy)
+            self._attach_details(bookings)
             return bookings
         except Exception as e:
-            print(f"Error getting user bookings: {e}")
+            print(f"Error querying user bookings: {e}")
             return []
     
+    def _attach_details(self, bookings: List[Booking]):
+        """Load the details of several bookings in one query"""
+        details_by_booking: Dict[str, List[BookingDetail]] = {booking.booking_id: [] for booking in bookings}
+        if not details_by_booking:
+            return
+        details = self._reader(Collections.BOOKING_DETAILS).find(
+            {'booking_id': {'$in': list(details_by_booking)}}, BOOKING_DETAIL_CODEC.projection()
+        )
+        for detail in BOOKING_DETAIL_CODEC.decode_many(details, self.lazy):
+            details_by_booking[detail.booking_id].append(detail)
+        for booking in bookings:
+            booking.booking_details = details_by_booking[booking.booking_id]
+    
     def update_booking_status(self, booking_id: str, status: BookingStatus) -> bool:
         """Update booking status"""
         try:
@@ -335,35 +567,129 @@ class PaymentRepository(MongoRepository):
     def create_payment(self, payment: Payment) -> bool:
         """Create a new payment record"""
         try:
-            payment_data = {
-                'payment_id': payment.payment_id,
-                'booking_id': payment.booking_id,
-                'amount': payment.amount,
-                'payment_method': payment.payment_method,
-                'status': payment.status,
-                'transaction_id': payment.transaction_id,
-                'created_at': payment.created_at
-            }
-            self.db[Collections.PAYMENTS].insert_one(payment_data)
+            self.db[Collections.PAYMENTS].insert_one(PAYMENT_CODEC.encode(payment))
             return True
         except Exception as e:
             print(f"Error creating payment: {e}")
             return False
     
+    def iter_payments(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Payment]:
+        """Stream all payments in batches of `batch_size`"""
+        return self._iter_models(Collections.PAYMENTS, PAYMENT_CODEC, batch_size=batch_size)
+    
     def get_payment(self, payment_id: str) -> Optional[Payment]:
         """Get payment by ID"""
         try:
             payment_data = self.db[Collections.PAYMENTS].find_one({'payment_id': payment_id})
             if payment_data:
-                return Payment(
-                    payment_id=payment_data['payment_id'],
-                    booking_id=payment_data['booking_id'],
-                    amount=payment_data['amount'],
-                    payment_method=payment_data['payment_method'],
-                    status=payment_data['status'],
-                    transaction_id=payment_data['transaction_id'],
-                    created_at=payment_data.get('created_at', datetime.now())
-                )
+                return PAYMENT_CODEC.decode(payment_data)
         except Exception as e:
             print(f"Error getting payment: {e}")
         return None
+
+
+class BookingSummaryRepository(MongoRepository):
+    """Booking summary read model repository for MongoDB"""
+    
+    def upsert_summary(self, summary: BookingSummary) -> bool:
+        """Create or replace the summary of a booking"""
+        try:
+            self.db[Collections.BOOKING_SUMMARIES].replace_one(
+                {'booking_id': summary.booking_id}, BOOKING_SUMMARY_CODEC.encode(summary), upsert=True
+            )
+            return True
+        except Exception as e:
+            print(f"Error upserting booking summary: {e}")
+            return False
+    
+    def update_status(self, booking_id: str, status: BookingStatus,
+                      payment_id: Optional[str] = None, payment_method: Optional[str] = None) -> bool:
+        """Apply a booking state change to its summary"""
+        try:
+            changes: Dict[str, Any] = {'status': status.value}
+            if payment_id:
+                changes['payment_id'] = payment_id
+            if payment_method:
+                changes['payment_method'] = payment_method
+            self.db[Collections.BOOKING_SUMMARIES].update_one(
+                {'booking_id': booking_id}, {'$set': changes}
+            )
+            return True
+        except Exception as e:
+            print(f"Error updating booking summary: {e}")
+            return False
+    
+    def get_summary(self, booking_id: str) -> Optional[BookingSummary]:
+        """Get a booking summary by booking ID"""
+        try:
+            summary_data = self.db[Collections.BOOKING_SUMMARIES].find_one({'booking_id': booking_id})
+            if summary_data:
+                return BOOKING_SUMMARY_CODEC.decode(summary_data)
+        except Exception as e:
+            print(f"Error getting booking summary: {e}")
+        return None
+    
+    def get_user_summaries(self, user_id: str, status: Optional[BookingStatus] = None,
+                           limit: int = 20) -> List[BookingSummary]:
+        """Get a user's most recent booking summaries"""
+        try:
+            query: Dict[str, Any] = {'user_id': user_id}
+            if status:
+                query['status'] = status.value
+            cursor = (
+                self.db[Collections.BOOKING_SUMMARIES].find(query)
+                .sort([('booking_date', -1), ('booking_id', -1)])
+                .limit(limit)
+            )
+            return BOOKING_SUMMARY_CODEC.decode_many(cursor)
+        except Exception as e:
+            print(f"Error getting user booking summaries: {e}")
+            return []
+    
+    def rebuild(self) -> int:
+        """Rebuild all summaries from bookings, details, shows, movies, theaters and payments"""
+        try:
+            pipeline = [
+                {'$lookup': {'from': Collections.BOOKING_DETAILS, 'localField': 'booking_id',
+                             'foreignField': 'booking_id', 'as': 'details'}},
+                {'$lookup': {'from': Collections.SHOWS, 'localField': 'show_id',
+                             'foreignField': 'show_id', 'as': 'show'}},
+                {'$unwind': '$show'},
+                {'$lookup': {'from': Collections.MOVIES, 'localField': 'show.movie_id',
+                             'foreignField': 'movie_id', 'as': 'movie'}},
+                {'$unwind': '$movie'},
+                {'$lookup': {'from': Collections.THEATERS, 'localField': 'show.theater_id',
+                             'foreignField': 'theater_id', 'as': 'theater'}},
+                {'$unwind': '$theater'},
+                # Oldest first, so the last element is the latest payment, as in the in-memory rebuild
+                {'$lookup': {'from': Collections.PAYMENTS, 'localField': 'booking_id',
+                             'foreignField': 'booking_id',
+                             'pipeline': [{'$sort': {'created_at': 1, '_id': 1}}], 'as': 'payment'}},
+                {'$project': {
+                    '_id': 0,
+                    'booking_id': 1,
+                    'user_id': 1,
+                    'show_id': 1,
+                    'movie_title': '$movie.title',
+                    'poster_url': '$movie.poster_url',
+                    'theater_name': '$theater.name',
+                    'location': '$theater.location',
+                    'show_time': '$show.start_time',
+                    'booking_date': 1,
+                    'seats': '$details.seat_id',
+                    'total_price': 1,
+                    'status': 1,
+                    'payment_method': {'$ifNull': [
+                        {'$arrayElemAt': ['$payment.payment_method', -1]}, '$payment_method'
+                    ]},
+                    'payment_id': {'$arrayElemAt': ['$payment.payment_id', -1]}
+                }},
+                {'$merge': {'into': Collections.BOOKING_SUMMARIES, 'on': 'booking_id',
+                            'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+            ]
+            self.db[Collections.BOOKING_SUMMARIES].create_index('booking_id', unique=True)
+            self.db[Collections.BOOKINGS].aggregate(pipeline)
+            return self.db[Collections.BOOKING_SUMMARIES].count_documents({})
+        except Exception as e:
+            print(f"Error rebuilding booking summaries: {e}")
+            return 0
@@ -0,0 +1,339 @@
+"""
+Payment Gateway and Asynchronous Payment Pipeline for BookMyShow
+Checkout enqueues payments; a bounded pool of workers charges them
+against a pluggable gateway and settles the booking.
+"""
+import math
+import queue
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from backend.ids import default_id_generator
+from models.database import BookingStatus
+
+
+@dataclass
+class GatewayResult:
+    """Outcome of a charge attempt"""
+    status: str  # success, failed, pending (outcome unknown, the charge may have been captured)
+    transaction_id: str
+    message: str = ""
+
+
+class GatewayError(Exception):
+    """Transient gateway failure; the charge may be retried"""
+
+
+class GatewayTimeout(GatewayError):
+    """The gateway did not answer within the timeout"""
+
+
+class PaymentGateway(ABC):
+    """Interface every payment gateway integration implements"""
+
+    @abstractmethod
+    def charge(self, booking_id: str, amount: float, payment_method: str,
+               timeout: float, idempotency_key: Optional[str] = None) -> GatewayResult:
+        """Charge `amount`; raise GatewayError on transient failures.
+
+        Calls with the same `idempotency_key` must charge at most once, so a
+        call retried after a timeout cannot charge twice; integrations pass
+        it to the provider's idempotency header.
+        """
+
+    def lookup(self, idempotency_key: str) -> Optional[GatewayResult]:
+        """Result of the charge made with `idempotency_key`, or None if nothing was charged.
+
+        Asked after a charge timed out, since the gateway may have captured
+        it anyway. Raises GatewayError when the outcome cannot be told.
+        """
+        raise GatewayError("this gateway cannot look up charges")
+
+
+class InstantGateway(PaymentGateway):
+    """Gateway that approves every charge immediately"""
+
+    def charge(self, booking_id: str, amount: float, payment_method: str,
+               timeout: float, idempotency_key: Optional[str] = None) -> GatewayResult:
+        return GatewayResult(status="success", transaction_id=default_id_generator().next_id("TXN"))
+
+
+def fixed_latency(seconds: float) -> Callable[[random.Random], float]:
+    """Latency distribution that always returns `seconds`"""
+    return lambda rng: seconds
+
+
+def uniform_latency(low: float, high: float) -> Callable[[random.Random], float]:
+    """Latency distribution uniform between `low` and `high` seconds"""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median: float, sigma: float = 0.5) -> Callable[[random.Random], float]:
+    """Right-skewed latency distribution with the given median, like real gateways"""
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+def spiky_latency(base: Callable[[random.Random], float], spike: float,
+                  spike_rate: float) -> Callable[[random.Random], float]:
+    """Wrap a distribution so a fraction of calls take `spike` seconds instead"""
+    return lambda rng: spike if rng.random() < spike_rate else base(rng)
+
+
+class SimulatedGateway(PaymentGateway):
+    """Local payment gateway simulator for degradation testing.
+
+    Each charge samples a latency from `latency` and then fails transiently
+    with `error_rate`, declines with `decline_rate`, or never answers with
+    `hang_rate`. Calls slower than the caller's timeout raise GatewayTimeout
+    after the timeout elapses; unless the call hung, the charge still goes
+    through, as with a real gateway, and a retry with the same idempotency
+    key gets its result. Attributes can be changed while running to
+    simulate an incident.
+    """
+
+    def __init__(self, latency: Optional[Callable[[random.Random], float]] = None,
+                 error_rate: float = 0.0, decline_rate: float = 0.0, hang_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency or fixed_latency(0.05)
+        self.error_rate = error_rate
+        self.decline_rate = decline_rate
+        self.hang_rate = hang_rate
+        self.calls = 0
+        # Successful charges per idempotency key
+        self.captured: Dict[str, GatewayResult] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def charge(self, booking_id: str, amount: float, payment_method: str,
+               timeout: float, idempotency_key: Optional[str] = None) -> GatewayResult:
+        with self._lock:
+            self.calls += 1
+            if idempotency_key in self.captured:
+                return self.captured[idempotency_key]
+            hang = self._random.random() < self.hang_rate
+            delay = math.inf if hang else self.latency(self._random)
+            outcome = self._random.random()
+        approved = outcome >= self.error_rate + self.decline_rate
+        if delay > timeout:
+            time.sleep(timeout)
+            if approved and not hang:
+                self._capture(idempotency_key)
+            raise GatewayTimeout(f"gateway did not answer within {timeout}s")
+        time.sleep(delay)
+        if outcome < self.error_rate:
+            raise GatewayError("gateway unavailable")
+        if not approved:
+            return GatewayResult(status="failed", transaction_id="", message="declined")
+        return self._capture(idempotency_key)
+
+    def lookup(self, idempotency_key: str) -> Optional[GatewayResult]:
+        with self._lock:
+            return self.captured.get(idempotency_key)
+
+    def _capture(self, idempotency_key: Optional[str]) -> GatewayResult:
+        result = GatewayResult(status="success", transaction_id=default_id_generator().next_id("TXN"))
+        if idempotency_key is not None:
+            with self._lock:
+                result = self.captured.setdefault(idempotency_key, result)
+        return result
+
+
+class FakeGateway(SimulatedGateway):
+    """Simulated gateway with fixed latency and a transient error rate"""
+
+    def __init__(self, latency: float = 0.1, failure_rate: float = 0.0, seed: Optional[int] = None):
+        super().__init__(fixed_latency(latency), error_rate=failure_rate, seed=seed)
+
+
+class CircuitOpenError(GatewayError):
+    """The circuit breaker is open; the gateway is not being called"""
+
+
+class ConcurrencyLimitError(GatewayError):
+    """Too many charges are already in flight"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail fast for `reset_timeout` seconds; then one trial call is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.trips = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the gateway now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+@dataclass
+class _PaymentJob:
+    booking_id: str
+    amount: float
+    payment_method: str
+    future: Future
+
+
+class PaymentStateError(Exception):
+    """The booking is not pending, so it cannot be paid"""
+
+
+class PaymentPipeline:
+    """Queue of pending payments drained by a bounded worker pool.
+
+    Each job is charged through `PaymentService.charge` with a per-attempt
+    timeout and retried with exponential backoff on GatewayError. The
+    booking moves from PENDING to CONFIRMED or FAILED through
+    `PaymentService.record_payment`; if the last attempt timed out and the
+    gateway cannot tell whether it charged, the booking stays PENDING. A
+    booking has at most one payment in flight; paying it again joins that
+    payment.
+    """
+
+    def __init__(self, payment_service, workers: int = 4, queue_size: int = 1000, max_retries: int = 2,
+                 timeout: float = 10.0, retry_backoff: float = 0.2):
+        self.payment_service = payment_service
+        self.workers = workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.retry_backoff = retry_backoff
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        # booking_id -> future of its queued or running payment
+        self._in_flight: Dict[str, Future] = {}
+        self._in_flight_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"payment-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, booking_id: str, amount: float, payment_method: str) -> Future:
+        """Enqueue a payment; the future resolves to the recorded Payment.
+
+        Returns the in-flight payment's future if the booking is already being
+        paid. Raises PaymentStateError if the booking is not pending and
+        queue.Full when the pipeline is saturated.
+        """
+        self.start()
+        with self._in_flight_lock:
+            future = self._in_flight.get(booking_id)
+            if future is not None:
+                return future
+            booking = self.payment_service.db.get_booking(booking_id)
+            if not booking or booking.status != BookingStatus.PENDING:
+                status = booking.status.value if booking else "unknown"
+                raise PaymentStateError(f"booking {booking_id} is {status}")
+            future = Future()
+            self._queue.put_nowait(_PaymentJob(booking_id, amount, payment_method, future))
+            self._in_flight[booking_id] = future
+        return future
+
+    def pending(self) -> int:
+        """Number of payments waiting for a worker"""
+        return self._queue.qsize()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers after the queued payments are processed"""
+        with self._start_lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                self._settled(job)
+                continue
+            try:
+                result = self._charge(job)
+                payment = self.payment_service.record_payment(
+                    job.booking_id, job.amount, job.payment_method, result
+                )
+            except Exception as e:
+                self._settled(job)
+                job.future.set_exception(e)
+            else:
+                # Cleared before the result is published, so a retry after it sees the settled booking
+                self._settled(job)
+                job.future.set_result(payment)
+
+    def _settled(self, job: _PaymentJob):
+        with self._in_flight_lock:
+            if self._in_flight.get(job.booking_id) is job.future:
+                del self._in_flight[job.booking_id]
+
+    def _charge(self, job: _PaymentJob) -> GatewayResult:
+        # Retries are safe: PaymentService.charge uses the booking id as the idempotency key
+        timed_out = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.payment_service.charge(
+                    job.booking_id, job.amount, job.payment_method, self.timeout
+                )
+            except GatewayError as e:
+                timed_out = timed_out or isinstance(e, GatewayTimeout)
+                if attempt == self.max_retries:
+                    if timed_out:
+                        # A timed-out attempt may still have been captured
+                        return self.payment_service.charge_outcome(job.booking_id, e)
+                    return GatewayResult(status="failed", transaction_id="", message=str(e))
+                time.sleep(self.retry_backoff * (2 ** attempt))
+            except Exception as e:
+                # Not retryable, but the booking must still be settled
+                return GatewayResult(status="failed", transaction_id="", message=str(e))
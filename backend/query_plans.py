@@ -0,0 +1,286 @@
+"""
+Query Plan Checks for BookMyShow
+Runs every repository query against a scratch MongoDB database seeded with
+synthetic data, captures the commands the repositories actually send and
+explains them. A query fails its check if its plan scans a collection or
+examines more documents than it needs to.
+"""
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import monitoring
+
+from backend.codecs import (
+    BOOKING_CODEC, BOOKING_DETAIL_CODEC, BOOKING_SUMMARY_CODEC, MOVIE_CODEC, PAYMENT_CODEC, SHOW_CODEC,
+    THEATER_CODEC, USER_CODEC
+)
+from backend.ids import SnowflakeIdGenerator
+from backend.mongodb_connection import Collections
+from backend.mongodb_repository import (
+    BookingRepository, BookingSummaryRepository, MovieRepository, PaymentRepository,
+    SeatInventoryRepository, ShowRepository, TheaterRepository, UserRepository
+)
+from backend.scheduling import show_id_for
+from models.database import (
+    Booking, BookingDetail, BookingStatus, BookingSummary, Movie, Payment, SeatLayout, SeatStatus, Show, Theater,
+    User
+)
+
+# Commands the server can explain
+EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+# Session, routing and concern fields a captured command carries that explain rejects
+_TRANSPORT_FIELDS = {
+    'lsid', 'txnNumber', '$db', '$clusterTime', '$readPreference', '$client', 'readConcern', 'writeConcern'
+}
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Keeps the explainable commands sent while `recording` is set"""
+
+    def __init__(self):
+        self.recording = False
+        self.commands: List[Dict[str, Any]] = []
+
+    def started(self, event):
+        if self.recording and event.command_name in EXPLAINABLE:
+            self.commands.append({
+                key: value for key, value in event.command.items() if key not in _TRANSPORT_FIELDS
+            })
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@dataclass
+class PlanCheck:
+    """A repository call and how much work its queries may do.
+
+    Each command it sends may examine up to `max_ratio` documents per
+    document returned (at least one). `full_scan` marks calls that read a
+    whole collection by design, which may use a COLLSCAN.
+    """
+    name: str
+    call: Callable[[Dict[str, Any]], Any]
+    max_ratio: float = 1.0
+    full_scan: bool = False
+
+
+@dataclass
+class PlanResult:
+    check: str
+    collection: str
+    stages: List[str]
+    returned: int
+    docs_examined: int
+    keys_examined: int
+    problems: List[str] = field(default_factory=list)
+
+
+def _walk(node, visit):
+    if isinstance(node, dict):
+        visit(node)
+        for value in node.values():
+            _walk(value, visit)
+    elif isinstance(node, list):
+        for value in node:
+            _walk(value, visit)
+
+
+def summarize(check: PlanCheck, command: Dict[str, Any], explain: Dict[str, Any]) -> PlanResult:
+    """Stages and counters of an executionStats explain, judged against the check's limits"""
+    stages: List[str] = []
+    stats = {'returned': 0, 'docs': 0, 'keys': 0}
+
+    def visit_plan(node):
+        if 'stage' in node:
+            stages.append(node['stage'])
+
+    def visit(node):
+        if 'winningPlan' in node:
+            _walk(node['winningPlan'], visit_plan)
+        if 'executionStats' in node:
+            execution = node['executionStats']
+            stats['returned'] += execution.get('nReturned', 0)
+            stats['docs'] += execution.get('totalDocsExamined', 0)
+            stats['keys'] += execution.get('totalKeysExamined', 0)
+
+    _walk(explain, visit)
+    result = PlanResult(check.name, str(next(iter(command.values()))), stages,
+                        stats['returned'], stats['docs'], stats['keys'])
+    if 'COLLSCAN' in stages and not check.full_scan:
+        result.problems.append("collection scan")
+    allowed = math.ceil(max(result.returned, 1) * check.max_ratio)
+    if not check.full_scan and result.docs_examined > allowed:
+        result.problems.append(f"examined {result.docs_examined} documents for {result.returned} returned "
+                               f"(limit {allowed})")
+    return result
+
+
+def seed(db, scale: int = 1, seed_value: int = 7) -> Dict[str, Any]:
+    """Fill an empty database with synthetic catalog and booking data.
+
+    Returns sample ids and values for the checks to query with.
+    """
+    rng = random.Random(seed_value)
+    ids = SnowflakeIdGenerator(node_id=0)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    cities = [f"City {i}" for i in range(10)]
+
+    movies = [
+        Movie(f"M{i:05d}", f"Movie {rng.randrange(10 ** 6):06d}", rng.choice(["Action", "Drama", "Comedy"]),
+              rng.randrange(90, 181), round(rng.uniform(1, 10), 1), "English",
+              today - timedelta(days=rng.randrange(365)), "", "", "")
+        for i in range(200 * scale)
+    ]
+    theaters = [Theater(f"T{i:04d}", f"Theater {i}", cities[i % len(cities)], "Main Road", 4)
+                for i in range(50 * scale)]
+
+    shows, show_documents = [], []
+    layout = SeatLayout()
+    for theater in theaters:
+        for screen in range(1, theater.total_screens + 1):
+            for day in range(3):
+                for slot in (10, 13, 17, 20):
+                    start = today + timedelta(days=day, hours=slot)
+                    show = Show(show_id_for(theater.theater_id, f"SCR{screen}", start),
+                                rng.choice(movies).movie_id, theater.theater_id, start,
+                                start + timedelta(hours=3), screen_id=f"SCR{screen}", layout=layout)
+                    shows.append(show)
+                    document = SHOW_CODEC.encode(show)
+                    document.update({
+                        'city': theater.city.lower(),
+                        'total_seats': layout.capacity(),
+                        'available_seats': layout.capacity(),
+                        'available_by_tier': {
+                            ShowRepository._tier_key(price): count
+                            for price, count in layout.tier_counts().items()
+                        },
+                    })
+                    show_documents.append(document)
+
+    users = [User(f"U{i:05d}", f"User {i}", f"user{i}@example.com", "9800000000", "secret")
+             for i in range(200 * scale)]
+    bookings, details, payments, summaries = [], [], [], []
+    for user in users:
+        for _ in range(20):
+            show = rng.choice(shows)
+            booking = Booking(ids.next_id("BK"), user.user_id, show.show_id,
+                              today - timedelta(days=rng.randrange(90), minutes=rng.randrange(1440)),
+                              total_price=400.0, status=rng.choice(list(BookingStatus)))
+            seats = [f"{row}{rng.randrange(1, 11)}" for row in rng.sample("ABCDEFGHIJ", 2)]
+            bookings.append(booking)
+            details += [BookingDetail(ids.next_id("BD"), booking.booking_id, show.show_id, seat, 200.0)
+                        for seat in seats]
+            payment = Payment(ids.next_id("PAY"), booking.booking_id, 400.0, "card", "success", ids.next_id("TXN"))
+            payments.append(payment)
+            summaries.append(BookingSummary(booking.booking_id, user.user_id, show.show_id, "Movie", "",
+                                            "Theater", "Main Road", show.start_time, booking.booking_date, seats,
+                                            400.0, booking.status, "card", payment.payment_id))
+
+    db[Collections.MOVIES].insert_many([MOVIE_CODEC.encode(movie) for movie in movies])
+    db[Collections.THEATERS].insert_many([THEATER_CODEC.encode(theater) for theater in theaters])
+    db[Collections.SHOWS].insert_many(show_documents)
+    db[Collections.USERS].insert_many([USER_CODEC.encode(user) for user in users])
+    db[Collections.BOOKINGS].insert_many([BOOKING_CODEC.encode(booking) for booking in bookings])
+    db[Collections.BOOKING_DETAILS].insert_many([BOOKING_DETAIL_CODEC.encode(detail) for detail in details])
+    db[Collections.PAYMENTS].insert_many([PAYMENT_CODEC.encode(payment) for payment in payments])
+    db[Collections.BOOKING_SUMMARIES].insert_many([BOOKING_SUMMARY_CODEC.encode(s) for s in summaries])
+    seat_repo = SeatInventoryRepository()
+    for show in shows[:20]:
+        seat_repo.create_inventory(show)
+
+    user_bookings = sorted((b for b in bookings if b.user_id == users[0].user_id),
+                           key=lambda b: (b.booking_date, b.booking_id), reverse=True)
+    return {
+        'today': today,
+        'user': users[0],
+        'movie_ids': [movie.movie_id for movie in movies[:5]],
+        'theater': theaters[0],
+        'theater_ids': [theater.theater_id for theater in theaters[:5]],
+        'show': shows[0],
+        'booking': user_bookings[0],
+        'page_end': user_bookings[9],
+        'payment_id': payments[0].payment_id,
+    }
+
+
+def default_checks() -> List[PlanCheck]:
+    """A check for every query method in backend/mongodb_repository.py"""
+    users, movies, theaters = UserRepository(), MovieRepository(), TheaterRepository()
+    shows, seats, bookings = ShowRepository(), SeatInventoryRepository(), BookingRepository()
+    payments, summaries = PaymentRepository(), BookingSummaryRepository()
+    return [
+        PlanCheck("users.get_user", lambda s: users.get_user(s['user'].user_id)),
+        PlanCheck("users.get_user_by_email", lambda s: users.get_user_by_email(s['user'].email)),
+        PlanCheck("users.user_exists", lambda s: users.user_exists(s['user'].email)),
+        PlanCheck("movies.get_all_movies", lambda s: movies.get_all_movies(), full_scan=True),
+        *[PlanCheck(f"movies.get_movies_page[{sort}]", lambda s, sort=sort: movies.get_movies_page(sort, limit=24))
+          for sort in MovieRepository.SORT_SPECS],
+        PlanCheck("movies.get_movie", lambda s: movies.get_movie(s['movie_ids'][0])),
+        PlanCheck("movies.get_movies_by_ids", lambda s: movies.get_movies_by_ids(s['movie_ids'])),
+        PlanCheck("theaters.get_all_theaters", lambda s: theaters.get_all_theaters(), full_scan=True),
+        PlanCheck("theaters.get_theater", lambda s: theaters.get_theater(s['theater'].theater_id)),
+        PlanCheck("theaters.get_theaters_by_ids", lambda s: theaters.get_theaters_by_ids(s['theater_ids'])),
+        PlanCheck("shows.iter_shows[theater]", lambda s: list(shows.iter_shows(s['theater'].theater_id))),
+        PlanCheck("shows.iter_shows[city]", lambda s: list(shows.iter_shows(city=s['theater'].city))),
+        PlanCheck("shows.get_shows_between", lambda s: shows.get_shows_between(
+            s['today'], s['today'] + timedelta(days=1), limit=50)),
+        PlanCheck("shows.get_shows_between[theater]", lambda s: shows.get_shows_between(
+            s['today'], s['today'] + timedelta(days=1), theater_id=s['theater'].theater_id)),
+        PlanCheck("shows.get_shows_between[city]", lambda s: shows.get_shows_between(
+            s['today'], s['today'] + timedelta(days=1), city=s['theater'].city)),
+        # Shows that started within max_duration but have already ended are read and skipped
+        PlanCheck("shows.get_now_playing[theater]", lambda s: shows.get_now_playing(
+            s['today'] + timedelta(hours=14), theater_id=s['theater'].theater_id), max_ratio=3),
+        PlanCheck("shows.get_now_playing[city]", lambda s: shows.get_now_playing(
+            s['today'] + timedelta(hours=14), city=s['theater'].city), max_ratio=3),
+        PlanCheck("shows.get_availability", lambda s: shows.get_availability(s['show'].show_id)),
+        PlanCheck("shows.adjust_availability", lambda s: shows.adjust_availability(s['show'].show_id, {200: 0})),
+        PlanCheck("seats.hold_seats", lambda s: seats.hold_seats(s['show'].show_id, ["A1", "A2"])),
+        PlanCheck("seats.release_seats", lambda s: seats.release_seats(
+            s['show'].show_id, ["A1", "A2"], from_status=SeatStatus.RESERVED)),
+        PlanCheck("seats.get_seat_statuses", lambda s: seats.get_seat_statuses(s['show'].show_id)),
+        PlanCheck("bookings.get_booking", lambda s: bookings.get_booking(s['booking'].booking_id)),
+        PlanCheck("bookings.get_user_bookings", lambda s: bookings.get_user_bookings(s['user'].user_id)),
+        PlanCheck("bookings.query_user_bookings", lambda s: bookings.query_user_bookings(s['user'].user_id)),
+        PlanCheck("bookings.query_user_bookings[status]", lambda s: bookings.query_user_bookings(
+            s['user'].user_id, status=BookingStatus.CONFIRMED)),
+        PlanCheck("bookings.query_user_bookings[dates]", lambda s: bookings.query_user_bookings(
+            s['user'].user_id, start=s['today'] - timedelta(days=30), end=s['today'])),
+        PlanCheck("bookings.query_user_bookings[next page]", lambda s: bookings.query_user_bookings(
+            s['user'].user_id, after=s['page_end'], limit=10)),
+        PlanCheck("bookings.update_booking_status", lambda s: bookings.update_booking_status(
+            s['booking'].booking_id, s['booking'].status)),
+        PlanCheck("payments.get_payment", lambda s: payments.get_payment(s['payment_id'])),
+        PlanCheck("summaries.get_summary", lambda s: summaries.get_summary(s['booking'].booking_id)),
+        PlanCheck("summaries.get_user_summaries", lambda s: summaries.get_user_summaries(s['user'].user_id)),
+        PlanCheck("summaries.get_user_summaries[status]", lambda s: summaries.get_user_summaries(
+            s['user'].user_id, status=BookingStatus.CONFIRMED)),
+        PlanCheck("summaries.update_status", lambda s: summaries.update_status(
+            s['booking'].booking_id, s['booking'].status)),
+    ]
+
+
+def run_checks(db, recorder: CommandRecorder, sample: Dict[str, Any],
+               checks: Optional[List[PlanCheck]] = None) -> List[PlanResult]:
+    """Run each check's repository call and explain every command it sent"""
+    results = []
+    for check in checks or default_checks():
+        recorder.commands.clear()
+        recorder.recording = True
+        try:
+            check.call(sample)
+        finally:
+            recorder.recording = False
+        if not recorder.commands:
+            results.append(PlanResult(check.name, "-", [], 0, 0, 0, ["sent no query"]))
+        for command in list(recorder.commands):
+            explain = db.command({'explain': command, 'verbosity': 'executionStats'})
+            results.append(summarize(check, command, explain))
+    return results
@@ -0,0 +1,215 @@
+"""
+Show Scheduling Engine for BookMyShow
+Generates show schedules in bulk for every screen of every theater and
+detects screen conflicts with per-screen interval timelines.
+"""
+import hashlib
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models.database import Movie, SeatLayout, Show, Theater
+
+
+def show_id_for(theater_id: str, screen_id: str, start: datetime) -> str:
+    """Deterministic show id, so every worker generating the same schedule agrees on ids"""
+    return _show_id(f"{theater_id}|{screen_id}|{start.isoformat()}")
+
+
+def _show_id(natural_key: str) -> str:
+    return f"S{hashlib.blake2b(natural_key.encode(), digest_size=6).hexdigest()}"
+
+
+def screen_ids(theater: Theater) -> List[str]:
+    """Screen ids of a theater, derived from total_screens when not configured"""
+    if theater.screens:
+        return list(theater.screens)
+    return [f"SCR{i}" for i in range(1, theater.total_screens + 1)]
+
+
+@dataclass
+class ScheduleConflict:
+    """A show that cannot run as scheduled"""
+    show_id: str
+    theater_id: str
+    screen_id: str
+    reason: str
+    other_show_id: Optional[str] = None
+
+
+class ScreenTimeline:
+    """Sorted, non-overlapping (start, end, show_id) intervals of one screen.
+
+    Since the intervals never overlap, both starts and ends are sorted, so a
+    conflict check only has to look at the neighbours of the insertion point.
+    """
+
+    def __init__(self, gap: timedelta = timedelta(0)):
+        self.gap = gap
+        self._starts: List[datetime] = []
+        self._intervals: List[Tuple[datetime, datetime, str]] = []
+
+    def find_conflict(self, start: datetime, end: datetime) -> Optional[str]:
+        """Show id of an interval that overlaps [start, end) plus the gap"""
+        pos = bisect_left(self._starts, start)
+        if pos > 0:
+            _, prev_end, prev_id = self._intervals[pos - 1]
+            if prev_end + self.gap > start:
+                return prev_id
+        if pos < len(self._intervals):
+            next_start, _, next_id = self._intervals[pos]
+            if end + self.gap > next_start:
+                return next_id
+        return None
+
+    def add(self, start: datetime, end: datetime, show_id: str) -> Optional[str]:
+        """Insert an interval unless it conflicts; returns the conflicting show id"""
+        conflict = self.find_conflict(start, end)
+        if conflict is None:
+            pos = bisect_left(self._starts, start)
+            self._starts.insert(pos, start)
+            self._intervals.insert(pos, (start, end, show_id))
+        return conflict
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+
+class ScheduleEngine:
+    """Packs movies onto screens and validates schedules.
+
+    Each screen runs shows back to back from `opening` until the last show
+    that can end by `closing`, separated by `cleaning_gap` and rounded up to
+    `slot_minutes`. Screens start the day on different movies so every movie
+    plays on every screen over the week.
+    """
+
+    def __init__(self, cleaning_gap_minutes: int = 20, opening: time = time(9, 0),
+                 closing: time = time(23, 30), slot_minutes: int = 5,
+                 layout: Optional[SeatLayout] = None):
+        self.cleaning_gap = timedelta(minutes=cleaning_gap_minutes)
+        self.opening = opening
+        self.closing = closing
+        self.slot = timedelta(minutes=slot_minutes)
+        self.layout = layout or SeatLayout()
+
+    def _round_up(self, moment: datetime, day_start: datetime) -> datetime:
+        remainder = (moment - day_start) % self.slot
+        return moment + (self.slot - remainder) if remainder else moment
+
+    def _day_templates(self, durations: List[timedelta]) -> List[List[Tuple[timedelta, timedelta, int]]]:
+        """(start offset, end offset, movie index) of one screen-day, per first movie.
+
+        A screen-day depends only on the movie it starts with, so the packing
+        is done once per movie and stamped onto every screen and day.
+        """
+        opening = datetime.combine(date.min, self.opening)
+        closing = datetime.combine(date.min, self.closing) - opening
+        templates = []
+        for first in range(len(durations)):
+            template = []
+            movie_index = first
+            offset = timedelta(0)
+            while offset + durations[movie_index] <= closing:
+                end = offset + durations[movie_index]
+                template.append((offset, end, movie_index))
+                offset = self._round_up(opening + end + self.cleaning_gap, opening) - opening
+                movie_index = (movie_index + 1) % len(durations)
+            templates.append(template)
+        return templates
+
+    def _plans(self, movies: List[Movie], start_date: date, days: int) -> Dict[Tuple[int, int], list]:
+        """(day, first movie) -> [(start, end, start.isoformat(), movie)], shared by every screen"""
+        templates = self._day_templates([timedelta(minutes=movie.duration) for movie in movies])
+        plans: Dict[Tuple[int, int], list] = {}
+        for day in range(days):
+            day_start = datetime.combine(start_date + timedelta(days=day), self.opening)
+            for first, template in enumerate(templates):
+                plans[day, first] = [
+                    (day_start + start, day_start + end, (day_start + start).isoformat(), movies[movie_index])
+                    for start, end, movie_index in template
+                ]
+        return plans
+
+    def generate(self, theaters: Iterable[Theater], movies: List[Movie],
+                 start_date: Optional[date] = None, days: int = 7) -> List[Show]:
+        """Generate `days` days of shows for every screen of every theater"""
+        if not movies:
+            return []
+        plans = self._plans(movies, start_date or date.today(), days)
+        shows = []
+        for theater in theaters:
+            for screen_index, screen_id in enumerate(screen_ids(theater)):
+                key_prefix = f"{theater.theater_id}|{screen_id}|"
+                for day in range(days):
+                    for start, end, start_iso, movie in plans[day, (screen_index + day) % len(movies)]:
+                        shows.append(Show(
+                            show_id=_show_id(key_prefix + start_iso),
+                            movie_id=movie.movie_id,
+                            theater_id=theater.theater_id,
+                            start_time=start,
+                            end_time=end,
+                            language=movie.language,
+                            screen_id=screen_id,
+                            layout=self.layout
+                        ))
+        return shows
+
+    def show_theaters(self, theaters: Iterable[Theater], movies: List[Movie],
+                      start_date: Optional[date] = None, days: int = 7) -> Dict[str, str]:
+        """show_id -> theater_id of the shows `generate` would make, without making them"""
+        if not movies:
+            return {}
+        plans = self._plans(movies, start_date or date.today(), days)
+        theater_ids = {}
+        for theater in theaters:
+            for screen_index, screen_id in enumerate(screen_ids(theater)):
+                key_prefix = f"{theater.theater_id}|{screen_id}|"
+                for day in range(days):
+                    for _, _, start_iso, _ in plans[day, (screen_index + day) % len(movies)]:
+                        theater_ids[_show_id(key_prefix + start_iso)] = theater.theater_id
+        return theater_ids
+
+    def validate(self, shows: Iterable[Show], existing: Iterable[Show] = (),
+                 movies: Optional[Dict[str, Movie]] = None,
+                 theaters: Optional[Dict[str, Theater]] = None) -> List[ScheduleConflict]:
+        """Check a schedule, e.g. one imported from outside, against `existing` shows.
+
+        Reports shows that end before they start, are shorter than their
+        movie, run on an unknown screen, or overlap another show on the same
+        screen (including the cleaning gap).
+        """
+        timelines: Dict[Tuple[str, str], ScreenTimeline] = {}
+        for show in existing:
+            key = (show.theater_id, show.screen_id)
+            timeline = timelines.setdefault(key, ScreenTimeline(self.cleaning_gap))
+            timeline.add(show.start_time, show.end_time, show.show_id)
+
+        conflicts = []
+        candidates = []
+        for show in shows:
+            if show.end_time <= show.start_time:
+                conflicts.append(ScheduleConflict(
+                    show.show_id, show.theater_id, show.screen_id, "ends before it starts"))
+                continue
+            movie = movies.get(show.movie_id) if movies else None
+            if movie and show.end_time - show.start_time < timedelta(minutes=movie.duration):
+                conflicts.append(ScheduleConflict(
+                    show.show_id, show.theater_id, show.screen_id, "shorter than the movie"))
+            theater = theaters.get(show.theater_id) if theaters else None
+            if theater and show.screen_id not in screen_ids(theater):
+                conflicts.append(ScheduleConflict(
+                    show.show_id, show.theater_id, show.screen_id, "unknown screen"))
+            candidates.append(show)
+
+        # In start order most inserts append to the timeline
+        candidates.sort(key=lambda show: show.start_time)
+        for show in candidates:
+            key = (show.theater_id, show.screen_id)
+            timeline = timelines.setdefault(key, ScreenTimeline(self.cleaning_gap))
+            other = timeline.add(show.start_time, show.end_time, show.show_id)
+            if other is not None:
+                conflicts.append(ScheduleConflict(
+                    show.show_id, show.theater_id, show.screen_id, "overlaps on screen", other))
+        return conflicts
@@ -2,12 +2,22 @@
 Backend Services for BookMyShow Application
 Business Logic Layer
 """
-import uuid
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+import gc
+import threading
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import List, Optional, Dict, Union
 from models.database import (
-    Movie, Theater, Show, User, Booking, BookingDetail, Seat, Payment,
-    SeatStatus, BookingStatus, MovieDatabase
+    Movie, Theater, Show, User, Booking, BookingDetail, BookingView, BookingSummary, Seat, Payment,
+    SeatMapDelta, SeatStatus, BookingStatus, MovieDatabase
+)
+from backend.events import EventBus
+from backend.ids import IdGenerator, default_id_generator
+from backend.scheduling import ScheduleEngine
+from backend.shared_seats import SeatMapStore
+from backend.payments import (
+    CircuitBreaker, CircuitOpenError, ConcurrencyLimitError,
+    GatewayError, GatewayResult, GatewayTimeout, InstantGateway, PaymentGateway
 )
 
 
@@ -21,6 +31,19 @@ class MovieService:
         """Fetch all available movies"""
         return self.db.get_all_movies()
     
+    def get_movies_by_ids(self, movie_ids: List[str]) -> Dict[str, Movie]:
+        """Get several movies at once, keyed by movie_id"""
+        return self.db.get_movies_by_ids(movie_ids)
+    
+    def get_catalog_version(self) -> int:
+        """Version counter bumped whenever movies, theaters or shows change"""
+        return self.db.catalog_version
+    
+    def add_movie(self, movie: Movie) -> Movie:
+        """Add a movie to the catalog"""
+        self.db.add_movie(movie)
+        return movie
+    
     def get_movie_details(self, movie_id: str) -> Optional[Movie]:
         """Get detailed information about a specific movie"""
         return self.db.get_movie(movie_id)
@@ -32,6 +55,29 @@ class MovieService:
             movie for movie in self.db.get_all_movies()
             if query in movie.title.lower() or query in movie.genre.lower()
         ]
+    
+    def get_movie_count(self) -> int:
+        """Total number of movies in the catalog"""
+        return self.db.count_movies()
+    
+    def get_movies_page(self, sort_by: str = "title", offset: int = 0, limit: int = 12) -> List[Movie]:
+        """Get one page of movies from the presorted view"""
+        return self.db.get_movies_page(sort_by, offset, limit)
+    
+    def get_movies_after(self, sort_by: str = "title", cursor: Optional[str] = None,
+                         limit: int = 12) -> List[Movie]:
+        """Get the page of movies following `cursor` (the last movie_id seen)"""
+        return self.db.get_movies_after(sort_by, cursor, limit)
+    
+    def search_movies_page(self, query: str, sort_by: str = "title", offset: int = 0,
+                           limit: int = 12) -> List[Movie]:
+        """Search movies and return one page, stopping once the page is full"""
+        query = query.lower()
+        matches = (
+            movie for movie in self.db.iter_movies(sort_by)
+            if query in movie.title.lower() or query in movie.genre.lower()
+        )
+        return list(islice(matches, offset, offset + limit))
 
 
 class TheaterService:
@@ -48,83 +94,307 @@ class TheaterService:
         """Get theater information"""
         return self.db.get_theater(theater_id)
     
+    def add_theater(self, theater: Theater) -> Theater:
+        """Add a theater to the catalog"""
+        self.db.add_theater(theater)
+        return theater
+    
     def get_theaters_by_city(self, city: str) -> List[Theater]:
         """Get all theaters in a specific city"""
-        return [
-            theater for theater in self.db.get_all_theaters()
-            if theater.city.lower() == city.lower()
-        ]
+        return self.db.get_theaters_in_city(city)
 
 
 class ShowService:
     """Service for show/screening operations"""
     
-    def __init__(self, db: MovieDatabase):
+    def __init__(self, db: MovieDatabase, seat_store: Optional[SeatMapStore] = None,
+                 events: Optional[EventBus] = None, lazy_schedule: bool = False,
+                 ids: Optional[IdGenerator] = None):
         self.db = db
-        self._initialize_shows()
+        self.ids = ids or default_id_generator()
+        # Seat state shared with the other worker processes on this node, if any
+        self.seat_store = seat_store
+        self.events = events or EventBus()
+        # Seat versions count changes seen by this process; the epoch tells clients when to start over
+        self.seat_epoch = self.ids.next_id()
+        # Theaters whose sample shows are generated on first use (lazy_schedule)
+        self._unscheduled: Dict[str, Theater] = {}
+        # show_id -> theater_id of the pending shows, built on the first unknown show id
+        self._pending_show_theaters: Optional[Dict[str, str]] = None
+        self._schedule_lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
+        # Shows that ended before this have had their seat maps pruned
+        self._pruned_until = datetime.min
+        self._initialize_shows(lazy_schedule)
     
-    def _initialize_shows(self):
-        """Initialize sample shows"""
+    def _initialize_shows(self, lazy: bool = False):
+        """Initialize a week of sample shows on every screen, now or theater by theater on first use"""
         if not self.db.shows:
-            # Create sample shows
-            for movie_id in list(self.db.movies.keys())[:3]:
-                for theater_id in list(self.db.theaters.keys()):
-                    for i in range(2):  # 2 shows per movie per theater
-                        show_id = f"S{uuid.uuid4().hex[:8]}"
-                        start_time = datetime.now() + timedelta(days=i, hours=10 + i*3)
-                        end_time = start_time + timedelta(minutes=180)
-                        
-                        # Create seats (10x10 theater)
-                        seats = []
-                        for row in range(ord('A'), ord('J') + 1):
-                            for seat_num in range(1, 11):
-                                seat_id = f"{chr(row)}{seat_num}"
-                                price = 250 if seat_num > 7 else 200  # Premium seats
-                                seats.append(Seat(
-                                    seat_id=seat_id,
-                                    row=chr(row),
-                                    number=seat_num,
-                                    price=price
-                                ))
-                        
-                        show = Show(
-                            show_id=show_id,
-                            movie_id=movie_id,
-                            theater_id=theater_id,
-                            start_time=start_time,
-                            end_time=end_time,
-                            seats=seats
-                        )
-                        self.db.shows[show_id] = show
+            self._engine = ScheduleEngine()
+            self._schedule_start = date.today()
+            self._unscheduled = {theater.theater_id: theater for theater in self.db.get_all_theaters()}
+            if not lazy:
+                self._schedule()
+    
+    def _schedule(self, theater_id: Optional[str] = None, city: Optional[str] = None):
+        """Generate the pending sample shows of one theater, one city or everywhere"""
+        if not self._unscheduled or (theater_id is not None and theater_id not in self._unscheduled):
+            return
+        with self._schedule_lock:
+            if theater_id is not None:
+                pending = [theater_id] if theater_id in self._unscheduled else []
+            elif city is not None:
+                pending = [theater.theater_id for theater in self.db.get_theaters_in_city(city)
+                           if theater.theater_id in self._unscheduled]
+            else:
+                pending = list(self._unscheduled)
+            if not pending:
+                return
+            theaters = [self._unscheduled[pending_id] for pending_id in pending]
+            # Shows hold no reference cycles, so skip the collector passes their allocation triggers
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                self.db.add_shows(self._engine.generate(theaters, self.db.get_all_movies(), self._schedule_start))
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            # Only forget the theaters once their shows are visible to readers
+            for pending_id in pending:
+                del self._unscheduled[pending_id]
+    
+    def _pending_theater_of(self, show_id: str) -> Optional[str]:
+        """Theater a show id not generated yet belongs to, or None for ids no theater will have"""
+        with self._schedule_lock:
+            if self._pending_show_theaters is None:
+                # Ids only, a fraction of generating every theater's shows
+                self._pending_show_theaters = self._engine.show_theaters(
+                    list(self._unscheduled.values()), self.db.get_all_movies(), self._schedule_start
+                )
+            return self._pending_show_theaters.get(show_id)
     
     def get_shows_by_movie_and_theater(self, movie_id: str, theater_id: str) -> List[Show]:
         """Get all shows for a specific movie in a theater"""
+        self._schedule(theater_id)
         return [
-            show for show in self.db.shows.values()
-            if show.movie_id == movie_id and show.theater_id == theater_id
+            show for show in self.db.get_theater_shows(theater_id)
+            if show.movie_id == movie_id
         ]
     
     def get_show_details(self, show_id: str) -> Optional[Show]:
-        """Get show details"""
-        return self.db.shows.get(show_id)
+        """Get show details, releasing its expired holds first"""
+        show = self._load_show(show_id)
+        if show:
+            self._expire_holds(show_id)
+        return show
+    
+    def _load_show(self, show_id: str) -> Optional[Show]:
+        """The show with seat changes from other workers applied"""
+        show = self.db.get_show(show_id)
+        if show is None and self._unscheduled:
+            # Show ids are deterministic, so an id from another worker may be for a pending theater
+            theater_id = self._pending_theater_of(show_id)
+            if theater_id is None:
+                return None
+            self._schedule(theater_id)
+            show = self.db.get_show(show_id)
+        if show and self.seat_store:
+            with self.db.shard_for_show(show_id).lock:
+                changed = self.seat_store.sync(show)
+            # Changes made by other workers
+            for status in {seat.status for seat in changed}:
+                self.events.seats_changed(
+                    show_id, [seat.seat_id for seat in changed if seat.status == status], status, "sync"
+                )
+        return show
+    
+    def get_shows_between(self, start: datetime, end: datetime, theater_id: Optional[str] = None,
+                          city: Optional[str] = None) -> List[Show]:
+        """Shows starting in [start, end), optionally in one theater or city"""
+        self._schedule(theater_id, city)
+        return self.db.shows_starting_between(start, end, theater_id, city)
+    
+    def get_next_shows(self, limit: int = 10, after: Optional[datetime] = None,
+                       theater_id: Optional[str] = None, city: Optional[str] = None) -> List[Show]:
+        """The next `limit` shows starting from `after` (default: now)"""
+        self._schedule(theater_id, city)
+        return self.db.next_shows(after or datetime.now(), limit, theater_id, city)
+    
+    def get_now_playing(self, at: Optional[datetime] = None, theater_id: Optional[str] = None,
+                        city: Optional[str] = None) -> List[Show]:
+        """Shows running at `at` (default: now)"""
+        self._schedule(theater_id, city)
+        return self.db.shows_playing_at(at or datetime.now(), theater_id, city)
     
     def get_available_seats(self, show_id: str) -> List[Seat]:
         """Get all available seats for a show"""
         show = self.get_show_details(show_id)
         if not show:
             return []
-        return [seat for seat in show.seats if seat.status == SeatStatus.AVAILABLE]
+        return [seat for seat in show.ensure_seats() if seat.status == SeatStatus.AVAILABLE]
+    
+    def get_availability(self, show_id: str) -> Dict[float, int]:
+        """Available seat count per price tier, read from the show's counters"""
+        show = self.get_show_details(show_id)
+        return dict(show.available_by_price) if show else {}
+    
+    def get_seat_changes(self, show_id: str, since_version: Optional[int] = None,
+                         epoch: Optional[str] = None) -> Optional[SeatMapDelta]:
+        """Seats that changed since `since_version`, or a full snapshot when that cannot be answered"""
+        show = self.get_show_details(show_id)
+        if not show:
+            return None
+        with self.db.shard_for_show(show_id).lock:
+            changed = None
+            if since_version is not None and epoch == self.seat_epoch:
+                changed = show.seat_changes_since(since_version)
+            if changed is None:
+                return SeatMapDelta(show_id, self.seat_epoch, show.seat_version, True, list(show.ensure_seats()))
+            return SeatMapDelta(show_id, self.seat_epoch, show.seat_version, False, changed)
+    
+    def transition_seats(self, show: Show, seat_ids: List[str],
+                         expected: Union[SeatStatus, Dict[str, SeatStatus]], new: SeatStatus) -> bool:
+        """Atomically move seats from `expected` to `new` in the shared seat map.
+        
+        Fails for shows the store does not track, since other workers could not see
+        the change; on a conflict the local show is refreshed from the shared map.
+        Callers update the local seats.
+        """
+        if not self.seat_store:
+            return True
+        seat_map = self.seat_store.seat_map(show)
+        if seat_map is None:
+            print(f"Error changing seats of show {show.show_id}: it is not in the shared seat store")
+            return False
+        if seat_map.compare_and_set(seat_ids, expected, new):
+            return True
+        self.seat_store.sync(show)
+        return False
+    
+    def release_booked_seats(self, show: Show, seat_ids: List[str]) -> bool:
+        """Return a booking's seats to available; the caller holds the show's shard lock"""
+        if not self.transition_seats(show, seat_ids, SeatStatus.BOOKED, SeatStatus.AVAILABLE):
+            return False
+        for seat_id in seat_ids:
+            seat = show.get_seat(seat_id)
+            if seat:
+                show.set_seat_status(seat, SeatStatus.AVAILABLE)
+        return True
+    
+    def hold_seats(self, show_id: str, seat_ids: List[str], user_id: str,
+                   ttl_minutes: int = 10) -> bool:
+        """Reserve available seats for a user until the hold expires"""
+        show = self.get_show_details(show_id)
+        if not show:
+            return False
+        shard = self.db.shard_for_show(show_id)
+        with shard.lock:
+            seats = [show.get_seat(seat_id) for seat_id in seat_ids]
+            if any(seat is None or seat.status != SeatStatus.AVAILABLE for seat in seats):
+                return False
+            if not self.transition_seats(show, seat_ids, SeatStatus.AVAILABLE, SeatStatus.RESERVED):
+                return False
+            
+            expires_at = datetime.now() + timedelta(minutes=ttl_minutes)
+            holds = shard.seat_holds.setdefault(show_id, {})
+            for seat in seats:
+                show.set_seat_status(seat, SeatStatus.RESERVED)
+                holds[seat.seat_id] = (user_id, expires_at)
+        self.events.seats_changed(show_id, seat_ids, SeatStatus.RESERVED, "held", user_id=user_id)
+        return True
+    
+    def release_seats(self, show_id: str, seat_ids: List[str], reason: str = "released") -> int:
+        """Release held seats back to available"""
+        show = self._load_show(show_id)
+        shard = self.db.shard_for_show(show_id)
+        released = []
+        with shard.lock:
+            holds = shard.seat_holds.get(show_id, {})
+            for seat_id in seat_ids:
+                if holds.pop(seat_id, None) is None:
+                    continue
+                seat = show.get_seat(seat_id) if show else None
+                if seat and seat.status == SeatStatus.RESERVED and self.transition_seats(
+                    show, [seat_id], SeatStatus.RESERVED, SeatStatus.AVAILABLE
+                ):
+                    show.set_seat_status(seat, SeatStatus.AVAILABLE)
+                    released.append(seat_id)
+        self.events.seats_changed(show_id, released, SeatStatus.AVAILABLE, reason)
+        return len(released)
+    
+    def _expire_holds(self, show_id: str, now: Optional[datetime] = None) -> int:
+        """Release the show's holds whose expiry has passed"""
+        holds = self.db.shard_for_show(show_id).seat_holds.get(show_id)
+        if not holds:
+            return 0
+        now = now or datetime.now()
+        expired = [seat_id for seat_id, (_, expires_at) in list(holds.items()) if expires_at <= now]
+        return self.release_seats(show_id, expired, reason="expired") if expired else 0
+    
+    def release_expired_holds(self, now: Optional[datetime] = None) -> int:
+        """Release every hold whose expiry has passed.
+        
+        Holds of a show also expire whenever the show is read, so a lapsed
+        hold never blocks a booking; this sweeps the shows nobody is viewing.
+        """
+        released = 0
+        for shard in list(self.db.shards.values()):
+            for show_id in list(shard.seat_holds):
+                released += self._expire_holds(show_id, now)
+        return released
+    
+    def prune_seat_maps(self, now: Optional[datetime] = None) -> int:
+        """Drop the shared seat maps of shows that have ended since the last prune"""
+        if not self.seat_store:
+            return 0
+        now = now or datetime.now()
+        ended = [show for show in list(self.db.shows.values())
+                 if self._pruned_until < show.end_time <= now]
+        self._pruned_until = now
+        return self.seat_store.prune(ended) if ended else 0
+    
+    def start_sweeper(self, interval_seconds: float = 30.0):
+        """Release expired holds and prune ended shows' seat maps in the background (idempotent)"""
+        with self._schedule_lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper_stop.clear()
+            self._sweeper = threading.Thread(target=self._sweep, args=(interval_seconds,),
+                                             name="hold-sweeper", daemon=True)
+            self._sweeper.start()
+    
+    def stop_sweeper(self):
+        with self._schedule_lock:
+            sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None:
+            self._sweeper_stop.set()
+            sweeper.join()
+    
+    def _sweep(self, interval_seconds: float):
+        while not self._sweeper_stop.wait(interval_seconds):
+            try:
+                self.release_expired_holds()
+                self.prune_seat_maps()
+            except Exception as e:
+                print(f"Error sweeping seat holds: {e}")
+    
+    def is_held_by(self, show_id: str, seat_id: str, user_id: str) -> bool:
+        """Whether a seat is on an unexpired hold for this user"""
+        hold = self.db.shard_for_show(show_id).seat_holds.get(show_id, {}).get(seat_id)
+        return bool(hold) and hold[0] == user_id and hold[1] > datetime.now()
 
 
 class UserService:
     """Service for user operations"""
     
-    def __init__(self, db: MovieDatabase):
+    def __init__(self, db: MovieDatabase, ids: Optional[IdGenerator] = None):
         self.db = db
+        self.ids = ids or default_id_generator()
     
     def create_user(self, name: str, email: str, phone: str, password: str) -> User:
         """Create a new user"""
-        user_id = f"U{uuid.uuid4().hex[:8]}"
+        user_id = self.ids.next_id("U")
         user = User(
             user_id=user_id,
             name=name,
@@ -147,53 +417,157 @@ class UserService:
         return None
 
 
+class BookingSummaryService:
+    """Maintains the denormalized booking summary read model"""
+    
+    def __init__(self, db: MovieDatabase):
+        self.db = db
+    
+    def project(self, booking: Booking, payment: Optional[Payment] = None) -> Optional[BookingSummary]:
+        """Build or refresh the summary of a booking and store it"""
+        show = self.db.get_show(booking.show_id)
+        if not show:
+            return None
+        previous = self.db.get_booking_summary(booking.booking_id)
+        if previous and previous.show_id == booking.show_id:
+            # Catalog fields never change for a booking, only its state does
+            movie_title, poster_url = previous.movie_title, previous.poster_url
+            theater_name, location = previous.theater_name, previous.location
+        else:
+            movie = self.db.get_movie(show.movie_id)
+            theater = self.db.get_theater(show.theater_id)
+            if not movie or not theater:
+                return None
+            movie_title, poster_url = movie.title, movie.poster_url
+            theater_name, location = theater.name, theater.location
+        
+        summary = BookingSummary(
+            booking_id=booking.booking_id,
+            user_id=booking.user_id,
+            show_id=booking.show_id,
+            movie_title=movie_title,
+            poster_url=poster_url,
+            theater_name=theater_name,
+            location=location,
+            show_time=show.start_time,
+            booking_date=booking.booking_date,
+            seats=[detail.seat_id for detail in booking.booking_details],
+            total_price=booking.total_price,
+            status=booking.status,
+            payment_method=payment.payment_method if payment else booking.payment_method,
+            payment_id=payment.payment_id if payment else (previous.payment_id if previous else None)
+        )
+        self.db.put_booking_summary(summary)
+        return summary
+    
+    def get_summary(self, booking_id: str) -> Optional[BookingSummary]:
+        """Single-key read of a booking summary"""
+        return self.db.get_booking_summary(booking_id)
+    
+    def get_summaries(self, booking_ids: List[str]) -> List[BookingSummary]:
+        """Summaries for the given bookings, in order, skipping unknown ids"""
+        summaries = []
+        for booking_id in booking_ids:
+            summary = self.db.get_booking_summary(booking_id)
+            if summary:
+                summaries.append(summary)
+        return summaries
+    
+    def rebuild(self) -> int:
+        """Rebuild every summary from bookings, payments and the catalog"""
+        payments = {payment.booking_id: payment for payment in self.db.payments.values()}
+        self.db.booking_summaries.clear()
+        count = 0
+        for view in BookingService.build_views(self.db, list(self.db.bookings.values())):
+            booking = view.booking
+            payment = payments.get(booking.booking_id)
+            self.db.put_booking_summary(BookingSummary(
+                booking_id=booking.booking_id,
+                user_id=booking.user_id,
+                show_id=booking.show_id,
+                movie_title=view.movie_title,
+                poster_url=view.poster_url,
+                theater_name=view.theater_name,
+                location=view.location,
+                show_time=view.show_time,
+                booking_date=booking.booking_date,
+                seats=view.seats,
+                total_price=booking.total_price,
+                status=booking.status,
+                payment_method=payment.payment_method if payment else booking.payment_method,
+                payment_id=payment.payment_id if payment else None
+            ))
+            count += 1
+        return count
+
+
 class BookingService:
     """Service for booking operations"""
     
-    def __init__(self, db: MovieDatabase, show_service: ShowService):
+    def __init__(self, db: MovieDatabase, show_service: ShowService, ids: Optional[IdGenerator] = None):
         self.db = db
         self.show_service = show_service
+        self.ids = ids or show_service.ids
+        self.summaries = BookingSummaryService(db)
     
     def create_booking(self, user_id: str, show_id: str, seat_ids: List[str]) -> Optional[Booking]:
         """Create a new booking"""
+        if not seat_ids or len(set(seat_ids)) != len(seat_ids):
+            return None
         show = self.show_service.get_show_details(show_id)
         user = self.db.get_user(user_id)
         
         if not show or not user:
             return None
         
-        # Validate all seats are available
-        for seat_id in seat_ids:
-            seat = next((s for s in show.seats if s.seat_id == seat_id), None)
-            if not seat or seat.status != SeatStatus.AVAILABLE:
+        # Seat checks and updates happen under the show's city shard lock
+        shard = self.db.shard_for_show(show_id)
+        with shard.lock:
+            # Validate all seats are available or held by this user
+            for seat_id in seat_ids:
+                seat = show.get_seat(seat_id)
+                if not seat:
+                    return None
+                if seat.status != SeatStatus.AVAILABLE and not (
+                    seat.status == SeatStatus.RESERVED
+                    and self.show_service.is_held_by(show_id, seat_id, user_id)
+                ):
+                    return None
+            expected = {seat_id: show.get_seat(seat_id).status for seat_id in seat_ids}
+            if not self.show_service.transition_seats(show, seat_ids, expected, SeatStatus.BOOKED):
                 return None
-        
-        # Create booking
-        booking_id = f"B{uuid.uuid4().hex[:8]}"
-        booking = Booking(
-            booking_id=booking_id,
-            user_id=user_id,
-            show_id=show_id,
-            booking_date=datetime.now()
-        )
-        
-        # Add seats to booking
-        for seat_id in seat_ids:
-            seat = next(s for s in show.seats if s.seat_id == seat_id)
-            booking_detail = BookingDetail(
-                booking_detail_id=f"BD{uuid.uuid4().hex[:8]}",
+            
+            # Create booking
+            booking_id = self.ids.next_id("B")
+            booking = Booking(
                 booking_id=booking_id,
+                user_id=user_id,
                 show_id=show_id,
-                seat_id=seat_id,
-                price=seat.price
+                booking_date=datetime.now()
             )
-            booking.add_seat(booking_detail)
-            # Mark seat as booked
-            seat.status = SeatStatus.BOOKED
-        
-        self.db.add_booking(booking)
-        user.add_booking(booking)
+            
+            # Add seats to booking
+            for seat_id in seat_ids:
+                seat = show.get_seat(seat_id)
+                booking_detail = BookingDetail(
+                    booking_detail_id=self.ids.next_id("BD"),
+                    booking_id=booking_id,
+                    show_id=show_id,
+                    seat_id=seat_id,
+                    price=seat.price
+                )
+                booking.add_seat(booking_detail)
+                # Mark seat as booked
+                show.set_seat_status(seat, SeatStatus.BOOKED)
+                shard.seat_holds.get(show_id, {}).pop(seat_id, None)
+            
+            self.db.add_booking(booking)
+            user.add_booking(booking)
+            self.summaries.project(booking)
         
+        events = self.show_service.events
+        events.seats_changed(show_id, seat_ids, SeatStatus.BOOKED, "booked", booking_id, user_id)
+        events.booking_changed(booking_id, user_id, show_id, booking.status)
         return booking
     
     def get_booking(self, booking_id: str) -> Optional[Booking]:
@@ -204,60 +578,218 @@ class BookingService:
         """Get all bookings of a user"""
         return self.db.get_user_bookings(user_id)
     
+    def query_user_bookings(self, user_id: str, status: Optional[BookingStatus] = None,
+                            start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            cursor: Optional[str] = None, limit: int = 20) -> List[Booking]:
+        """Get one newest-first page of a user's bookings filtered by status and date range"""
+        return self.db.query_user_bookings(user_id, status, start, end, cursor, limit)
+    
+    def count_user_bookings(self, user_id: str, status: Optional[BookingStatus] = None) -> int:
+        """Count a user's bookings without loading them"""
+        return self.db.count_user_bookings(user_id, status)
+    
+    def get_user_total_spent(self, user_id: str) -> float:
+        """Total amount across all of a user's bookings"""
+        return self.db.get_user_total_spent(user_id)
+    
+    def get_booking_views(self, bookings: List[Booking]) -> List[BookingView]:
+        """Join bookings with their show, movie and theater in one batch per table.
+        
+        Repeated shows, movies and theaters are looked up once, so the cost is
+        three batched lookups regardless of the number of bookings.
+        """
+        return self.build_views(self.db, bookings)
+    
+    def get_booking_summaries(self, bookings: List[Booking]) -> List[BookingSummary]:
+        """Read the precomputed summaries of the given bookings"""
+        return self.summaries.get_summaries([booking.booking_id for booking in bookings])
+    
+    @staticmethod
+    def build_views(db: MovieDatabase, bookings: List[Booking]) -> List[BookingView]:
+        shows = db.get_shows_by_ids({b.show_id for b in bookings})
+        movies = db.get_movies_by_ids({show.movie_id for show in shows.values()})
+        theaters = db.get_theaters_by_ids({show.theater_id for show in shows.values()})
+        
+        views = []
+        for booking in bookings:
+            show = shows.get(booking.show_id)
+            movie = movies.get(show.movie_id) if show else None
+            theater = theaters.get(show.theater_id) if show else None
+            if not show or not movie or not theater:
+                continue
+            views.append(BookingView(
+                booking=booking,
+                movie_title=movie.title,
+                poster_url=movie.poster_url,
+                theater_name=theater.name,
+                location=theater.location,
+                show_time=show.start_time,
+                seats=[detail.seat_id for detail in booking.booking_details]
+            ))
+        return views
+    
     def cancel_booking(self, booking_id: str) -> bool:
         """Cancel a booking"""
         booking = self.get_booking(booking_id)
-        if not booking or booking.status == BookingStatus.CANCELLED:
+        if not booking:
             return False
         
         show = self.show_service.get_show_details(booking.show_id)
         if not show:
             return False
         
-        # Free up seats
-        for detail in booking.booking_details:
-            seat = next((s for s in show.seats if s.seat_id == detail.seat_id), None)
-            if seat:
-                seat.status = SeatStatus.AVAILABLE
+        # Free up seats; a failed booking's seats were already released with its payment
+        with self.db.shard_for_show(booking.show_id).lock:
+            if booking.status not in (BookingStatus.PENDING, BookingStatus.CONFIRMED):
+                return False
+            seat_ids = [detail.seat_id for detail in booking.booking_details]
+            if not self.show_service.release_booked_seats(show, seat_ids):
+                print(f"Error cancelling booking {booking_id}: its seats are no longer booked")
+                return False
+            self.db.update_booking_status(booking, BookingStatus.CANCELLED)
         
-        booking.status = BookingStatus.CANCELLED
+        self.summaries.project(booking)
+        events = self.show_service.events
+        events.seats_changed(booking.show_id, seat_ids, SeatStatus.AVAILABLE, "cancelled",
+                             booking_id, booking.user_id)
+        events.booking_changed(booking_id, booking.user_id, booking.show_id, booking.status)
         return True
 
 
 class PaymentService:
     """Service for payment operations"""
     
-    def __init__(self, db: MovieDatabase):
+    def __init__(self, db: MovieDatabase, gateway: Optional[PaymentGateway] = None,
+                 max_concurrent_charges: int = 32, breaker: Optional[CircuitBreaker] = None,
+                 events: Optional[EventBus] = None, ids: Optional[IdGenerator] = None,
+                 show_service: Optional[ShowService] = None):
         self.db = db
+        # Frees the seats of failed payments in the shared seat map too, if there is one
+        self.show_service = show_service
+        self.summaries = BookingSummaryService(db)
+        self.events = events or (show_service.events if show_service else EventBus())
+        self.ids = ids or default_id_generator()
+        self.gateway = gateway or InstantGateway()
+        self.breaker = breaker or CircuitBreaker()
+        self._charge_slots = threading.BoundedSemaphore(max_concurrent_charges)
     
-    def process_payment(self, booking_id: str, amount: float, payment_method: str) -> Optional[Payment]:
-        """Process payment for a booking"""
+    def charge(self, booking_id: str, amount: float, payment_method: str,
+               timeout: float = 10.0) -> GatewayResult:
+        """Call the gateway behind the concurrency limit and circuit breaker.
+        
+        The booking id is the idempotency key, so retrying a charge cannot
+        charge twice. Raises GatewayError (or a subclass) when the charge
+        should be retried; other gateway exceptions are raised as GatewayError.
+        """
+        if not self._charge_slots.acquire(timeout=timeout):
+            raise ConcurrencyLimitError("too many payments in flight")
+        try:
+            if not self.breaker.allow():
+                raise CircuitOpenError("payment gateway circuit is open")
+            try:
+                result = self.gateway.charge(booking_id, amount, payment_method, timeout,
+                                             idempotency_key=booking_id)
+            except GatewayError:
+                self.breaker.record_failure()
+                raise
+            except Exception as e:
+                # Any failure must end a half-open trial, or the circuit never closes again
+                self.breaker.record_failure()
+                raise GatewayError(f"gateway error: {e}") from e
+            self.breaker.record_success()
+            return result
+        finally:
+            self._charge_slots.release()
+    
+    def process_payment(self, booking_id: str, amount: float, payment_method: str,
+                        timeout: float = 10.0) -> Optional[Payment]:
+        """Process payment for a booking inline, blocking on the gateway"""
+        if not self.db.get_booking(booking_id):
+            return None
+        
+        try:
+            result = self.charge(booking_id, amount, payment_method, timeout)
+        except GatewayTimeout as e:
+            result = self.charge_outcome(booking_id, e)
+        except GatewayError as e:
+            result = GatewayResult(status="failed", transaction_id="", message=str(e))
+        return self.record_payment(booking_id, amount, payment_method, result)
+    
+    def charge_outcome(self, booking_id: str, error: Exception) -> GatewayResult:
+        """Result of a charge whose last attempt timed out, asked of the gateway.
+        
+        "pending" if the gateway cannot tell; paying again with the same
+        idempotency key settles it without charging twice.
+        """
+        try:
+            result = self.gateway.lookup(booking_id)
+        except Exception as e:
+            return GatewayResult(status="pending", transaction_id="", message=f"{error}; lookup failed: {e}")
+        return result or GatewayResult(status="failed", transaction_id="", message=str(error))
+    
+    def record_payment(self, booking_id: str, amount: float, payment_method: str,
+                       result: GatewayResult) -> Optional[Payment]:
+        """Store a gateway result and settle a PENDING booking as CONFIRMED or FAILED.
+        
+        A failed payment gives the booking's seats back; a pending one (the
+        charge may have been captured) leaves the booking and its seats as
+        they are. Returns None if the booking is unknown or was already
+        settled or cancelled; the late result is still stored, so a captured
+        charge can be refunded.
+        """
         booking = self.db.get_booking(booking_id)
         if not booking:
             return None
         
-        # Simulate payment processing
-        payment_id = f"P{uuid.uuid4().hex[:8]}"
-        transaction_id = f"TXN{uuid.uuid4().hex[:12]}"
-        
-        # In real scenario: integrate with payment gateway
         payment = Payment(
-            payment_id=payment_id,
+            payment_id=self.ids.next_id("P"),
             booking_id=booking_id,
             amount=amount,
             payment_method=payment_method,
-            status="success",  # Simulate successful payment
-            transaction_id=transaction_id
+            status=result.status,
+            transaction_id=result.transaction_id
         )
+        seat_ids = [detail.seat_id for detail in booking.booking_details]
+        # cancel_booking changes the same booking under this lock
+        with self.db.shard_for_show(booking.show_id).lock:
+            self.db.payments[payment.payment_id] = payment
+            if booking.status != BookingStatus.PENDING:
+                print(f"Payment {payment.payment_id} ({payment.status}) arrived for "
+                      f"{booking.status.value} booking {booking_id}; not applied")
+                return None
+            if payment.status == "pending":
+                print(f"Payment {payment.payment_id} for booking {booking_id} has an unknown outcome; "
+                      f"booking left pending")
+                return payment
+            
+            if payment.status == "success":
+                self.db.update_booking_status(booking, BookingStatus.CONFIRMED)
+            else:
+                self.db.update_booking_status(booking, BookingStatus.FAILED)
+                self._release_seats(booking, seat_ids)
+            self.summaries.project(booking, payment)
+            status = booking.status
         
-        self.db.payments[payment_id] = payment
-        
-        # Update booking status
-        if payment.status == "success":
-            booking.status = BookingStatus.CONFIRMED
-        
+        if status == BookingStatus.FAILED:
+            self.events.seats_changed(booking.show_id, seat_ids, SeatStatus.AVAILABLE, "payment_failed",
+                                      booking_id, booking.user_id)
+        self.events.booking_changed(booking_id, booking.user_id, booking.show_id, status)
         return payment
     
+    def _release_seats(self, booking: Booking, seat_ids: List[str]):
+        show = self.db.get_show(booking.show_id)
+        if not show:
+            return
+        if self.show_service:
+            if not self.show_service.release_booked_seats(show, seat_ids):
+                print(f"Error releasing seats of failed booking {booking.booking_id}")
+            return
+        # Without a ShowService there is no shared seat map, only the local seats
+        for seat_id in seat_ids:
+            seat = show.get_seat(seat_id)
+            if seat and seat.status == SeatStatus.BOOKED:
+                show.set_seat_status(seat, SeatStatus.AVAILABLE)
+    
     def get_payment(self, payment_id: str) -> Optional[Payment]:
         """Get payment details"""
         return self.db.payments.get(payment_id)
@@ -0,0 +1,560 @@
+"""
+Shared Seat State for BookMyShow
+Keeps one seat-status array per show outside the Python heap, either in
+shared memory or in a memory-mapped inventory file, so every Streamlit
+worker process on a node sees the same live seat map, with an atomic
+compare-and-set for holds and bookings.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Union, TYPE_CHECKING
+
+from models.database import Seat, SeatStatus, Show
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# multiprocessing and tempfile are imported by SharedSeatStore only, so
+# pages that never share seat state do not pay for them at import
+if TYPE_CHECKING:
+    from multiprocessing import shared_memory
+
+STATUS_CODES = {SeatStatus.AVAILABLE: 0, SeatStatus.RESERVED: 1, SeatStatus.BOOKED: 2}
+CODE_STATUSES = {code: status for status, code in STATUS_CODES.items()}
+
+# Header of every seat block: capacity, version
+_HEADER = struct.Struct("<II")
+
+
+class _FileLock:
+    """Exclusive lock on a file, shared by unrelated processes and by threads"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+        self._thread_lock.release()
+
+
+def _digest(show: Show, size: int = 8) -> bytes:
+    return hashlib.blake2b(show.natural_key().encode(), digest_size=size).digest()
+
+
+def _open_segment(name: str, size: int = 0) -> 'shared_memory.SharedMemory':
+    """Create (size > 0) or attach to a segment without the resource tracker owning it.
+
+    By default Python unlinks every segment a process touched when that
+    process exits, which would wipe the seat map of the other workers.
+    """
+    from multiprocessing import resource_tracker, shared_memory
+
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=size > 0, size=size, track=False)
+    segment = shared_memory.SharedMemory(name=name, create=size > 0, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _unlink_segment(segment: 'shared_memory.SharedMemory'):
+    """Remove a segment opened by _open_segment; workers still attached keep their mapping"""
+    tracked = sys.version_info < (3, 13)
+    if tracked:
+        from multiprocessing import resource_tracker
+        # unlink() unregisters the segment, so hand it back to the tracker first
+        resource_tracker.register(segment._name, "shared_memory")
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        # Another worker removed it first
+        if tracked:
+            resource_tracker.unregister(segment._name, "shared_memory")
+
+
+class SharedSeatMap:
+    """Seat statuses of one show in a shared buffer.
+
+    The buffer holds a header (capacity, version) and one status byte per
+    seat, in the order of the show's seat layout. Writers serialize on a
+    lock file; the version is bumped on every change so readers can skip
+    unchanged maps.
+    """
+
+    def __init__(self, buf: memoryview, lock_path: str, seat_ids: List[str]):
+        self.buf = buf
+        self.lock = _FileLock(lock_path)
+        self.seat_ids = seat_ids
+        self._index = {seat_id: i for i, seat_id in enumerate(seat_ids)}
+
+    @property
+    def version(self) -> int:
+        return _HEADER.unpack_from(self.buf, 0)[1]
+
+    def codes(self) -> memoryview:
+        """Zero-copy view of the status bytes"""
+        return self.buf[_HEADER.size:_HEADER.size + len(self.seat_ids)]
+
+    def status(self, seat_id: str) -> Optional[SeatStatus]:
+        index = self._index.get(seat_id)
+        if index is None:
+            return None
+        return CODE_STATUSES[self.buf[_HEADER.size + index]]
+
+    def statuses(self) -> Dict[str, SeatStatus]:
+        """Snapshot of every seat's status"""
+        codes = bytes(self.codes())
+        return {seat_id: CODE_STATUSES[code] for seat_id, code in zip(self.seat_ids, codes)}
+
+    def compare_and_set(self, seat_ids: Iterable[str],
+                        expected: Union[SeatStatus, Dict[str, SeatStatus]],
+                        new: SeatStatus) -> bool:
+        """Set all seats to `new` if every seat is in its expected status, else change nothing.
+
+        `expected` is one status for all seats or a status per seat id.
+        """
+        seat_ids = list(seat_ids)
+        indexes = [self._index.get(seat_id) for seat_id in seat_ids]
+        if any(index is None for index in indexes):
+            return False
+        buf = self.buf
+        with self.lock:
+            for seat_id, index in zip(seat_ids, indexes):
+                want = expected[seat_id] if isinstance(expected, dict) else expected
+                if buf[_HEADER.size + index] != STATUS_CODES[want]:
+                    return False
+            code = STATUS_CODES[new]
+            for index in indexes:
+                buf[_HEADER.size + index] = code
+            capacity, version = _HEADER.unpack_from(buf, 0)
+            _HEADER.pack_into(buf, 0, capacity, (version + 1) & 0xFFFFFFFF)
+            self._written()
+        return True
+
+    def _written(self):
+        """Hook run under the lock after a change"""
+
+    def release(self):
+        self.buf.release()
+
+
+class SeatMapStore(ABC):
+    """Seat maps of the shows on this node, keyed by show_id within a process"""
+
+    def __init__(self, lock_dir: str):
+        self.lock_dir = lock_dir
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._maps: Dict[str, SharedSeatMap] = {}
+        # show_id -> map version last copied into the local Show
+        self._synced: Dict[str, int] = {}
+
+    def _lock_path(self, show: Show) -> str:
+        return os.path.join(self.lock_dir, f"{_digest(show).hex()}.lock")
+
+    @abstractmethod
+    def seat_map(self, show: Show, create: bool = True) -> Optional[SharedSeatMap]:
+        """The show's seat map; None if it has none and `create` is off or unsupported"""
+
+    def sync(self, show: Show) -> List[Seat]:
+        """Copy the shared statuses into the local show; returns the seats that changed"""
+        seat_map = self.seat_map(show, create=False)
+        if seat_map is None or self._synced.get(show.show_id) == seat_map.version:
+            return []
+        version = seat_map.version
+        changed = []
+        if not show.seats and show.layout and not any(seat_map.codes()):
+            # Every seat is still available, which is what unbuilt seats start as
+            self._synced[show.show_id] = version
+            return changed
+        for seat_id, status in seat_map.statuses().items():
+            seat = show.get_seat(seat_id)
+            if seat.status != status:
+                show.set_seat_status(seat, status)
+                changed.append(seat)
+        self._synced[show.show_id] = version
+        return changed
+
+    def prune(self, shows: Iterable[Show]) -> int:
+        """Drop the seat maps and lock files of shows that are over; returns how many maps were dropped"""
+        pruned = 0
+        for show in shows:
+            seat_map = self._maps.pop(show.show_id, None)
+            self._synced.pop(show.show_id, None)
+            if seat_map is not None:
+                seat_map.release()
+                pruned += 1
+            try:
+                os.unlink(self._lock_path(show))
+            except FileNotFoundError:
+                pass
+        return pruned
+    
+    def close(self):
+        for seat_map in self._maps.values():
+            seat_map.release()
+        self._maps.clear()
+        self._synced.clear()
+
+
+class SharedSeatStore(SeatMapStore):
+    """Seat maps in shared memory, one segment per show.
+
+    Segments are named after the show's natural key rather than show_id,
+    because every worker generates its own show ids. They are created on
+    the first hold or booking of a show; until then every worker already
+    agrees that all seats are available. Segments of shows that are over
+    are removed by `prune`.
+    """
+
+    # Seconds a missing segment is remembered, so reads of shows nobody has
+    # booked do not probe shared memory every time
+    MISS_TTL = 1.0
+
+    def __init__(self, namespace: str = "bms", lock_dir: Optional[str] = None):
+        import tempfile
+
+        super().__init__(lock_dir or os.path.join(tempfile.gettempdir(), f"{namespace}_seat_locks"))
+        self.namespace = namespace
+        self._segments: Dict[str, 'shared_memory.SharedMemory'] = {}
+        # show_id -> monotonic time a segment was last found missing
+        self._missing: Dict[str, float] = {}
+
+    def segment_name(self, show: Show) -> str:
+        # POSIX shared memory names are limited to ~30 characters on some systems
+        return f"{self.namespace}_{_digest(show).hex()}"
+
+    def seat_map(self, show: Show, create: bool = True) -> Optional[SharedSeatMap]:
+        seat_map = self._maps.get(show.show_id)
+        if seat_map is not None:
+            return seat_map
+        if not create and time.monotonic() - self._missing.get(show.show_id, -self.MISS_TTL) < self.MISS_TTL:
+            return None
+        name = self.segment_name(show)
+        lock_path = self._lock_path(show)
+        try:
+            segment = _open_segment(name)
+        except FileNotFoundError:
+            if not create:
+                self._missing[show.show_id] = time.monotonic()
+                return None
+            seats = show.ensure_seats()
+            with _FileLock(lock_path):
+                try:
+                    segment = _open_segment(name)
+                except FileNotFoundError:
+                    segment = _open_segment(name, _HEADER.size + len(seats))
+                    _HEADER.pack_into(segment.buf, 0, len(seats), 0)
+                    for i, seat in enumerate(seats):
+                        segment.buf[_HEADER.size + i] = STATUS_CODES[seat.status]
+        self._missing.pop(show.show_id, None)
+        self._segments[show.show_id] = segment
+        seat_map = SharedSeatMap(segment.buf, lock_path, show.seat_ids())
+        self._maps[show.show_id] = seat_map
+        return seat_map
+
+    def prune(self, shows: Iterable[Show]) -> int:
+        """Also unlink the shows' segments, for every worker on the node"""
+        shows = list(shows)
+        pruned = super().prune(shows)
+        for show in shows:
+            self._missing.pop(show.show_id, None)
+            segment = self._segments.pop(show.show_id, None)
+            if segment is not None:
+                segment.close()
+                _unlink_segment(segment)
+                continue
+            try:
+                segment = _open_segment(self.segment_name(show))
+            except FileNotFoundError:
+                continue
+            segment.close()
+            _unlink_segment(segment)
+        return pruned
+
+    def close(self, unlink: bool = False):
+        """Detach from all segments; unlink removes them for every worker"""
+        self._maps.clear()
+        self._synced.clear()
+        self._missing.clear()
+        for segment in self._segments.values():
+            segment.close()
+            if unlink:
+                _unlink_segment(segment)
+        self._segments.clear()
+
+
+class _FileSeatMap(SharedSeatMap):
+    """Seat map inside the inventory file; changes are written back to disk"""
+
+    def __init__(self, inventory: "SeatInventoryFile", offset: int, lock_path: str,
+                 seat_ids: List[str]):
+        size = _HEADER.size + len(seat_ids)
+        super().__init__(inventory.view[offset:offset + size], lock_path, seat_ids)
+        self._mmap = inventory.mmap
+        # mmap.flush needs a page-aligned offset
+        self._flush_offset = offset - offset % mmap.ALLOCATIONGRANULARITY
+        self._flush_size = offset + size - self._flush_offset
+
+    def _written(self):
+        self._mmap.flush(self._flush_offset, self._flush_size)
+
+
+class SeatInventoryFile(SeatMapStore):
+    """Seat maps of many shows in one memory-mapped file.
+
+    Layout: a file header (magic, format version, show count), an index of
+    (natural-key digest, offset) entries sorted by digest, then one seat
+    block per show, 8-byte aligned, in the same format as a shared memory
+    segment. Opening only maps the file; shows are found by binary search
+    in the mapped index, reads are views into the mapping and every change
+    flushes its page to disk. Shows missing from the file, e.g. those of a
+    worker started on a later day, get a shared memory segment under the
+    same seat locks until `build` folds them into the file. Every open
+    inventory holds a shared lock on `<path>.inuse`, so the file is never
+    replaced or rewritten under running workers.
+    """
+
+    MAGIC = b"BMSSEAT1"
+    FORMAT_VERSION = 1
+    _FILE_HEADER = struct.Struct("<8sII")
+    _ENTRY = struct.Struct("<8sQ")
+
+    def __init__(self, path: str, lock_dir: Optional[str] = None):
+        super().__init__(lock_dir or f"{path}.locks")
+        self.path = path
+        # Shows not in the file; the namespace is per file, and short enough for shared memory names
+        namespace = "bmsf" + hashlib.blake2b(os.path.abspath(path).encode(), digest_size=3).hexdigest()
+        self.overflow = SharedSeatStore(namespace, self.lock_dir)
+        # Taken before mapping, so a rebuild in progress finishes first
+        self._usage_fd = self._lock_usage(path)
+        try:
+            self._file = open(path, "r+b")
+        except OSError:
+            if self._usage_fd is not None:
+                os.close(self._usage_fd)
+            raise
+        self.mmap = mmap.mmap(self._file.fileno(), 0)
+        self.view = memoryview(self.mmap)
+        magic, version, self.count = self._FILE_HEADER.unpack_from(self.view, 0)
+        if magic != self.MAGIC or version != self.FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a seat inventory file")
+
+    @classmethod
+    def build(cls, path: str, shows: Iterable[Show],
+              previous: Optional["SeatInventoryFile"] = None) -> "SeatInventoryFile":
+        """Write a file for `shows` and open it.
+
+        Statuses come from `previous` for shows it already holds, in the file
+        or in its overflow segments, else from the shows themselves. The file
+        is written next to `path` and moved into place, so readers never see
+        a partial file.
+        """
+        blocks = []
+        folded = []
+        for show in shows:
+            offset = previous._find(show) if previous else None
+            overflow = previous.overflow.seat_map(show, create=False) if previous and offset is None else None
+            if offset is not None:
+                capacity, version = _HEADER.unpack_from(previous.view, offset)
+                codes = bytes(previous.view[offset + _HEADER.size:offset + _HEADER.size + capacity])
+            elif overflow is not None:
+                codes = bytes(overflow.codes())
+                version = overflow.version
+                folded.append(show)
+            elif show.seats or not show.layout:
+                codes = bytes(STATUS_CODES[seat.status] for seat in show.seats)
+                version = 0
+            else:
+                codes = bytes(show.layout.capacity())
+                version = 0
+            blocks.append((_digest(show), codes, version))
+        blocks.sort(key=lambda block: block[0])
+
+        offset = cls._FILE_HEADER.size + cls._ENTRY.size * len(blocks)
+        index = bytearray()
+        data = bytearray()
+        for digest, codes, version in blocks:
+            padding = -(offset + len(data)) % 8
+            data += bytes(padding)
+            index += cls._ENTRY.pack(digest, offset + len(data))
+            data += _HEADER.pack(len(codes), version) + codes
+
+        usage_fd = previous._usage_fd if previous else cls._lock_usage(path, shared=False)
+        if previous:
+            cls._claim_usage(previous._usage_fd, path)
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(cls._FILE_HEADER.pack(cls.MAGIC, cls.FORMAT_VERSION, len(blocks)))
+                f.write(index)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            # No other worker has the file open, so nobody is using these segments
+            if folded:
+                previous.overflow.prune(folded)
+        finally:
+            if previous:
+                # Back to a shared lock, which the new inventory below shares
+                cls._claim_usage(usage_fd, path, shared=True)
+            elif usage_fd is not None:
+                os.close(usage_fd)
+        return cls(path, previous.lock_dir if previous else None)
+
+    @classmethod
+    def _lock_usage(cls, path: str, shared: bool = True) -> Optional[int]:
+        """Open and lock `<path>.inuse`: shared for users of the file, exclusive to replace it"""
+        if not fcntl:
+            # Windows cannot replace a mapped file in the first place
+            return None
+        fd = os.open(f"{path}.inuse", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            cls._claim_usage(fd, path, shared)
+        except Exception:
+            os.close(fd)
+            raise
+        return fd
+
+    @staticmethod
+    def _claim_usage(fd: Optional[int], path: str, shared: bool = False):
+        """Convert the usage lock; an exclusive claim fails at once while other workers have the file open"""
+        if fd is None:
+            return
+        if shared:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RuntimeError(f"{path} is in use by running workers; stop them first") from None
+
+    @classmethod
+    def open_or_build(cls, path: str, shows: List[Show]) -> "SeatInventoryFile":
+        """Open the file, first rebuilding it if any of `shows` is missing"""
+        if not os.path.exists(path):
+            return cls.build(path, shows)
+        inventory = cls(path)
+        if all(inventory._find(show) is not None for show in shows):
+            return inventory
+        try:
+            return cls.build(path, shows, previous=inventory)
+        finally:
+            inventory.close()
+
+    def release_holds(self) -> int:
+        """Make every reserved seat available again; holds do not outlive their workers.
+
+        Only safe while no worker is running, e.g. before a full restart;
+        raises RuntimeError if another process has the file open.
+        """
+        self._claim_usage(self._usage_fd, self.path)
+        try:
+            return self._release_holds()
+        finally:
+            self._claim_usage(self._usage_fd, self.path, shared=True)
+
+    def _release_holds(self) -> int:
+        reserved = STATUS_CODES[SeatStatus.RESERVED]
+        available = STATUS_CODES[SeatStatus.AVAILABLE]
+        released = 0
+        for i in range(self.count):
+            digest, offset = self._ENTRY.unpack_from(
+                self.view, self._FILE_HEADER.size + i * self._ENTRY.size
+            )
+            start = offset + _HEADER.size
+            end = start + _HEADER.unpack_from(self.view, offset)[0]
+            if reserved not in self.view[start:end].tobytes():
+                continue
+            with _FileLock(os.path.join(self.lock_dir, f"{digest.hex()}.lock")):
+                codes = self.view[start:end].tobytes()
+                released += codes.count(reserved)
+                self.view[start:end] = codes.replace(bytes([reserved]), bytes([available]))
+                capacity, version = _HEADER.unpack_from(self.view, offset)
+                _HEADER.pack_into(self.view, offset, capacity, (version + 1) & 0xFFFFFFFF)
+        self.mmap.flush()
+        return released
+
+    def _find(self, show: Show) -> Optional[int]:
+        """Offset of the show's seat block, by binary search over the index"""
+        digest = _digest(show)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry_digest, offset = self._ENTRY.unpack_from(
+                self.view, self._FILE_HEADER.size + mid * self._ENTRY.size
+            )
+            if entry_digest < digest:
+                lo = mid + 1
+            elif entry_digest > digest:
+                hi = mid
+            else:
+                return offset
+        return None
+
+    def seat_map(self, show: Show, create: bool = True) -> Optional[SharedSeatMap]:
+        seat_map = self._maps.get(show.show_id)
+        if seat_map is not None:
+            return seat_map
+        offset = self._find(show)
+        if offset is None:
+            return self.overflow.seat_map(show, create)
+        seat_ids = show.seat_ids()
+        if _HEADER.unpack_from(self.view, offset)[0] != len(seat_ids):
+            return None
+        seat_map = _FileSeatMap(self, offset, self._lock_path(show), seat_ids)
+        self._maps[show.show_id] = seat_map
+        return seat_map
+
+    def prune(self, shows: Iterable[Show]) -> int:
+        shows = list(shows)
+        return super().prune(shows) + self.overflow.prune(shows)
+
+    def close(self):
+        super().close()
+        self.overflow.close()
+        self.view.release()
+        self.mmap.close()
+        self._file.close()
+        if self._usage_fd is not None:
+            os.close(self._usage_fd)
+            self._usage_fd = None
+
+
+def seat_store_from_env() -> Optional[SeatMapStore]:
+    """Seat store configured by the environment, or None.
+
+    BMS_SEAT_FILE names a seat inventory file (used when it exists),
+    BMS_SHARED_SEATS a shared memory namespace.
+    """
+    path = os.environ.get("BMS_SEAT_FILE")
+    if path and os.path.exists(path):
+        return SeatInventoryFile(path)
+    namespace = os.environ.get("BMS_SHARED_SEATS")
+    return SharedSeatStore(namespace) if namespace else None
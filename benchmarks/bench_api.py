@@ -0,0 +1,172 @@
+"""
+JSON API Throughput Benchmark
+Replays a browse-and-book mix (catalog page, shows, seat map, booking,
+payment) against the ASGI API and reports requests/second and latency per
+concurrency level.
+
+By default requests are dispatched to the ASGI app in-process, which
+measures the handlers and services without a server. With --url the same
+mix is sent over HTTP to a running server (e.g. `uvicorn backend.api:app
+--workers 4`), one keep-alive connection per client.
+
+Usage: python benchmarks/bench_api.py --requests 5000 --concurrency 1 16 64
+       python benchmarks/bench_api.py --url http://127.0.0.1:8000 --concurrency 16 64
+"""
+import argparse
+import asyncio
+import gzip
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.api import BookMyShowApi
+
+
+class InProcessClient:
+    """Calls the ASGI app directly, the way a server would"""
+
+    def __init__(self, app: BookMyShowApi, gzip_responses: bool):
+        self.app = app
+        self.headers = [(b"accept-encoding", b"gzip")] if gzip_responses else []
+
+    async def request(self, method: str, path: str, body: dict = None):
+        path, _, query = path.partition("?")
+        scope = {"type": "http", "method": method, "path": path,
+                 "query_string": query.encode(), "headers": self.headers}
+        payload = json.dumps(body).encode() if body is not None else b""
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app(scope, receive, send)
+        headers = dict(sent[0]["headers"])
+        raw = sent[1]["body"]
+        if headers.get(b"content-encoding") == b"gzip":
+            raw = gzip.decompress(raw)
+        return sent[0]["status"], json.loads(raw)
+
+
+class HttpClient:
+    """One keep-alive HTTP connection; blocking calls run in a thread"""
+
+    def __init__(self, url: str, gzip_responses: bool):
+        parsed = urlparse(url)
+        self.connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+        self.headers = {"Content-Type": "application/json"}
+        if gzip_responses:
+            self.headers["Accept-Encoding"] = "gzip"
+        self._lock = threading.Lock()
+
+    def _request(self, method: str, path: str, body: dict = None):
+        with self._lock:
+            payload = json.dumps(body) if body is not None else None
+            self.connection.request(method, path, body=payload, headers=self.headers)
+            response = self.connection.getresponse()
+            raw = response.read()
+            if response.getheader("Content-Encoding") == "gzip":
+                raw = gzip.decompress(raw)
+            return response.status, json.loads(raw)
+
+    async def request(self, method: str, path: str, body: dict = None):
+        return await asyncio.to_thread(self._request, method, path, body)
+
+
+async def client_loop(client, user_id: str, show_ids: list, count: int, latencies: list, errors: list):
+    """Each iteration is one request of the browse-and-book mix"""
+    for i in range(count):
+        show_id = show_ids[i % len(show_ids)]
+        step = i % 5
+        started = time.perf_counter()
+        if step == 0:
+            status, _ = await client.request("GET", "/api/movies?limit=12")
+        elif step == 1:
+            status, _ = await client.request("GET", "/api/shows?limit=50")
+        elif step == 2:
+            status, seat_map = await client.request("GET", f"/api/shows/{show_id}/seats")
+        elif step == 3:
+            free = [seat[0] for seat in seat_map.get("seats", []) if seat[3] == "available"][:2]
+            status, booking = await client.request("POST", "/api/bookings", {
+                "user_id": user_id, "show_id": show_id, "seat_ids": free
+            })
+        else:
+            if status == 201:
+                status, _ = await client.request(
+                    "POST", f"/api/bookings/{booking['booking_id']}/payment",
+                    {"user_id": user_id, "payment_method": "card"}
+                )
+            else:
+                status, _ = await client.request("GET", f"/api/shows/{show_id}")
+        latencies.append(time.perf_counter() - started)
+        if status >= 500:
+            errors.append(status)
+
+
+async def run(make_client, requests: int, concurrency: int) -> dict:
+    setup = make_client()
+    _, user = await setup.request("POST", "/api/users", {
+        "name": "Bench", "email": "bench@example.com", "phone": "0", "password": "bench"
+    })
+    _, shows = await setup.request("GET", "/api/shows?limit=500")
+    show_ids = [show["show_id"] for show in shows["shows"]]
+
+    clients = [make_client() for _ in range(concurrency)]
+    latencies, errors = [], []
+    per_client = max(1, requests // concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client_loop(client, user["user_id"], show_ids[i::concurrency] or show_ids,
+                    per_client, latencies, errors)
+        for i, client in enumerate(clients)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--no-gzip", action="store_true", help="do not ask for compressed responses")
+    args = parser.parse_args()
+
+    gzip_responses = not args.no_gzip
+    if args.url:
+        make_client = lambda: HttpClient(args.url, gzip_responses)
+    else:
+        app = BookMyShowApi()
+        app.startup()
+        make_client = lambda: InProcessClient(app, gzip_responses)
+
+    print(f"{'clients':>8} {'requests/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'5xx':>6}")
+    for concurrency in args.concurrency:
+        r = asyncio.run(run(make_client, args.requests, concurrency))
+        print(f"{r['concurrency']:>8} {r['throughput']:>12.1f} {r['p50_ms']:>10.2f} "
+              f"{r['p99_ms']:>10.2f} {r['errors']:>6}")
+
+    if not args.url:
+        app.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Cold Start Benchmark
+Reports where import time goes (python -X importtime) and how long a fresh
+process takes to import the backend, build the services the Streamlit pages
+use and answer the first catalog and show requests.
+
+Every run starts a new interpreter, so nothing is warm but the OS page
+cache. --theaters adds synthetic theaters to show how start-up scales with
+the catalog; --eager generates every show at start-up instead of per
+theater on first use.
+
+Usage: python benchmarks/bench_cold_start.py --repeat 7 --theaters 0 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Runs in the child process; prints one JSON line of timings in milliseconds
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from models.database import MovieDatabase, Theater
+from backend.services import MovieService, ShowService
+imported = time.perf_counter()
+db = MovieDatabase()
+for i in range({theaters}):
+    db.add_theater(Theater(f"BT{{i}}", f"Bench {{i}}", f"City {{i % 20}}", "Main Road", 4))
+show_service = ShowService(db, lazy_schedule={lazy})
+movie_service = MovieService(db)
+built = time.perf_counter()
+movie_service.get_all_movies()
+theater = db.get_all_theaters()[0]
+show_service.get_shows_by_movie_and_theater(db.get_all_movies()[0].movie_id, theater.theater_id)
+first = time.perf_counter()
+print(json.dumps({{
+    "import": (imported - started) * 1000,
+    "services": (built - imported) * 1000,
+    "first_request": (first - built) * 1000,
+    "total": (first - started) * 1000,
+    "modules": len(sys.modules),
+}}))
+"""
+
+
+def import_report(module: str, top: int):
+    """Slowest modules by cumulative import time when importing `module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": str(ROOT)}
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    rows.sort(reverse=True)
+    print(f"Import time of {module} ({len(rows)} modules)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    print()
+
+
+def startup(theaters: int, lazy: bool) -> dict:
+    script = STARTUP_SCRIPT.format(root=str(ROOT), theaters=theaters, lazy=lazy)
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7, help="fresh processes per configuration")
+    parser.add_argument("--theaters", type=int, nargs="+", default=[0, 500],
+                        help="synthetic theaters added to the sample data")
+    parser.add_argument("--eager", action="store_true", help="generate every show at start-up")
+    parser.add_argument("--module", default="backend.services", help="module for the import report")
+    parser.add_argument("--top", type=int, default=15, help="modules listed in the import report")
+    args = parser.parse_args()
+
+    import_report(args.module, args.top)
+
+    print(f"Fresh-process start-up, median of {args.repeat} ({'eager' if args.eager else 'lazy'} schedule)")
+    print(f"{'theaters':>9} {'import ms':>10} {'services ms':>12} {'first req ms':>13} "
+          f"{'total ms':>10} {'modules':>8}")
+    for theaters in args.theaters:
+        runs = [startup(theaters, not args.eager) for _ in range(args.repeat)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{theaters:>9} {median['import']:>10.1f} {median['services']:>12.1f} "
+              f"{median['first_request']:>13.1f} {median['total']:>10.1f} {median['modules']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Checkout Under Gateway Degradation Benchmark
+Runs the payment pipeline against SimulatedGateway scenarios (slow, spiky,
+flaky, hanging, outage) and reports throughput, tail latency, outcomes and
+circuit breaker trips.
+
+Usage: python benchmarks/bench_gateway_degradation.py --payments 300 --workers 16 --timeout 1.0
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import MovieDatabase, Booking, BookingStatus
+from backend.services import ShowService, PaymentService
+from backend.payments import (
+    CircuitBreaker, PaymentPipeline, SimulatedGateway, lognormal_latency, spiky_latency
+)
+
+SCENARIOS = {
+    'healthy': lambda: SimulatedGateway(lognormal_latency(0.05, 0.4), seed=1),
+    'slow': lambda: SimulatedGateway(lognormal_latency(0.3, 0.6), seed=1),
+    'spiky': lambda: SimulatedGateway(spiky_latency(lognormal_latency(0.05, 0.4), 2.0, 0.05), seed=1),
+    'flaky': lambda: SimulatedGateway(lognormal_latency(0.05, 0.4), error_rate=0.2, seed=1),
+    'declining': lambda: SimulatedGateway(lognormal_latency(0.05, 0.4), decline_rate=0.1, seed=1),
+    'hanging': lambda: SimulatedGateway(lognormal_latency(0.05, 0.4), hang_rate=0.1, seed=1),
+    'outage': lambda: SimulatedGateway(lognormal_latency(0.05, 0.4), error_rate=1.0, seed=1),
+}
+
+
+def percentile(values, pct: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run(name: str, args) -> dict:
+    db = MovieDatabase()
+    ShowService(db)
+    show_id = next(iter(db.shows))
+    for i in range(args.payments):
+        db.add_booking(Booking(
+            booking_id=f"BENCH{i}", user_id="UBENCH", show_id=show_id,
+            booking_date=datetime.now(), total_price=200.0
+        ))
+    
+    gateway = SCENARIOS[name]()
+    breaker = CircuitBreaker(failure_threshold=args.breaker_threshold, reset_timeout=args.breaker_reset)
+    payment_service = PaymentService(db, gateway, max_concurrent_charges=args.max_concurrent,
+                                     breaker=breaker)
+    pipeline = PaymentPipeline(payment_service, workers=args.workers, queue_size=args.payments,
+                               max_retries=args.retries, timeout=args.timeout, retry_backoff=0.05)
+    
+    start = time.perf_counter()
+    submitted = []
+    for i in range(args.payments):
+        submitted.append((time.perf_counter(), pipeline.submit(f"BENCH{i}", 200.0, "card")))
+    latencies = []
+    for submitted_at, future in submitted:
+        future.result()
+        latencies.append(time.perf_counter() - submitted_at)
+    elapsed = time.perf_counter() - start
+    pipeline.shutdown()
+    
+    latencies.sort()
+    return {
+        'scenario': name,
+        'throughput': args.payments / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'confirmed': db.count_user_bookings("UBENCH", BookingStatus.CONFIRMED),
+        'failed': db.count_user_bookings("UBENCH", BookingStatus.FAILED),
+        'calls': gateway.calls,
+        'trips': breaker.trips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--max-concurrent", type=int, default=16, help="client-side in-flight charge limit")
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-attempt gateway timeout in seconds")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--breaker-threshold", type=int, default=5)
+    parser.add_argument("--breaker-reset", type=float, default=1.0)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    args = parser.parse_args()
+    
+    print(f"{'scenario':>10} {'payments/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'confirmed':>10} {'failed':>7} {'calls':>6} {'trips':>6}")
+    for name in args.scenarios:
+        r = run(name, args)
+        print(f"{r['scenario']:>10} {r['throughput']:>11.1f} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['p99_ms']:>8.0f} {r['confirmed']:>10} {r['failed']:>7} {r['calls']:>6} {r['trips']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Payment Pipeline Throughput Benchmark
+Pushes bookings through PaymentPipeline against a local FakeGateway and
+reports payments/second and latency per worker count.
+
+Usage: python benchmarks/bench_payment_pipeline.py --payments 500 --latency 0.05 --workers 1 4 16
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import MovieDatabase, Booking, BookingStatus
+from backend.services import ShowService, PaymentService
+from backend.payments import FakeGateway, PaymentPipeline
+
+
+def run(payments: int, workers: int, latency: float, failure_rate: float) -> dict:
+    db = MovieDatabase()
+    ShowService(db)
+    show_id = next(iter(db.shows))
+    for i in range(payments):
+        db.add_booking(Booking(
+            booking_id=f"BENCH{i}", user_id="UBENCH", show_id=show_id,
+            booking_date=datetime.now(), total_price=200.0
+        ))
+    
+    gateway = FakeGateway(latency=latency, failure_rate=failure_rate, seed=42)
+    payment_service = PaymentService(db, gateway, max_concurrent_charges=workers)
+    pipeline = PaymentPipeline(payment_service, workers=workers,
+                               queue_size=payments, retry_backoff=0.0)
+    
+    start = time.perf_counter()
+    submitted = {}
+    futures = []
+    for i in range(payments):
+        future = pipeline.submit(f"BENCH{i}", 200.0, "card")
+        submitted[future] = time.perf_counter()
+        futures.append(future)
+    
+    latencies = []
+    for future in futures:
+        future.result()
+        latencies.append(time.perf_counter() - submitted[future])
+    elapsed = time.perf_counter() - start
+    pipeline.shutdown()
+    
+    latencies.sort()
+    return {
+        'workers': workers,
+        'throughput': payments / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'confirmed': db.count_user_bookings("UBENCH", BookingStatus.CONFIRMED),
+        'failed': db.count_user_bookings("UBENCH", BookingStatus.FAILED),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="gateway latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    
+    print(f"{'workers':>8} {'payments/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'confirmed':>10} {'failed':>8}")
+    for workers in args.workers:
+        r = run(args.payments, workers, args.latency, args.failure_rate)
+        print(f"{r['workers']:>8} {r['throughput']:>12.1f} {r['p50_ms']:>10.1f} "
+              f"{r['p99_ms']:>10.1f} {r['confirmed']:>10} {r['failed']:>8}")
+
+
+if __name__ == "__main__":
+    main()
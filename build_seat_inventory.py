@@ -0,0 +1,49 @@
+"""
+Seat Inventory Build Tool for BookMyShow
+Creates or extends the memory-mapped seat inventory file before workers start
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from models.database import MovieDatabase
+from backend.services import ShowService
+from backend.shared_seats import SeatInventoryFile
+
+
+def build_seat_inventory(path: str, release_holds: bool = False):
+    """Make sure the inventory file covers every scheduled show"""
+
+    print(f"🪑 Building seat inventory at {path}...")
+    print("=" * 60)
+
+    try:
+        db = MovieDatabase()
+        ShowService(db)
+        started = time.perf_counter()
+        inventory = SeatInventoryFile.open_or_build(path, list(db.shows.values()))
+        elapsed = time.perf_counter() - started
+        print(f"✅ {inventory.count} shows in {os.path.getsize(path):,} bytes ({elapsed:.2f}s)")
+        if release_holds:
+            print(f"✅ {inventory.release_holds()} held seats released")
+        inventory.close()
+    except Exception as e:
+        print(f"\n❌ Error building seat inventory: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", default=os.environ.get(
+        "BMS_SEAT_FILE", str(Path(__file__).parent / "data" / "seat_inventory.bin")
+    ))
+    parser.add_argument("--release-holds", action="store_true",
+                        help="free seats left on hold by stopped workers (only when none are running)")
+    args = parser.parse_args()
+    Path(args.path).parent.mkdir(parents=True, exist_ok=True)
+    build_seat_inventory(args.path, args.release_holds)
@@ -0,0 +1,81 @@
+"""
+Data Export Tool for BookMyShow
+Streams movies, theaters, shows, bookings and payments to JSONL or CSV
+files in constant memory, e.g. for the nightly finance and analytics drops
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.exporters import FORMATS, ROW_BUILDERS, export
+
+
+def mongo_sources(batch_size: int) -> dict:
+    """Record iterators over MongoDB, fetching `batch_size` documents per round trip"""
+    from backend.mongodb_repository import (
+        BookingRepository, MovieRepository, PaymentRepository, ShowRepository, TheaterRepository
+    )
+    return {
+        'movies': lambda: MovieRepository(lazy=True).iter_movies(batch_size),
+        'theaters': lambda: TheaterRepository(lazy=True).iter_theaters(batch_size),
+        'shows': lambda: ShowRepository(lazy=True).iter_shows(batch_size=batch_size),
+        'bookings': lambda: BookingRepository(lazy=True).iter_bookings(batch_size=batch_size),
+        'payments': lambda: PaymentRepository(lazy=True).iter_payments(batch_size),
+    }
+
+
+def memory_sources() -> dict:
+    """Record iterators over the in-memory sample database"""
+    from models.database import MovieDatabase
+    from backend.services import ShowService
+    
+    db = MovieDatabase()
+    ShowService(db)
+    return {
+        'movies': lambda: db.iter_movies(),
+        'theaters': lambda: iter(db.get_all_theaters()),
+        'shows': lambda: iter(list(db.shows.values())),
+        'bookings': lambda: iter(list(db.bookings.values())),
+        'payments': lambda: iter(list(db.payments.values())),
+    }
+
+
+def export_data(kinds: list, out_dir: str, fmt: str, source: str, batch_size: int):
+    """Export each kind to <out_dir>/<kind>.<fmt>"""
+    
+    print(f"📤 Exporting {', '.join(kinds)} as {fmt.upper()} to {out_dir}...")
+    print("=" * 60)
+    
+    try:
+        sources = mongo_sources(batch_size) if source == "mongo" else memory_sources()
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+        for kind in kinds:
+            path = Path(out_dir) / f"{kind}.{fmt}"
+            started = time.perf_counter()
+            with open(path, "w", encoding="utf-8", newline="") as out:
+                count = export(kind, sources[kind](), out, fmt)
+            elapsed = time.perf_counter() - started
+            print(f"✅ {count:,} {kind} -> {path} ({elapsed:.2f}s, {count / max(elapsed, 1e-9):,.0f}/s)")
+    except Exception as e:
+        print(f"\n❌ Error exporting data: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("kinds", nargs="*", metavar="kind",
+                        help=f"what to export: {', '.join(ROW_BUILDERS)} (default: everything)")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--out", default=str(Path(__file__).parent / "exports"), help="output directory")
+    parser.add_argument("--source", choices=["mongo", "memory"], default="mongo",
+                        help="read from MongoDB or from the in-memory sample data")
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per MongoDB round trip")
+    args = parser.parse_args()
+    unknown = [kind for kind in args.kinds if kind not in ROW_BUILDERS]
+    if unknown:
+        parser.error(f"unknown kind: {', '.join(unknown)}")
+    export_data(args.kinds or list(ROW_BUILDERS), args.out, args.format, args.source, args.batch_size)
@@ -10,39 +10,14 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from models.database import MovieDatabase
-from backend.services import (
-    MovieService, TheaterService, ShowService, 
-    UserService, BookingService, PaymentService
-)
-
-
-# Initialize session state and services
-@st.cache_resource
-def initialize_services():
-    db = MovieDatabase()
-    movie_service = MovieService(db)
-    theater_service = TheaterService(db)
-    show_service = ShowService(db)
-    user_service = UserService(db)
-    booking_service = BookingService(db, show_service)
-    payment_service = PaymentService(db)
-    
-    return {
-        'db': db,
-        'movie_service': movie_service,
-        'theater_service': theater_service,
-        'show_service': show_service,
-        'user_service': user_service,
-        'booking_service': booking_service,
-        'payment_service': payment_service
-    }
+from frontend.bootstrap import get_services
+from frontend.catalog_cache import get_movies
 
 
 def init_session_state():
     """Initialize session state variables"""
     if 'services' not in st.session_state:
-        st.session_state.services = initialize_services()
+        st.session_state.services = get_services()
     if 'current_user' not in st.session_state:
         st.session_state.current_user = None
     if 'selected_movie' not in st.session_state:
@@ -65,7 +40,7 @@ def home_page():
     # Display featured movies
     st.subheader("Featured Movies")
     
-    movies = services['movie_service'].get_all_movies()
+    movies = get_movies(services)
     
     if movies:
         cols = st.columns(3)
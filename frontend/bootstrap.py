@@ -0,0 +1,36 @@
+"""
+Service Bootstrap - One set of services per Streamlit server process
+Every page shares it, so opening a page directly does not rebuild the
+database, and show schedules are generated per theater on first use.
+"""
+from typing import Dict
+
+import streamlit as st
+
+from models.database import MovieDatabase
+from backend.services import (
+    MovieService, TheaterService, ShowService,
+    UserService, BookingService, PaymentService
+)
+from backend.payments import PaymentPipeline
+from backend.shared_seats import seat_store_from_env
+
+
+@st.cache_resource
+def get_services() -> Dict:
+    db = MovieDatabase()
+    show_service = ShowService(db, seat_store=seat_store_from_env(), lazy_schedule=True)
+    show_service.start_sweeper()
+    payment_service = PaymentService(db, show_service=show_service)
+    
+    return {
+        'db': db,
+        'movie_service': MovieService(db),
+        'theater_service': TheaterService(db),
+        'show_service': show_service,
+        'user_service': UserService(db),
+        'booking_service': BookingService(db, show_service),
+        'payment_service': payment_service,
+        'payment_pipeline': PaymentPipeline(payment_service),
+        'events': show_service.events
+    }
@@ -0,0 +1,56 @@
+"""
+Catalog Cache - Versioned snapshots of movies, theaters and shows
+Cache entries are keyed on the database's catalog version, so reruns reuse
+the same snapshot and every catalog write invalidates it.
+"""
+from typing import Dict, List, Tuple
+
+import streamlit as st
+
+from models.database import Movie, Show, Theater
+
+
+def catalog_key(services: Dict) -> Tuple[int, int]:
+    """Identify the current catalog: database instance plus its version"""
+    db = services['db']
+    return db.instance_id, db.catalog_version
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _movies(key: Tuple[int, int], _movie_service) -> List[Movie]:
+    return _movie_service.get_all_movies()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _theaters(key: Tuple[int, int], _theater_service) -> List[Theater]:
+    return _theater_service.get_all_theaters()
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _show_ids(key: Tuple[int, int], movie_id: str, theater_id: str, _show_service) -> List[str]:
+    # Only ids are cached: seat state is live and must not be snapshotted
+    return [
+        show.show_id
+        for show in _show_service.get_shows_by_movie_and_theater(movie_id, theater_id)
+    ]
+
+
+def get_movies(services: Dict) -> List[Movie]:
+    """All movies for the current catalog version"""
+    return _movies(catalog_key(services), services['movie_service'])
+
+
+def get_theaters(services: Dict) -> List[Theater]:
+    """All theaters for the current catalog version"""
+    return _theaters(catalog_key(services), services['theater_service'])
+
+
+def get_shows(services: Dict, movie_id: str, theater_id: str) -> List[Show]:
+    """Live shows for a movie in a theater, resolved from cached show ids"""
+    show_service = services['show_service']
+    shows = []
+    for show_id in _show_ids(catalog_key(services), movie_id, theater_id, show_service):
+        show = show_service.get_show_details(show_id)
+        if show:
+            shows.append(show)
+    return shows
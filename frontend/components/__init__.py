@@ -0,0 +1,3 @@
+"""
+BookMyShow Frontend Components Package
+"""
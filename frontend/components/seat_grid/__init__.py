@@ -0,0 +1,55 @@
+"""
+Seat Grid Component - Renders a whole show's seat map as a single component
+"""
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import streamlit.components.v1 as components
+
+from models.database import Seat, SeatStatus
+
+_seat_grid = components.declare_component(
+    "seat_grid",
+    path=str(Path(__file__).parent)
+)
+
+
+def _row(seat: Seat) -> list:
+    return [seat.seat_id, seat.row, seat.price, seat.status == SeatStatus.AVAILABLE]
+
+
+def seat_rows(show_service, show_id: str, cache: Dict) -> List[list]:
+    """Component rows for a show, kept current from seat-map deltas.
+
+    `cache` (e.g. a dict in session state) keeps the rows, epoch and version
+    between reruns, so an unchanged hall costs no per-seat work.
+    """
+    cached = cache.get(show_id)
+    delta = show_service.get_seat_changes(
+        show_id, cached['version'] if cached else None, cached['epoch'] if cached else None
+    )
+    if delta is None:
+        return []
+    if delta.full or cached is None:
+        rows = [_row(seat) for seat in delta.seats]
+        cached = {'rows': rows, 'index': {row[0]: i for i, row in enumerate(rows)}}
+        cache[show_id] = cached
+    else:
+        for seat in delta.seats:
+            cached['rows'][cached['index'][seat.seat_id]] = _row(seat)
+    cached['epoch'], cached['version'] = delta.epoch, delta.version
+    return cached['rows']
+
+
+def seat_grid(rows: List[list], selected: Optional[List[str]] = None,
+              key: Optional[str] = None) -> List[str]:
+    """Render the seat map and return the confirmed selection.
+
+    `rows` are [seat_id, row, price, available] lists as built by seat_rows.
+    Seat toggles happen inside the component, so the page only reruns once
+    when the user confirms the selection, whatever the hall size.
+    """
+    available = {seat_id for seat_id, _, _, is_available in rows if is_available}
+    selected = [seat_id for seat_id in selected or [] if seat_id in available]
+    value = _seat_grid(seats=rows, selected=selected, key=key, default=selected)
+    return list(value or [])
@@ -7,20 +7,14 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from models.database import MovieDatabase
-from backend.services import MovieService, TheaterService, ShowService
+from frontend.bootstrap import get_services
+from frontend.catalog_cache import get_theaters
 
 st.set_page_config(page_title="Home - BookMyShow", layout="wide")
 
 # Initialize services
 if 'services' not in st.session_state:
-    db = MovieDatabase()
-    st.session_state.services = {
-        'movie_service': MovieService(db),
-        'theater_service': TheaterService(db),
-        'show_service': ShowService(db),
-        'db': db
-    }
+    st.session_state.services = get_services()
 
 services = st.session_state.services
 
@@ -36,24 +30,30 @@ with col1:
 with col2:
     sort_by = st.selectbox("Sort by", ["Title", "Rating", "Duration"])
 
-# Get movies
-movies = services['movie_service'].get_all_movies()
+PAGE_SIZE = 9
 
-# Filter by search query
-if search_query:
-    movies = [m for m in movies if search_query.lower() in m.title.lower() or search_query.lower() in m.genre.lower()]
+# Reset to the first page whenever the search or sort changes
+if st.session_state.get('home_query') != (search_query, sort_by):
+    st.session_state.home_query = (search_query, sort_by)
+    st.session_state.home_page = 0
+page = st.session_state.home_page
 
-# Sort
-if sort_by == "Rating":
-    movies.sort(key=lambda x: x.rating, reverse=True)
-elif sort_by == "Duration":
-    movies.sort(key=lambda x: x.duration)
+# Get one page from the presorted view (one extra row tells us if there is a next page)
+movie_service = services['movie_service']
+offset = page * PAGE_SIZE
+if search_query:
+    movies = movie_service.search_movies_page(search_query, sort_by.lower(), offset, PAGE_SIZE + 1)
 else:
-    movies.sort(key=lambda x: x.title)
+    movies = movie_service.get_movies_page(sort_by.lower(), offset, PAGE_SIZE + 1)
+has_next = len(movies) > PAGE_SIZE
+movies = movies[:PAGE_SIZE]
 
 # Display movies
 if movies:
-    st.subheader(f"Available Movies ({len(movies)})")
+    if search_query:
+        st.subheader(f"Available Movies (page {page + 1})")
+    else:
+        st.subheader(f"Available Movies ({movie_service.get_movie_count()})")
     st.markdown("---")
     
     cols = st.columns(3)
@@ -78,15 +78,48 @@ if movies:
                 if st.button("Book Now", key=f"book_{movie.movie_id}", use_container_width=True):
                     st.session_state.selected_movie = movie
                     st.switch_page("pages/book_tickets.py")
+    
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ Previous", disabled=page == 0, use_container_width=True):
+            st.session_state.home_page -= 1
+            st.rerun()
+    with col_page:
+        st.markdown(f"<center>Page {page + 1}</center>", unsafe_allow_html=True)
+    with col_next:
+        if st.button("Next ➡️", disabled=not has_next, use_container_width=True):
+            st.session_state.home_page += 1
+            st.rerun()
 else:
     st.info("No movies found matching your search")
 
+st.markdown("---")
+st.markdown("### 🎞️ Starting Soon")
+theaters = get_theaters(services)
+cities = sorted({t.city for t in theaters})
+# One city at a time: shows are scheduled per theater on first use, and
+# every city at once would schedule every theater in the catalog
+city = st.selectbox("City", cities, key="soon_city")
+upcoming = services['show_service'].get_next_shows(limit=6, city=city) if city else []
+if upcoming:
+    theater_names = {t.theater_id: t.name for t in theaters}
+    movies_by_id = movie_service.get_movies_by_ids({s.movie_id for s in upcoming})
+    titles = {movie_id: movie.title for movie_id, movie in movies_by_id.items()}
+    for show in upcoming:
+        st.markdown(
+            f"**{show.start_time.strftime('%a %I:%M %p')}** · {titles.get(show.movie_id, show.movie_id)} · "
+            f"{theater_names.get(show.theater_id, show.theater_id)} · {show.available_seats()} seats left"
+        )
+else:
+    st.info("No upcoming shows")
+
 st.markdown("---")
 st.markdown("### 📊 Quick Stats")
 col1, col2, col3 = st.columns(3)
 with col1:
-    st.metric("Total Movies", len(services['movie_service'].get_all_movies()))
+    st.metric("Total Movies", movie_service.get_movie_count())
 with col2:
-    st.metric("Theaters", len(services['theater_service'].get_all_theaters()))
+    st.metric("Theaters", len(theaters))
 with col3:
-    st.metric("Total Shows", len(services['show_service'].db.shows))
+    st.metric("Shows Scheduled", len(services['show_service'].db.shows),
+              help="Shows are scheduled city by city as they are browsed")
@@ -2,30 +2,23 @@
 Book Tickets Page - Select movie, theater, show, and seats
 """
 import streamlit as st
+import queue
 import sys
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
 from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from models.database import MovieDatabase, SeatStatus
-from backend.services import MovieService, TheaterService, ShowService, BookingService, PaymentService, UserService
+from frontend.bootstrap import get_services
+from frontend.catalog_cache import get_movies, get_theaters, get_shows
+from frontend.components.seat_grid import seat_grid, seat_rows
 
 st.set_page_config(page_title="Book Tickets - BookMyShow", layout="wide")
 
 # Initialize services
 if 'services' not in st.session_state:
-    db = MovieDatabase()
-    show_service = ShowService(db)
-    st.session_state.services = {
-        'db': db,
-        'movie_service': MovieService(db),
-        'theater_service': TheaterService(db),
-        'show_service': show_service,
-        'booking_service': BookingService(db, show_service),
-        'payment_service': PaymentService(db),
-        'user_service': UserService(db),
-    }
+    st.session_state.services = get_services()
 
 services = st.session_state.services
 
@@ -39,7 +32,7 @@ if not st.session_state.current_user:
 
 # Step 1: Select Movie
 st.subheader("Step 1: Select Movie")
-movies = services['movie_service'].get_all_movies()
+movies = get_movies(services)
 movie_options = {m.title: m for m in movies}
 selected_movie_title = st.selectbox("Choose a movie:", list(movie_options.keys()), key="movie_select")
 selected_movie = movie_options[selected_movie_title]
@@ -62,7 +55,7 @@ st.divider()
 
 # Step 2: Select Theater
 st.subheader("Step 2: Select Theater")
-theaters = services['theater_service'].get_all_theaters()
+theaters = get_theaters(services)
 theater_options = {f"{t.name} - {t.city}" : t for t in theaters}
 selected_theater_name = st.selectbox("Choose a theater:", list(theater_options.keys()), key="theater_select")
 selected_theater = theater_options[selected_theater_name]
@@ -73,14 +66,17 @@ st.divider()
 
 # Step 3: Select Show
 st.subheader("Step 3: Select Show Time")
-shows = services['show_service'].get_shows_by_movie_and_theater(selected_movie.movie_id, selected_theater.theater_id)
+shows = get_shows(services, selected_movie.movie_id, selected_theater.theater_id)
+now = datetime.now()
+shows = sorted((show for show in shows if show.start_time > now), key=lambda show: show.start_time)
 
 if shows:
     show_options = {}
     for show in shows:
         show_time_str = show.start_time.strftime("%a, %b %d - %I:%M %p")
         available = show.available_seats()
-        show_options[f"{show_time_str} | {available} seats available"] = show
+        badge = " | 🔥 Fast filling" if available < show.total_seats() * 0.3 else ""
+        show_options[f"{show_time_str} | {available} seats available{badge}"] = show
     
     selected_show_str = st.selectbox("Choose a show time:", list(show_options.keys()), key="show_select")
     selected_show = show_options[selected_show_str]
@@ -95,45 +91,20 @@ st.divider()
 # Step 4: Select Seats
 st.subheader("Step 4: Select Seats")
 
-# Create seat layout
-available_seats = services['show_service'].get_available_seats(selected_show.show_id)
-
 # Display seat layout in grid
 st.markdown("#### Theater Layout")
-st.info("🟢 Available | 🔴 Booked")
-
-# Group seats by row
-seat_rows = {}
-for seat in selected_show.seats:
-    if seat.row not in seat_rows:
-        seat_rows[seat.row] = []
-    seat_rows[seat.row].append(seat)
-
-# Display seats
-cols = st.columns(10)
-selected_seat_ids = st.session_state.get('selected_seats', [])
-
-for row_label, row_seats in sorted(seat_rows.items()):
-    st.write(f"**{row_label}**")
-    cols = st.columns(10)
-    
-    for idx, seat in enumerate(row_seats):
-        with cols[idx % 10]:
-            if seat.status == SeatStatus.AVAILABLE:
-                if st.button(
-                    f"{seat.seat_id}",
-                    key=f"seat_{seat.seat_id}",
-                    help=f"₹{seat.price}",
-                    use_container_width=True,
-                    type="secondary" if seat.seat_id not in selected_seat_ids else "primary"
-                ):
-                    if seat.seat_id in selected_seat_ids:
-                        selected_seat_ids.remove(seat.seat_id)
-                    else:
-                        selected_seat_ids.append(seat.seat_id)
-                    st.session_state.selected_seats = selected_seat_ids
-            else:
-                st.button(f"{seat.seat_id}", disabled=True, use_container_width=True)
+st.info("⬜ Available | 🟧 Selected | 🟥 Booked")
+
+# Whole hall is one component; toggles stay client-side until confirmed.
+# Rows are cached per show and only the seats that changed are refreshed.
+if 'seat_maps' not in st.session_state:
+    st.session_state.seat_maps = {}
+selected_seat_ids = seat_grid(
+    seat_rows(services['show_service'], selected_show.show_id, st.session_state.seat_maps),
+    selected=st.session_state.get('selected_seats', []),
+    key=f"seat_grid_{selected_show.show_id}"
+)
+st.session_state.selected_seats = selected_seat_ids
 
 st.divider()
 
@@ -141,7 +112,7 @@ st.divider()
 if selected_seat_ids:
     st.subheader("Step 5: Review & Payment")
     
-    selected_seats_obj = [s for s in selected_show.seats if s.seat_id in selected_seat_ids]
+    selected_seats_obj = [selected_show.get_seat(seat_id) for seat_id in selected_seat_ids]
     total_price = sum(s.price for s in selected_seats_obj)
     
     col1, col2 = st.columns(2)
@@ -178,18 +149,35 @@ if selected_seat_ids:
             )
             
             if booking:
-                # Process payment
-                payment = services['payment_service'].process_payment(
-                    booking.booking_id,
-                    total_price,
-                    payment_method
-                )
+                # Hand the payment to the worker pool; the booking stays PENDING until it settles
+                try:
+                    payment_future = services['payment_pipeline'].submit(
+                        booking.booking_id,
+                        total_price,
+                        payment_method
+                    )
+                except queue.Full:
+                    # The payment was never queued, so give the seats back rather than leave them booked
+                    services['booking_service'].cancel_booking(booking.booking_id)
+                    st.error("❌ Payments are busy right now. Your seats were released, please try again.")
+                    st.stop()
+                
+                try:
+                    payment = payment_future.result(timeout=3)
+                except FutureTimeoutError:
+                    st.info("⏳ Payment is processing. Your booking will be confirmed shortly.")
+                    st.session_state.selected_seats = []
+                    st.switch_page("pages/my_bookings.py")
                 
                 if payment and payment.status == "success":
                     st.success("✅ Booking confirmed! Redirecting to my bookings...")
                     st.balloons()
                     st.session_state.selected_seats = []
                     st.switch_page("pages/my_bookings.py")
+                elif payment and payment.status == "pending":
+                    st.info("⏳ The payment gateway has not confirmed your payment yet. "
+                            "Your seats stay booked; check My Bookings shortly.")
+                    st.session_state.selected_seats = []
                 else:
                     st.error("❌ Payment failed. Please try again.")
             else:
@@ -8,27 +8,14 @@ from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from models.database import MovieDatabase, BookingStatus
-from backend.services import (
-    MovieService, TheaterService, ShowService, 
-    BookingService, PaymentService, UserService
-)
+from models.database import BookingStatus
+from frontend.bootstrap import get_services
 
 st.set_page_config(page_title="My Bookings - BookMyShow", layout="wide")
 
 # Initialize services
 if 'services' not in st.session_state:
-    db = MovieDatabase()
-    show_service = ShowService(db)
-    st.session_state.services = {
-        'db': db,
-        'movie_service': MovieService(db),
-        'theater_service': TheaterService(db),
-        'show_service': show_service,
-        'booking_service': BookingService(db, show_service),
-        'payment_service': PaymentService(db),
-        'user_service': UserService(db),
-    }
+    st.session_state.services = get_services()
 
 services = st.session_state.services
 
@@ -41,43 +28,53 @@ if not st.session_state.current_user:
     st.stop()
 
 user = st.session_state.current_user
-bookings = services['booking_service'].get_user_bookings(user.user_id)
+booking_service = services['booking_service']
+total_bookings = booking_service.count_user_bookings(user.user_id)
 
-if bookings:
-    st.subheader(f"Your Bookings ({len(bookings)})")
+PAGE_SIZE = 10
+
+if total_bookings:
+    st.subheader(f"Your Bookings ({total_bookings})")
     st.divider()
     
     # Filter bookings
     filter_status = st.selectbox(
         "Filter by status:",
-        ["All", "Confirmed", "Pending", "Cancelled"],
+        ["All", "Confirmed", "Pending", "Failed", "Cancelled"],
         key="booking_filter"
     )
+    status = None if filter_status == "All" else BookingStatus(filter_status.lower())
+    
+    # Keyset pagination: stack of cursors, one per page visited
+    if st.session_state.get('booking_filter_applied') != filter_status:
+        st.session_state.booking_filter_applied = filter_status
+        st.session_state.booking_cursors = [None]
+    cursors = st.session_state.booking_cursors
     
-    filtered_bookings = bookings
-    if filter_status != "All":
-        filtered_bookings = [b for b in bookings if b.status.value == filter_status.lower()]
+    filtered_bookings = booking_service.query_user_bookings(
+        user.user_id, status=status, cursor=cursors[-1], limit=PAGE_SIZE + 1
+    )
+    has_next = len(filtered_bookings) > PAGE_SIZE
+    filtered_bookings = filtered_bookings[:PAGE_SIZE]
     
     if filtered_bookings:
-        for booking in filtered_bookings:
-            show = services['show_service'].get_show_details(booking.show_id)
-            movie = services['movie_service'].get_movie_details(show.movie_id)
-            theater = services['theater_service'].get_theater_details(show.theater_id)
+        for booking in booking_service.get_booking_summaries(filtered_bookings):
+            show_time_str = booking.show_time.strftime('%a, %b %d - %I:%M %p')
             
             with st.container(border=True):
                 col1, col2, col3 = st.columns([1, 2, 1])
                 
                 with col1:
-                    st.image(movie.poster_url, use_container_width=True)
+                    st.image(booking.poster_url, use_container_width=True)
                 
                 with col2:
-                    st.markdown(f"### {movie.title}")
-                    st.markdown(f"**Theater:** {theater.name}")
-                    st.markdown(f"**Location:** {theater.location}")
-                    st.markdown(f"**Show Time:** {show.start_time.strftime('%a, %b %d - %I:%M %p')}")
+                    st.markdown(f"### {booking.movie_title}")
+                    st.markdown(f"**Theater:** {booking.theater_name}")
+                    st.markdown(f"**Location:** {booking.location}")
+                    st.markdown(f"**Show Time:** {show_time_str}")
                     
                     # Seats
-                    seats_str = ", ".join([detail.seat_id for detail in booking.booking_details])
+                    seats_str = ", ".join(booking.seats)
                     st.markdown(f"**Seats:** {seats_str}")
                 
                 with col3:
@@ -104,9 +101,9 @@ if bookings:
                         st.markdown(f"### Booking Details")
                         st.json({
                             "booking_id": booking.booking_id,
-                            "movie": movie.title,
-                            "theater": theater.name,
-                            "show_time": show.start_time.strftime('%a, %b %d - %I:%M %p'),
+                            "movie": booking.movie_title,
+                            "theater": booking.theater_name,
+                            "show_time": show_time_str,
                             "seats": seats_str,
                             "total_price": booking.total_price,
                             "status": booking.status.value,
@@ -114,15 +111,25 @@ if bookings:
                         })
                 
                 with col2:
-                    if booking.status != BookingStatus.CANCELLED:
+                    if booking.status in (BookingStatus.PENDING, BookingStatus.CONFIRMED):
                         if st.button("Cancel Booking", key=f"cancel_{booking.booking_id}", use_container_width=True):
-                            if services['booking_service'].cancel_booking(booking.booking_id):
+                            if booking_service.cancel_booking(booking.booking_id):
                                 st.success("✅ Booking cancelled successfully!")
                                 st.rerun()
                             else:
                                 st.error("❌ Failed to cancel booking")
                 
                 st.markdown("---")
+        
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            if st.button("⬅️ Newer", disabled=len(cursors) == 1, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+        with col_next:
+            if st.button("Older ➡️", disabled=not has_next, use_container_width=True):
+                cursors.append(filtered_bookings[-1].booking_id)
+                st.rerun()
     else:
         st.info("No bookings found with the selected filter")
 else:
@@ -144,8 +151,8 @@ with st.expander("👤 My Profile"):
     st.markdown(f"**Email:** {user.email}")
     st.markdown(f"**Phone:** {user.phone}")
     st.markdown(f"**Member Since:** {user.created_at.strftime('%B %d, %Y')}")
-    st.markdown(f"**Total Bookings:** {len(bookings)}")
+    st.markdown(f"**Total Bookings:** {total_bookings}")
     
-    if len(bookings) > 0:
-        total_spent = sum(b.total_price for b in bookings)
+    if total_bookings > 0:
+        total_spent = booking_service.get_user_total_spent(user.user_id)
         st.markdown(f"**Total Amount Spent:** ₹{total_spent}")
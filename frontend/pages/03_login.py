@@ -7,18 +7,13 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from models.database import MovieDatabase
-from backend.services import UserService
+from frontend.bootstrap import get_services
 
 st.set_page_config(page_title="Login - BookMyShow", layout="centered")
 
 # Initialize services
 if 'services' not in st.session_state:
-    db = MovieDatabase()
-    st.session_state.services = {
-        'db': db,
-        'user_service': UserService(db),
-    }
+    st.session_state.services = get_services()
 
 services = st.session_state.services
 
@@ -0,0 +1,53 @@
+"""
+Catalog Import Tool for BookMyShow
+Bulk-loads movies, theaters and shows from JSONL or CSV files (such as
+those written by export_data.py) into MongoDB with parallel upserts.
+Rerunning after a failure resumes where the import stopped.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.importers import IMPORT_KINDS, CatalogImporter, kind_for_path
+
+# Shows are checked against theaters, so theaters load first
+IMPORT_ORDER = ['theaters', 'movies', 'shows']
+
+
+def import_catalog(files: list, kind: str, workers: int, chunk_size: int, restart: bool):
+    """Import each file, theaters before shows"""
+    
+    print(f"📥 Importing {len(files)} file(s) with {workers} workers, {chunk_size} records per chunk...")
+    print("=" * 60)
+    
+    try:
+        jobs = sorted(((path, kind or kind_for_path(path)) for path in files),
+                      key=lambda job: IMPORT_ORDER.index(job[1]))
+        importer = CatalogImporter(workers=workers, chunk_size=chunk_size)
+        for path, file_kind in jobs:
+            report = importer.import_file(path, file_kind, restart=restart)
+            resumed = f", {report.skipped:,} already imported" if report.skipped else ""
+            print(f"✅ {path}: {report.read:,} {file_kind} read{resumed}")
+            print(f"   {report.inserted:,} inserted, {report.modified:,} updated, "
+                  f"{report.unchanged:,} unchanged, {report.rejected:,} rejected")
+            print(f"   {report.elapsed:.2f}s, {report.throughput:,.0f} records/s")
+            if report.rejected:
+                print(f"   ⚠️ Rejected records are listed in {path}.rejects.jsonl")
+    except Exception as e:
+        print(f"\n❌ Error importing catalog: {e}")
+        print("   Run the same command again to resume from the last checkpoint")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="+", help="JSONL or CSV files named after their kind, e.g. movies.jsonl")
+    parser.add_argument("--kind", choices=list(IMPORT_KINDS), help="kind of every file, if not in the names")
+    parser.add_argument("--workers", type=int, default=4, help="bulk writes in flight")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="records per bulk write")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints and import from the start")
+    args = parser.parse_args()
+    import_catalog(args.files, args.kind, args.workers, args.chunk_size, args.restart)
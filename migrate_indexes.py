@@ -0,0 +1,110 @@
+"""
+Index Migration Tool for BookMyShow
+Applies the index spec in backend/mongodb_indexes.py to the configured
+database, or with --check-plans verifies in a scratch database that every
+repository query is served by an index (exits 1 if one is not)
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def migrate_indexes(prune: bool, dry_run: bool):
+    """Create missing indexes and optionally drop ones not in the spec"""
+    from backend.mongodb_indexes import apply_indexes
+
+    print(f"📊 {'Planning' if dry_run else 'Applying'} index spec...")
+    print("=" * 60)
+
+    try:
+        result = apply_indexes(prune=prune, dry_run=dry_run)
+        for name in result['created']:
+            print(f"  ➕ {name}")
+        for name in result['dropped']:
+            print(f"  ➖ {name}")
+        created, dropped = len(result['created']), len(result['dropped'])
+        if dry_run:
+            print(f"✅ Dry run: {created} indexes to create, {dropped} to drop")
+        else:
+            print(f"✅ Index spec applied: {created} indexes created, {dropped} dropped")
+    except Exception as e:
+        print(f"\n❌ Error applying indexes: {e}")
+        sys.exit(1)
+
+
+def check_plans(database: str, scale: int, keep: bool):
+    """Seed a scratch database, explain every repository query and fail on bad plans"""
+    from backend.mongodb_connection import mongodb_settings
+    if database == mongodb_settings()[1]:
+        print(f"❌ '{database}' is the application database; pass a scratch --database, it gets dropped")
+        sys.exit(1)
+
+    # Must be in place before the first connection: commands are captured
+    # by a listener and the repositories connect to MONGODB_DATABASE
+    os.environ["MONGODB_DATABASE"] = database
+    from pymongo import monitoring
+    from backend.query_plans import CommandRecorder, run_checks, seed
+
+    recorder = CommandRecorder()
+    monitoring.register(recorder)
+
+    from backend.mongodb_connection import MongoDBConnection
+    from backend.mongodb_indexes import apply_indexes
+
+    print(f"🔍 Checking query plans in scratch database '{database}'...")
+    print("=" * 60)
+
+    client = None
+    try:
+        connection = MongoDBConnection()
+        client = connection.get_client()
+        client.drop_database(database)
+        db = connection.get_db()
+        apply_indexes(db)
+        sample = seed(db, scale)
+        results = run_checks(db, recorder, sample)
+
+        print(f"\n{'query':<42} {'collection':<18} {'returned':>8} {'docs':>6} {'keys':>6}  plan")
+        for result in results:
+            mark = "❌" if result.problems else "✅"
+            print(f"{mark} {result.check:<40} {result.collection:<18} {result.returned:>8} "
+                  f"{result.docs_examined:>6} {result.keys_examined:>6}  {' > '.join(result.stages)}")
+            for problem in result.problems:
+                print(f"     ⚠️ {problem}")
+        failures = [result for result in results if result.problems]
+        print("\n" + "=" * 60)
+        if failures:
+            print(f"❌ {len(failures)} of {len(results)} queries need an index or a better query")
+        else:
+            print(f"✅ All {len(results)} queries use their indexes")
+    except Exception as e:
+        print(f"\n❌ Error checking query plans: {e}")
+        print("\n⚠️  Make sure MongoDB is running at mongodb://localhost:27017/")
+        sys.exit(1)
+    finally:
+        if client is not None and not keep:
+            client.drop_database(database)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prune", action="store_true", help="drop indexes that are not in the spec")
+    parser.add_argument("--dry-run", action="store_true", help="only list the changes")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="explain every repository query against a scratch database instead")
+    parser.add_argument("--database", default="bookshow_plan_check",
+                        help="scratch database for --check-plans (dropped and recreated)")
+    parser.add_argument("--scale", type=int, default=1, help="synthetic data multiplier for --check-plans")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database for inspection")
+    args = parser.parse_args()
+    if args.check_plans:
+        check_plans(args.database, args.scale, args.keep)
+    else:
+        migrate_indexes(args.prune, args.dry_run)
@@ -2,12 +2,22 @@
 Database Models for BookMyShow Application
 Low-Level Design Implementation
 """
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from heapq import merge
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta
+from functools import cached_property
+from itertools import count, islice
+from typing import Iterable, Iterator, List, Optional
 from enum import Enum
 
 
+# Source of MovieDatabase.instance_id; unlike id(), never reused within a process
+_database_instances = count(1)
+
+
 class SeatStatus(Enum):
     AVAILABLE = "available"
     BOOKED = "booked"
@@ -18,6 +28,7 @@ class BookingStatus(Enum):
     PENDING = "pending"
     CONFIRMED = "confirmed"
     CANCELLED = "cancelled"
+    FAILED = "failed"
 
 
 @dataclass
@@ -33,6 +44,51 @@ class Seat:
         return hash(self.seat_id)
 
 
+@dataclass(frozen=True)
+class SeatLayout:
+    """Seat map of a screen; shows built from it create their seats on first use"""
+    rows: str = "ABCDEFGHIJ"
+    seats_per_row: int = 10
+    price: float = 200
+    premium_price: float = 250
+    premium_from: int = 8  # seat numbers from here on are premium
+    
+    def capacity(self) -> int:
+        return len(self.rows) * self.seats_per_row
+    
+    @cached_property
+    def _tier_counts(self) -> dict:
+        # Computed once per layout; every show built from it starts from these counters
+        premium_per_row = max(0, self.seats_per_row - self.premium_from + 1)
+        counts = {self.price: len(self.rows) * (self.seats_per_row - premium_per_row)}
+        if premium_per_row:
+            counts[self.premium_price] = counts.get(self.premium_price, 0) + len(self.rows) * premium_per_row
+        return counts
+    
+    def tier_counts(self) -> dict:
+        return dict(self._tier_counts)
+    
+    def seat_ids(self) -> List[str]:
+        """Seat ids in the order build_seats creates the seats"""
+        return [f"{row}{number}" for row in self.rows for number in range(1, self.seats_per_row + 1)]
+    
+    def build_seats(self) -> List[Seat]:
+        return [
+            Seat(
+                seat_id=f"{row}{number}",
+                row=row,
+                number=number,
+                price=self.premium_price if number >= self.premium_from else self.price
+            )
+            for row in self.rows
+            for number in range(1, self.seats_per_row + 1)
+        ]
+
+
+# Seat status changes remembered per show for delta fetches
+SEAT_CHANGE_LOG_SIZE = 256
+
+
 @dataclass
 class Show:
     """Show/Screening model"""
@@ -44,9 +100,92 @@ class Show:
     seats: List[Seat] = field(default_factory=list)
     language: str = "English"
     format: str = "2D"  # 2D, 3D, IMAX
+    screen_id: str = ""
+    # When set and seats is empty, seats are created from the layout on first use
+    layout: Optional[SeatLayout] = field(default=None, repr=False, compare=False)
+    # Availability counters, kept in step by set_seat_status
+    available_count: int = field(default=0, init=False, repr=False, compare=False)
+    available_by_price: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _seat_index: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Bumped on every seat status change; the log holds the latest (version, seat) pairs
+    seat_version: int = field(default=0, init=False, repr=False, compare=False)
+    _seat_changes: Optional[deque] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if not self.seats and self.layout:
+            self.available_by_price = self.layout.tier_counts()
+            self.available_count = self.layout.capacity()
+        else:
+            self.recount()
+    
+    def ensure_seats(self) -> List[Seat]:
+        """Create the seats from the layout if that has not happened yet"""
+        if not self.seats and self.layout:
+            self.seats = self.layout.build_seats()
+            self.recount()
+        return self.seats
+    
+    def seat_ids(self) -> List[str]:
+        """Seat ids in layout order, without creating the seats"""
+        if not self.seats and self.layout:
+            return self.layout.seat_ids()
+        return [seat.seat_id for seat in self.seats]
+    
+    def recount(self):
+        """Recompute counters and the seat index from the seat list"""
+        self._seat_index = {seat.seat_id: seat for seat in self.seats}
+        self.available_by_price = {}
+        for seat in self.seats:
+            self.available_by_price.setdefault(seat.price, 0)
+            if seat.status == SeatStatus.AVAILABLE:
+                self.available_by_price[seat.price] += 1
+        self.available_count = sum(self.available_by_price.values())
+    
+    def get_seat(self, seat_id: str) -> Optional[Seat]:
+        self.ensure_seats()
+        return self._seat_index.get(seat_id)
+    
+    def set_seat_status(self, seat: Seat, status: SeatStatus):
+        """Change a seat's status and adjust the availability counters"""
+        if seat.status == status:
+            return
+        was_available = seat.status == SeatStatus.AVAILABLE
+        is_available = status == SeatStatus.AVAILABLE
+        seat.status = status
+        if was_available != is_available:
+            delta = 1 if is_available else -1
+            self.available_count += delta
+            self.available_by_price[seat.price] = self.available_by_price.get(seat.price, 0) + delta
+        self.seat_version += 1
+        if self._seat_changes is None:
+            self._seat_changes = deque(maxlen=SEAT_CHANGE_LOG_SIZE)
+        self._seat_changes.append((self.seat_version, seat))
+    
+    def seat_changes_since(self, version: int) -> Optional[List[Seat]]:
+        """Seats whose status changed after `version`, or None if the log no longer reaches back"""
+        if version == self.seat_version:
+            return []
+        log = self._seat_changes
+        if version < 0 or version > self.seat_version or not log or log[0][0] > version + 1:
+            return None
+        changed = {}
+        for seat_version, seat in reversed(log):
+            if seat_version <= version:
+                break
+            changed.setdefault(seat.seat_id, seat)
+        return list(changed.values())
     
     def available_seats(self) -> int:
-        return sum(1 for seat in self.seats if seat.status == SeatStatus.AVAILABLE)
+        return self.available_count
+    
+    def total_seats(self) -> int:
+        if not self.seats and self.layout:
+            return self.layout.capacity()
+        return len(self.seats)
+    
+    def natural_key(self) -> str:
+        """Theater, screen and start time; unlike show_id, stable across processes and restarts"""
+        return f"{self.theater_id}|{self.screen_id}|{self.start_time.isoformat()}"
 
 
 @dataclass
@@ -131,6 +270,154 @@ class Payment:
     created_at: datetime = field(default_factory=datetime.now)
 
 
+@dataclass
+class SeatMapDelta:
+    """Seat map changes of a show since a version; a full snapshot when `full` is set"""
+    show_id: str
+    epoch: str
+    version: int
+    full: bool
+    seats: List[Seat] = field(default_factory=list)
+
+
+@dataclass
+class BookingView:
+    """Booking joined with its show, movie and theater for display"""
+    booking: Booking
+    movie_title: str
+    poster_url: str
+    theater_name: str
+    location: str
+    show_time: datetime
+    seats: List[str] = field(default_factory=list)
+
+
+@dataclass
+class BookingSummary:
+    """Denormalized booking read model, maintained on every booking write"""
+    booking_id: str
+    user_id: str
+    show_id: str
+    movie_title: str
+    poster_url: str
+    theater_name: str
+    location: str
+    show_time: datetime
+    booking_date: datetime
+    seats: List[str] = field(default_factory=list)
+    total_price: float = 0.0
+    status: BookingStatus = BookingStatus.PENDING
+    payment_method: str = "card"
+    payment_id: Optional[str] = None
+
+
+class ShowTimeIndex:
+    """Shows sorted by start_time, overall and (optionally) per theater.
+    
+    Range and "next N" queries are a bisect plus the rows returned. For "now
+    playing" only shows that started within the longest show duration of the
+    partition can still be running, so that is a bounded range scan too.
+    """
+    
+    ALL = ""
+    
+    def __init__(self, per_theater: bool = True):
+        self.per_theater = per_theater
+        # partition key -> sorted list of (start_time, show_id)
+        self._partitions: dict[str, list] = {}
+        self._max_duration: dict[str, timedelta] = {}
+    
+    @staticmethod
+    def theater_key(theater_id: str) -> str:
+        return f"theater:{theater_id}"
+    
+    def _keys(self, show: Show) -> List[str]:
+        if self.per_theater:
+            return [self.ALL, self.theater_key(show.theater_id)]
+        return [self.ALL]
+    
+    def _note_duration(self, key: str, show: Show):
+        duration = show.end_time - show.start_time
+        if duration > self._max_duration.get(key, timedelta(0)):
+            self._max_duration[key] = duration
+    
+    def add(self, show: Show):
+        for key in self._keys(show):
+            insort(self._partitions.setdefault(key, []), (show.start_time, show.show_id))
+            self._note_duration(key, show)
+    
+    def add_many(self, shows: Iterable[Show]):
+        """Bulk insert with one sort per partition"""
+        touched = set()
+        for show in shows:
+            for key in self._keys(show):
+                self._partitions.setdefault(key, []).append((show.start_time, show.show_id))
+                self._note_duration(key, show)
+                touched.add(key)
+        for key in touched:
+            self._partitions[key].sort()
+    
+    def starting_between(self, start: datetime, end: datetime, key: str = ALL) -> List[str]:
+        """Show ids with start <= start_time < end, in start order"""
+        entries = self._partitions.get(key, [])
+        lo = bisect_left(entries, (start,))
+        hi = bisect_left(entries, (end,))
+        return [show_id for _, show_id in entries[lo:hi]]
+    
+    def next_after(self, moment: datetime, limit: int, key: str = ALL) -> List[str]:
+        """The first `limit` show ids starting at or after `moment`"""
+        entries = self._partitions.get(key, [])
+        lo = bisect_left(entries, (moment,))
+        return [show_id for _, show_id in entries[lo:lo + limit]]
+    
+    def started_within(self, moment: datetime, key: str = ALL) -> List[str]:
+        """Show ids that started in the longest-show window before `moment`"""
+        window = self._max_duration.get(key, timedelta(0))
+        entries = self._partitions.get(key, [])
+        lo = bisect_left(entries, (moment - window,))
+        hi = bisect_right(entries, (moment, chr(0x10FFFF)))
+        return [show_id for _, show_id in entries[lo:hi]]
+
+
+class CityShard:
+    """Theaters, shows and seat state of one city, with their own indexes and lock.
+    
+    City-scoped reads and bookings only touch their shard, and a shard holds
+    everything needed to serve its city, so shards can later be moved to
+    separate processes.
+    """
+    
+    def __init__(self, city: str):
+        self.city = city
+        self.lock = threading.RLock()
+        self.theaters: dict[str, Theater] = {}
+        self.shows: dict[str, Show] = {}
+        self.shows_by_theater: dict[str, List[str]] = {}
+        self.show_times = ShowTimeIndex()
+        # show_id -> seat_id -> (user_id, expires_at) for seats on hold
+        self.seat_holds: dict[str, dict[str, tuple]] = {}
+    
+    def add_theater(self, theater: Theater):
+        self.theaters[theater.theater_id] = theater
+    
+    def add_shows(self, shows: List[Show]):
+        for show in shows:
+            self.shows[show.show_id] = show
+            self.shows_by_theater.setdefault(show.theater_id, []).append(show.show_id)
+        if len(shows) == 1:
+            self.show_times.add(shows[0])
+        else:
+            self.show_times.add_many(shows)
+
+
+# Sort keys for the presorted movie views; movie_id breaks ties
+MOVIE_SORT_KEYS = {
+    "title": lambda m: (m.title.lower(), m.movie_id),
+    "rating": lambda m: (-m.rating, m.title.lower(), m.movie_id),
+    "duration": lambda m: (m.duration, m.title.lower(), m.movie_id),
+}
+
+
 class MovieDatabase:
     """In-memory database for the application"""
     
@@ -141,7 +428,25 @@ class MovieDatabase:
         self.shows: dict[str, Show] = {}
         self.bookings: dict[str, Booking] = {}
         self.payments: dict[str, Payment] = {}
+        self.booking_summaries: dict[str, BookingSummary] = {}
+        # Identifies this database in caches shared by several instances
+        self.instance_id: int = next(_database_instances)
+        # city (lower-cased) -> shard; theaters and shows above stay as id directories
+        self.shards: dict[str, CityShard] = {}
+        # Bumped on every movie/theater/show write so caches can key on it
+        self.catalog_version: int = 0
+        # sort_by -> sorted list of (sort_key, movie_id)
+        self._movie_views: dict[str, list] = {name: [] for name in MOVIE_SORT_KEYS}
+        # movie_id -> its current view entries, so updates remove the right one
+        self._movie_view_entries: dict[str, dict[str, tuple]] = {}
+        # (user_id, status, booking_date) index: user_id -> status -> sorted (booking_date, booking_id)
+        self._user_booking_index: dict[str, dict[BookingStatus, list]] = {}
+        self._user_total_spent: dict[str, float] = {}
+        self.show_times = ShowTimeIndex(per_theater=False)
         self._load_sample_data()
+        self._rebuild_movie_views()
+        for theater in self.theaters.values():
+            self.shard_for_city(theater.city).add_theater(theater)
     
     def _load_sample_data(self):
         """Load sample data for demonstration"""
@@ -206,18 +511,160 @@ class MovieDatabase:
             ),
         }
     
+    def bump_catalog_version(self) -> int:
+        self.catalog_version += 1
+        return self.catalog_version
+    
+    def _movie_entries(self, movie: Movie) -> dict[str, tuple]:
+        return {name: (key(movie), movie.movie_id) for name, key in MOVIE_SORT_KEYS.items()}
+    
+    def _rebuild_movie_views(self):
+        self._movie_view_entries = {
+            movie_id: self._movie_entries(movie) for movie_id, movie in self.movies.items()
+        }
+        for name in MOVIE_SORT_KEYS:
+            self._movie_views[name] = sorted(
+                entries[name] for entries in self._movie_view_entries.values()
+            )
+    
+    def add_movie(self, movie: Movie):
+        old_entries = self._movie_view_entries.get(movie.movie_id)
+        new_entries = self._movie_entries(movie)
+        for name, view in self._movie_views.items():
+            if old_entries is not None:
+                view.pop(bisect_right(view, old_entries[name]) - 1)
+            insort(view, new_entries[name])
+        self._movie_view_entries[movie.movie_id] = new_entries
+        self.movies[movie.movie_id] = movie
+        self.bump_catalog_version()
+    
+    def count_movies(self) -> int:
+        return len(self.movies)
+    
+    def iter_movies(self, sort_by: str = "title") -> Iterator[Movie]:
+        """Iterate movies in presorted order without sorting"""
+        for _, movie_id in self._movie_views[sort_by]:
+            yield self.movies[movie_id]
+    
+    def get_movies_page(self, sort_by: str = "title", offset: int = 0, limit: int = 12) -> List[Movie]:
+        view = self._movie_views[sort_by]
+        return [self.movies[movie_id] for _, movie_id in view[offset:offset + limit]]
+    
+    def get_movies_after(self, sort_by: str = "title", after_movie_id: Optional[str] = None,
+                         limit: int = 12) -> List[Movie]:
+        """Keyset page: the `limit` movies that sort after `after_movie_id`"""
+        view = self._movie_views[sort_by]
+        start = 0
+        after = self.movies.get(after_movie_id) if after_movie_id else None
+        if after is not None:
+            start = bisect_right(view, self._movie_view_entries[after.movie_id][sort_by])
+        return [self.movies[movie_id] for _, movie_id in view[start:start + limit]]
+    
     def get_all_movies(self) -> List[Movie]:
         return list(self.movies.values())
     
     def get_movie(self, movie_id: str) -> Optional[Movie]:
         return self.movies.get(movie_id)
     
+    def get_movies_by_ids(self, movie_ids: Iterable[str]) -> dict[str, Movie]:
+        return {movie_id: self.movies[movie_id] for movie_id in movie_ids if movie_id in self.movies}
+    
+    def shard_for_city(self, city: str) -> CityShard:
+        key = city.lower()
+        shard = self.shards.get(key)
+        if shard is None:
+            shard = self.shards.setdefault(key, CityShard(city))
+        return shard
+    
+    def shard_for_theater(self, theater_id: str) -> CityShard:
+        theater = self.theaters.get(theater_id)
+        # Shows of unknown theaters live in an unassigned shard
+        return self.shard_for_city(theater.city if theater else "")
+    
+    def shard_for_show(self, show_id: str) -> CityShard:
+        show = self.shows.get(show_id)
+        return self.shard_for_theater(show.theater_id if show else "")
+    
+    def add_theater(self, theater: Theater):
+        old = self.theaters.get(theater.theater_id)
+        if old and old.city.lower() != theater.city.lower():
+            self.shard_for_city(old.city).theaters.pop(theater.theater_id, None)
+        self.theaters[theater.theater_id] = theater
+        self.shard_for_city(theater.city).add_theater(theater)
+        self.bump_catalog_version()
+    
     def get_all_theaters(self) -> List[Theater]:
         return list(self.theaters.values())
     
     def get_theater(self, theater_id: str) -> Optional[Theater]:
         return self.theaters.get(theater_id)
     
+    def get_theaters_by_ids(self, theater_ids: Iterable[str]) -> dict[str, Theater]:
+        return {
+            theater_id: self.theaters[theater_id]
+            for theater_id in theater_ids if theater_id in self.theaters
+        }
+    
+    def get_theaters_in_city(self, city: str) -> List[Theater]:
+        shard = self.shards.get(city.lower())
+        return list(shard.theaters.values()) if shard else []
+    
+    def add_show(self, show: Show):
+        self.add_shows([show])
+    
+    def add_shows(self, shows: Iterable[Show]):
+        shows = list(shows)
+        by_theater: dict[str, List[Show]] = {}
+        for show in shows:
+            self.shows[show.show_id] = show
+            by_theater.setdefault(show.theater_id, []).append(show)
+        by_shard: dict[int, tuple] = {}
+        for theater_id, theater_shows in by_theater.items():
+            shard = self.shard_for_theater(theater_id)
+            by_shard.setdefault(id(shard), (shard, []))[1].extend(theater_shows)
+        for shard, shard_shows in by_shard.values():
+            with shard.lock:
+                shard.add_shows(shard_shows)
+        if len(shows) == 1:
+            self.show_times.add(shows[0])
+        else:
+            self.show_times.add_many(shows)
+        self.bump_catalog_version()
+    
+    def get_theater_shows(self, theater_id: str) -> List[Show]:
+        shard = self.shard_for_theater(theater_id)
+        return [shard.shows[show_id] for show_id in shard.shows_by_theater.get(theater_id, [])]
+    
+    def _time_index(self, theater_id: Optional[str], city: Optional[str]) -> tuple:
+        if theater_id:
+            shard = self.shard_for_theater(theater_id)
+            return shard.show_times, ShowTimeIndex.theater_key(theater_id)
+        if city:
+            return self.shard_for_city(city).show_times, ShowTimeIndex.ALL
+        return self.show_times, ShowTimeIndex.ALL
+    
+    def shows_starting_between(self, start: datetime, end: datetime, theater_id: Optional[str] = None,
+                               city: Optional[str] = None) -> List[Show]:
+        index, key = self._time_index(theater_id, city)
+        return [self.shows[show_id] for show_id in index.starting_between(start, end, key)]
+    
+    def next_shows(self, after: datetime, limit: int = 10, theater_id: Optional[str] = None,
+                   city: Optional[str] = None) -> List[Show]:
+        index, key = self._time_index(theater_id, city)
+        return [self.shows[show_id] for show_id in index.next_after(after, limit, key)]
+    
+    def shows_playing_at(self, moment: datetime, theater_id: Optional[str] = None,
+                         city: Optional[str] = None) -> List[Show]:
+        index, key = self._time_index(theater_id, city)
+        shows = (self.shows[show_id] for show_id in index.started_within(moment, key))
+        return [show for show in shows if show.end_time > moment]
+    
+    def get_show(self, show_id: str) -> Optional[Show]:
+        return self.shows.get(show_id)
+    
+    def get_shows_by_ids(self, show_ids: Iterable[str]) -> dict[str, Show]:
+        return {show_id: self.shows[show_id] for show_id in show_ids if show_id in self.shows}
+    
     def add_user(self, user: User):
         self.users[user.user_id] = user
     
@@ -226,6 +673,24 @@ class MovieDatabase:
     
     def add_booking(self, booking: Booking):
         self.bookings[booking.booking_id] = booking
+        by_status = self._user_booking_index.setdefault(booking.user_id, {})
+        insort(by_status.setdefault(booking.status, []), (booking.booking_date, booking.booking_id))
+        self._user_total_spent[booking.user_id] = (
+            self._user_total_spent.get(booking.user_id, 0.0) + booking.total_price
+        )
+    
+    def update_booking_status(self, booking: Booking, status: BookingStatus):
+        """Change a booking's status and move it within the user booking index"""
+        if booking.status == status:
+            return
+        by_status = self._user_booking_index.setdefault(booking.user_id, {})
+        entry = (booking.booking_date, booking.booking_id)
+        entries = by_status.get(booking.status, [])
+        pos = bisect_left(entries, entry)
+        if pos < len(entries) and entries[pos] == entry:
+            entries.pop(pos)
+        booking.status = status
+        insort(by_status.setdefault(status, []), entry)
     
     def get_booking(self, booking_id: str) -> Optional[Booking]:
         return self.bookings.get(booking_id)
@@ -233,3 +698,45 @@ class MovieDatabase:
     def get_user_bookings(self, user_id: str) -> List[Booking]:
         user = self.get_user(user_id)
         return user.bookings if user else []
+    
+    def query_user_bookings(self, user_id: str, status: Optional[BookingStatus] = None,
+                            start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            after_booking_id: Optional[str] = None, limit: int = 20) -> List[Booking]:
+        """Newest-first page of a user's bookings in [start, end), read from the index.
+        
+        `after_booking_id` is a keyset cursor: the last booking of the previous page.
+        """
+        by_status = self._user_booking_index.get(user_id, {})
+        statuses = [status] if status else list(by_status)
+        lower = (start, "") if start else None
+        upper = (end, "") if end else None
+        cursor = self.bookings.get(after_booking_id) if after_booking_id else None
+        if cursor:
+            cursor_entry = (cursor.booking_date, cursor.booking_id)
+            upper = min(upper, cursor_entry) if upper else cursor_entry
+        
+        def newest_first(entries: list) -> Iterator[tuple]:
+            lo = bisect_left(entries, lower) if lower else 0
+            hi = bisect_left(entries, upper) if upper else len(entries)
+            return (entries[i] for i in range(hi - 1, lo - 1, -1))
+        
+        runs = [newest_first(by_status.get(s, [])) for s in statuses]
+        return [
+            self.bookings[booking_id]
+            for _, booking_id in islice(merge(*runs, reverse=True), limit)
+        ]
+    
+    def put_booking_summary(self, summary: BookingSummary):
+        self.booking_summaries[summary.booking_id] = summary
+    
+    def get_booking_summary(self, booking_id: str) -> Optional[BookingSummary]:
+        return self.booking_summaries.get(booking_id)
+    
+    def count_user_bookings(self, user_id: str, status: Optional[BookingStatus] = None) -> int:
+        by_status = self._user_booking_index.get(user_id, {})
+        if status:
+            return len(by_status.get(status, []))
+        return sum(len(entries) for entries in by_status.values())
+    
+    def get_user_total_spent(self, user_id: str) -> float:
+        return self._user_total_spent.get(user_id, 0.0)
@@ -0,0 +1,29 @@
+"""
+Booking Summary Rebuild Tool for BookMyShow
+Recomputes the denormalized booking_summaries collection from source data
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.mongodb_repository import BookingSummaryRepository
+
+
+def rebuild_booking_summaries():
+    """Rebuild every booking summary in MongoDB"""
+    
+    print("🔁 Rebuilding booking summaries...")
+    print("=" * 60)
+    
+    try:
+        count = BookingSummaryRepository().rebuild()
+        print(f"✅ {count} booking summaries rebuilt")
+    except Exception as e:
+        print(f"\n❌ Error rebuilding booking summaries: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    rebuild_booking_summaries()
@@ -10,6 +10,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from backend.mongodb_connection import get_database, Collections, MongoDBConnection
+from backend.mongodb_indexes import apply_indexes
 from backend.mongodb_repository import (
     UserRepository, MovieRepository, TheaterRepository, BookingRepository, PaymentRepository
 )
@@ -31,7 +32,8 @@ def initialize_database():
         print("🧹 Clearing existing collections...")
         for collection in [Collections.USERS, Collections.MOVIES, Collections.THEATERS, 
                           Collections.SHOWS, Collections.SEATS, Collections.BOOKINGS, 
-                          Collections.BOOKING_DETAILS, Collections.PAYMENTS]:
+                          Collections.BOOKING_DETAILS, Collections.PAYMENTS,
+                          Collections.BOOKING_SUMMARIES]:
             db[collection].delete_many({})
         print("✅ Collections cleared")
         
@@ -150,15 +152,8 @@ def initialize_database():
         
         # Create indexes for better performance
         print("\n📊 Creating database indexes...")
-        db[Collections.USERS].create_index("email", unique=True)
-        db[Collections.USERS].create_index("user_id", unique=True)
-        db[Collections.MOVIES].create_index("movie_id", unique=True)
-        db[Collections.THEATERS].create_index("theater_id", unique=True)
-        db[Collections.BOOKINGS].create_index("booking_id", unique=True)
-        db[Collections.BOOKINGS].create_index("user_id")
-        db[Collections.PAYMENTS].create_index("payment_id", unique=True)
-        db[Collections.PAYMENTS].create_index("booking_id")
-        print("  ✅ Indexes created")
+        created = apply_indexes(db)['created']
+        print(f"  ✅ {len(created)} indexes created")
         
         print("\n" + "=" * 60)
         print("✅ MongoDB initialization completed successfully!")